@@ -0,0 +1,159 @@
+import os
+import ssl
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence
+
+import aiomysql
+import pymysql
+
+if TYPE_CHECKING:
+    from mysql.connector.pooling import MySQLConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# MySQL接続情報
+DB_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "tech0-gen-8-step4-dtx-db.mysql.database.azure.com"),
+    "user": os.getenv("MYSQL_USER", "ryoueno"),
+    "password": os.getenv("MYSQL_PASSWORD", "tech0-dtxdb"),
+    "database": "corporaiters"
+}
+
+# コネクションプール設定
+MYSQL_POOL_MINSIZE = int(os.getenv("MYSQL_POOL_MINSIZE", "1"))
+MYSQL_POOL_MAXSIZE = int(os.getenv("MYSQL_POOL_MAXSIZE", "10"))
+# Azure MySQL のアイドル切断より前に接続を作り直す（秒）
+MYSQL_POOL_RECYCLE_SECONDS = int(os.getenv("MYSQL_POOL_RECYCLE_SECONDS", "1800"))
+MYSQL_SSL = os.getenv("MYSQL_SSL", "1") == "1"
+# 同期処理用プールの接続数（非同期プールとは別に接続を張るため小さめにする）
+MYSQL_SYNC_POOL_SIZE = int(os.getenv("MYSQL_SYNC_POOL_SIZE", "4"))
+# 同期プールが全て貸し出し中のとき、空きを待つ秒数
+MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS", "10"))
+
+_pool: Optional[aiomysql.Pool] = None
+_sync_pool: Optional["MySQLConnectionPool"] = None
+_sync_pool_lock = threading.Lock()
+# mysql.connector のプールは空きが無いと待たずに PoolError を投げるため、貸し出し数をセマフォで制限して待たせる
+_sync_slots = threading.BoundedSemaphore(MYSQL_SYNC_POOL_SIZE)
+# 起動後のウォームアップと最初のリクエストが同時にプールを作らないようにする
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+class _SyncConnection:
+    """ プールから借りた接続。close() で接続をプールに返し、貸し出し枠も解放する """
+
+    def __init__(self, conn, slots: threading.BoundedSemaphore):
+        self._conn = conn
+        self._slots = slots
+        self._closed = False
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._conn.close()
+        finally:
+            self._slots.release()
+
+
+def _get_sync_pool() -> "MySQLConnectionPool":
+    global _sync_pool
+    with _sync_pool_lock:
+        if _sync_pool is None:
+            # mysql.connector は同期処理（sailings テーブルなど）を初めて使うときに読み込む
+            from mysql.connector.pooling import MySQLConnectionPool
+
+            _sync_pool = MySQLConnectionPool(
+                pool_name="shipit", pool_size=MYSQL_SYNC_POOL_SIZE, pool_reset_session=True, **DB_CONFIG
+            )
+        return _sync_pool
+
+
+def get_db_connection():
+    """
+    同期処理用（スレッドから呼ぶ処理向け）。プールから接続を借り、close() で返却される。
+    全て貸し出し中の場合は MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS まで空きを待つ。
+    """
+    slots = _sync_slots
+    if not slots.acquire(timeout=MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS):
+        raise TimeoutError(f"MySQL同期プールの空きを{MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS}秒待ちましたが取得できませんでした")
+    try:
+        return _SyncConnection(_get_sync_pool().get_connection(), slots)
+    except BaseException:
+        slots.release()
+        raise
+
+
+async def init_db_pool():
+    """ 非同期コネクションプールを作成し、疎通を確認する（起動後のウォームアップ、または初回利用時） """
+    global _pool, _pool_lock
+    if _pool is not None:
+        return
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is not None:
+            return
+        _pool = await aiomysql.create_pool(
+            host=DB_CONFIG["host"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            db=DB_CONFIG["database"],
+            minsize=MYSQL_POOL_MINSIZE,
+            maxsize=MYSQL_POOL_MAXSIZE,
+            pool_recycle=MYSQL_POOL_RECYCLE_SECONDS,
+            ssl=ssl.create_default_context() if MYSQL_SSL else None,
+            autocommit=True,
+        )
+    if await check_db_pool():
+        logger.info(f"🗄 MySQLコネクションプールを作成しました（{MYSQL_POOL_MINSIZE}〜{MYSQL_POOL_MAXSIZE}接続）")
+
+
+async def close_db_pool():
+    global _pool, _pool_lock
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+    _pool_lock = None
+
+
+async def check_db_pool() -> bool:
+    """ ヘルスチェック（SELECT 1） """
+    try:
+        await fetch_all("SELECT 1")
+        return True
+    except Exception as e:
+        logger.warning(f"[WARN] MySQLヘルスチェック失敗: {e}")
+        return False
+
+
+@asynccontextmanager
+async def acquire_connection():
+    if _pool is None:
+        await init_db_pool()
+    assert _pool is not None
+    async with _pool.acquire() as conn:
+        yield conn
+
+
+async def fetch_all(query: str, args: Sequence[Any] = ()) -> List[dict]:
+    """ クエリを実行して全行を dict で返す。切断済みの接続だった場合は1回だけ再試行 """
+    for attempt in range(2):
+        try:
+            async with acquire_connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(query, args)
+                    return list(await cursor.fetchall())
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+            if attempt:
+                raise
+            logger.warning(f"[WARN] MySQL接続エラーのため再試行します: {e}")
+    return []
@@ -1,7 +1,9 @@
+import sys
 from highlight_etd import highlight_etd_candidates
 
+# 使用例: python debug_etd_highlight.py schedule.pdf TOKYO
 highlight_etd_candidates(
-    pdf_path="temp_schedule.pdf",         # FastAPIで保存されたPDF
-    departure="TOKYO",                    # 任意の港（例：YOKOHAMAなどでも可）
+    pdf_path=sys.argv[1] if len(sys.argv) > 1 else "schedule.pdf",  # 確認したいスケジュールPDF
+    departure=sys.argv[2] if len(sys.argv) > 2 else "TOKYO",       # 任意の港（例：YOKOHAMAなどでも可）
     save_path="highlighted_etd.pdf"       # 出力されるPDF名
 )
@@ -1,11 +1,14 @@
 import sys
 import json
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
-from openai import AzureOpenAI
 import re
+from app.services.region_cache import get_cached_region, set_cached_region
+from app.services.metrics import record_llm_usage
+from app.services.llm_client import get_llm_client
 
 # .env 読み込み
 dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -18,14 +21,7 @@ logger.info(f"[DEBUG] .env path = {dotenv_path}")
 api_key = os.getenv('OPENAI_API_KEY')
 logger.info(f"[DEBUG] OPENAI_API_KEY = {api_key[:8]}..." if api_key else "[DEBUG] OPENAI_API_KEY is not set.")
 
-# OpenAIクライアント初期化
-client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("OPENAI_API_BASE") or ""
-)
-
-logger.info("[DEBUG] OpenAI client initialized successfully.")
+# OpenAIクライアントは app.services.llm_client で共有（初回利用時に作成）
 
 # 地域マッピング（日付部分をワイルドカード化）
 region_map = {
@@ -112,6 +108,13 @@ region_map = {
 
 def get_region_by_chatgpt(destination_keyword, silent=False):
     """ ChatGPTを用いて地域カテゴリを判定 """
+    # キャッシュ済みであればChatGPTを呼ばない
+    cached = get_cached_region("COSCO", destination_keyword)
+    if cached in region_map:
+        if not silent:
+            logger.info(f"[地域キャッシュ] {destination_keyword} → {cached}")
+        return cached
+
     prompt = f"""
 以下の目的地「{destination_keyword}」は、COSCO社の輸出スケジュールPDFのどの地域カテゴリに該当しますか？
 以下の英語リストから最も適切なものを **1つだけ** 英語で出力してください（他の説明文は不要）：
@@ -119,10 +122,11 @@ def get_region_by_chatgpt(destination_keyword, silent=False):
 """
 
     try:
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}]
         )
+        record_llm_usage("region", response, "COSCO")
         
         content = response.choices[0].message.content
         if content is None:
@@ -135,15 +139,15 @@ def get_region_by_chatgpt(destination_keyword, silent=False):
         if result not in region_map:
             raise ValueError(f"[ERROR] 不正な地域カテゴリ: {result}")
 
+        set_cached_region("COSCO", destination_keyword, result)
         return result
 
     except Exception as e:
         logger.exception("[ERROR] ChatGPTによる地域判定に失敗")
         raise
 
-def get_pdf_links(destination_keyword, silent=False):
+def get_pdf_links_for_region(region_key, silent=False):
     pdf_links = []
-    region_key = get_region_by_chatgpt(destination_keyword, silent=silent)
     region_info = region_map.get(region_key)
 
     if not region_info:
@@ -157,16 +161,27 @@ def get_pdf_links(destination_keyword, silent=False):
     for pattern in pdf_patterns:
         # 日付部分を削除した比較用URLを生成
         base_url = re.sub(date_pattern, "/{DATE}/", pattern)
-        logger.info(f"[INFO] 照合用URLパターン: {base_url}")
+        if not silent:
+            logger.info(f"[INFO] 照合用URLパターン: {base_url}")
 
         # 実際のPDFリンクを生成
         for date_part in ["20250507", "20250508", "20250509"]:
             pdf_url = base_url.replace("{DATE}", date_part)
             pdf_links.append(pdf_url)
-            logger.info(f"[抽出] {pdf_url}")
+            if not silent:
+                logger.info(f"[抽出] {pdf_url}")
 
     return pdf_links
 
+async def get_pdf_links(destination_keyword, silent=False):
+    # 地域判定（ChatGPT）はブロッキングなのでスレッドで実行
+    region_key = await asyncio.to_thread(get_region_by_chatgpt, destination_keyword, silent)
+    return get_pdf_links_for_region(region_key, silent=silent)
+
+# 全地域カテゴリのPDFリンクを取得（事前クロール用）
+def get_all_region_pdf_links():
+    return [url for region_key in region_map for url in get_pdf_links_for_region(region_key, silent=True)]
+
 # エントリポイント
 if __name__ == "__main__":
     try:
@@ -178,7 +193,7 @@ if __name__ == "__main__":
         keyword = sys.argv[1]
         silent = "--silent" in sys.argv
 
-        result = get_pdf_links(keyword, silent=silent)
+        result = asyncio.run(get_pdf_links(keyword, silent=silent))
         print(json.dumps(result, ensure_ascii=False))
 
     except Exception as e:
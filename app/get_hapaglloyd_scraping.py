@@ -1,124 +1,279 @@
+import os
+import re
 import sys
 import json
 import asyncio
 import logging
 from datetime import datetime
-from playwright.async_api import async_playwright
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Response
+
+from app.services.browser_pool import BrowserPool
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-async def run():
+HAPAG_SCHEDULE_URL = "https://www.hapag-lloyd.com/solutions/schedule/#/"
+# --login で保存したセッション（CAPTCHA突破済みのCookie・localStorage）
+HAPAG_STATE_PATH = os.getenv(
+    "HAPAG_STATE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'hapag_state.json'))
+)
+
+# 結果の取得方法: "xhr"（スケジュール表の元になるJSONレスポンスを傍受）/ "dom"（描画された表を読む）
+HAPAG_SCRAPE_MODE = os.getenv("HAPAG_SCRAPE_MODE", "xhr")
+# スケジュールJSONとみなすレスポンスのURL（正規表現）
+HAPAG_SCHEDULE_RESPONSE_PATTERN = re.compile(os.getenv("HAPAG_SCHEDULE_RESPONSE_PATTERN", r"schedule"), re.I)
+# 入力補完の候補（表示されたら選択する）
+HAPAG_AUTOCOMPLETE_OPTION_SELECTOR = os.getenv("HAPAG_AUTOCOMPLETE_OPTION_SELECTOR", '[role="option"]')
+HAPAG_RESULT_TIMEOUT_SECONDS = float(os.getenv("HAPAG_RESULT_TIMEOUT_SECONDS", "20"))
+# 遮断する通信（画像・フォント・動画と、アクセス解析・広告タグ）
+HAPAG_BLOCKED_RESOURCE_TYPES = ("image", "font", "media")
+HAPAG_BLOCKED_URL_PATTERN = os.getenv(
+    "HAPAG_BLOCKED_URL_PATTERN",
+    r"google-analytics|googletagmanager|doubleclick|hotjar|facebook\.net|linkedin|bat\.bing|clarity\.ms"
+    r"|omtrdc|demdex|adobedtm|newrelic|nr-data",
+)
+
+# 検索ごとにブラウザを起動せず、セッションを復元したコンテキストを使い回す
+browser_pool = BrowserPool(
+    "Hapag-Lloyd",
+    storage_state=HAPAG_STATE_PATH,
+    size=int(os.getenv("HAPAG_BROWSER_POOL_SIZE", "2")),
+    max_uses=int(os.getenv("HAPAG_CONTEXT_MAX_USES", "20")),
+    blocked_resource_types=HAPAG_BLOCKED_RESOURCE_TYPES,
+    blocked_url_pattern=HAPAG_BLOCKED_URL_PATTERN,
+)
+
+# スケジュールJSONの項目名の候補（大文字小文字は区別しない）
+VESSEL_KEYS = ("vesselName", "vessel", "shipName")
+VOYAGE_KEYS = ("voyageNumber", "voyageNo", "voyage", "scheduleVoyageNumber")
+ETD_KEYS = ("departureDateTime", "departureDate", "etd", "departure")
+ETA_KEYS = ("arrivalDateTime", "arrivalDate", "eta", "arrival")
+LEG_KEYS = ("legs", "routeLegs", "transportLegs", "segments")
+_LEG_KEYS_LOWER = {key.lower() for key in LEG_KEYS}
+# 値がオブジェクトの場合に中身として使う項目
+NESTED_VALUE_KEYS = ("name", "value", "number", "code")
+NESTED_DATE_KEYS = ("localDateTime", "dateTime", "date", "value")
+
+
+def _get(obj: dict, keys: tuple) -> Any:
+    lowered = {k.lower(): v for k, v in obj.items()}
+    for key in keys:
+        value = lowered.get(key.lower())
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def _text(value: Any, nested_keys: tuple = NESTED_VALUE_KEYS) -> str:
+    """ 文字列・数値、または {"name": ...} / {"dateTime": ...} のようなオブジェクトから値を取り出す """
+    if isinstance(value, dict):
+        value = _get(value, nested_keys)
+    if value is None or isinstance(value, (dict, list)):
+        return ""
+    return str(value).strip()
+
+
+def _date_text(value: Any) -> str:
+    text = _text(value, NESTED_DATE_KEYS)
+    try:
+        return datetime.fromisoformat(text[:19]).strftime("%Y-%m-%d")
+    except ValueError:
+        return text
+
+
+def _iter_dict_lists(data: Any) -> Iterator[List[dict]]:
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data):
+            yield data
+        for item in data:
+            yield from _iter_dict_lists(item)
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            # 経路内の区間（legs）は経路ごとに読むため、単独の航海一覧としては扱わない
+            if key.lower() not in _LEG_KEYS_LOWER:
+                yield from _iter_dict_lists(value)
+
+
+def _sailing_from_route(route: dict, schedule_url: str) -> Optional[dict]:
+    legs = _get(route, LEG_KEYS)
+    legs = [leg for leg in legs if isinstance(leg, dict)] if isinstance(legs, list) else []
+    first, last = (legs[0], legs[-1]) if legs else (route, route)
+    vessel = _text(_get(route, VESSEL_KEYS) or _get(first, VESSEL_KEYS))
+    etd = _date_text(_get(route, ETD_KEYS) or _get(first, ETD_KEYS))
+    eta = _date_text(_get(route, ETA_KEYS) or _get(last, ETA_KEYS))
+    if not (vessel and etd and eta):
+        return None
+    return {
+        "company": "Hapag-Lloyd",
+        "vessel": vessel,
+        "voy": _text(_get(route, VOYAGE_KEYS) or _get(first, VOYAGE_KEYS)),
+        "etd": etd,
+        "eta": eta,
+        "schedule_url": schedule_url,
+    }
+
+
+def parse_schedule_json(data: Any, schedule_url: str) -> List[dict]:
+    """ スケジュールJSONの中で、船名・ETD・ETAを取り出せる件数が最も多い配列を航海一覧として返す """
+    best: List[dict] = []
+    for routes in _iter_dict_lists(data):
+        sailings = [s for s in (_sailing_from_route(route, schedule_url) for route in routes) if s]
+        if len(sailings) > len(best):
+            best = sailings
+    # 同じ便が複数の経路で出てくる場合は1件にまとめる
+    unique = {(s["vessel"], s["voy"], s["etd"], s["eta"]): s for s in best}
+    return list(unique.values())
+
+
+async def _select_location(page: "Page", location_input, value: str):
+    """ 入力後、補完候補の表示を待って先頭を選択する（固定時間の待機はしない） """
+    await location_input.click()
+    await location_input.fill(value)
+    try:
+        await page.wait_for_selector(HAPAG_AUTOCOMPLETE_OPTION_SELECTOR, timeout=10000)
+    except Exception:
+        logger.warning(f"⚠️ 補完候補が表示されませんでした: {value}")
+    await page.keyboard.press("ArrowDown")
+    await page.keyboard.press("Enter")
+
+
+async def _read_table(page: "Page") -> List[dict]:
+    """ 描画された表の全行を1回の評価で読み取る """
+    try:
+        await page.wait_for_selector('.schedule-table-container', timeout=HAPAG_RESULT_TIMEOUT_SECONDS * 1000)
+    except Exception:
+        await page.screenshot(path="debug_no_result.png")
+        logger.warning("❌ 結果が表示されませんでした")
+        return []
+    rows = await page.eval_on_selector_all(
+        '.schedule-table-container tbody tr',
+        "rows => rows.map(row => Array.from(row.querySelectorAll('td')).map(td => td.innerText.trim()))",
+    )
+    return [
+        {"company": "Hapag-Lloyd", "vessel": cols[0], "etd": cols[2], "eta": cols[3], "schedule_url": page.url}
+        for cols in rows
+        if len(cols) >= 5
+    ]
+
+
+async def save_login_state():
+    """ ヘッドありのブラウザでCAPTCHAを手動で突破し、セッションを HAPAG_STATE_PATH に保存する """
+    from playwright.async_api import async_playwright
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)  # 手動突破のためヘッドあり
         context = await browser.new_context()
         page = await context.new_page()
-        await page.goto("https://www.hapag-lloyd.com/solutions/schedule/#/")
+        await page.goto(HAPAG_SCHEDULE_URL)
         print("✅ CAPTCHAを手動で突破してください。突破後にEnterキーを押すと保存されます。")
-        input("➡ CAPTCHA突破後、Enterを押してください...")
-        await context.storage_state(path="hapag_state.json")  # セッション保存
-        print("✅ セッションを保存しました！")
+        await asyncio.to_thread(input, "➡ CAPTCHA突破後、Enterを押してください...")
+        await context.storage_state(path=HAPAG_STATE_PATH)  # セッション保存
+        print(f"✅ セッションを保存しました！（{HAPAG_STATE_PATH}）")
         await browser.close()
 
-asyncio.run(run())
 
-async def get_hapaglloyd_schedule(departure: str, destination: str, start_date: str = None) -> list[dict]:
-    results = []
+async def get_hapaglloyd_schedule(departure: str, destination: str, start_date: Optional[str] = None) -> list[dict]:
+    """
+    出発地・到着地（・出発日）で検索した全航海を返す。
+    HAPAG_SCRAPE_MODE=xhr ではスケジュール表の元になるJSONを傍受し、取得できなかった場合は描画された表を読む。
+    """
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            context = await browser.new_context(storage_state="hapag_state.json")
-            page = await browser.new_page()
-            logger.info("🌐 Hapag-Lloyd スケジュールページに移動中...")
-            await page.goto("https://www.hapag-lloyd.com/solutions/schedule/#/", timeout=60000)
-            await page.wait_for_selector('input[placeholder*="Location name or code"]', timeout=30000)
-            await page.wait_for_timeout(2000)  # ページが完全に描画されるのを少し待つ
-            await page.screenshot(path="debug_loaded.png")
-
-            # 入力欄（Start / End Location）取得
-            inputs = await page.query_selector_all('input[placeholder*="Location name or code"]')
-            if len(inputs) < 2:
-                logger.error("❌ 出発地・到着地の入力欄が見つかりません")
-                return []
-
-            from_input, to_input = inputs[0], inputs[1]
-
-            # 出発地入力
-            logger.info(f"📍 出発地: {departure}")
-            await from_input.click()
-            await from_input.fill(departure)
-            await page.wait_for_timeout(1000)
-            await page.keyboard.press("ArrowDown")
-            await page.keyboard.press("Enter")
-
-            # 到着地入力
-            logger.info(f"📍 到着地: {destination}")
-            await to_input.click()
-            await to_input.fill(destination)
-            await page.wait_for_timeout(1000)
-            await page.keyboard.press("ArrowDown")
-            await page.keyboard.press("Enter")
-
-            # 出発日入力（任意）
-            if start_date:
-                logger.info(f"📅 出発日: {start_date}")
-                date_input = await page.query_selector('input[type="date"]')
-                if date_input:
-                    await date_input.fill(start_date)
-                    await page.wait_for_timeout(500)
-
-            # Findボタンをクリック
-            logger.info("🔍 検索を実行")
-            await page.click('button:has-text("Find")')
-
-            # 結果待機
+        async with browser_pool.page() as page:
             try:
-                await page.wait_for_selector('.schedule-table-container', timeout=20000)
-                logger.info("✅ 結果が表示されました")
-            except:
-                await page.screenshot(path="debug_no_result.png")
-                logger.warning("❌ 結果が表示されませんでした")
-                return []
-
-            # 結果の抽出（最大3件）
-            rows = await page.query_selector_all('.schedule-table-container tbody tr')
-            for row in rows[:3]:
-                cols = await row.query_selector_all('td')
-                if len(cols) >= 5:
-                    vessel = await cols[0].inner_text()
-                    etd = await cols[2].inner_text()
-                    eta = await cols[3].inner_text()
-                    results.append({
-                        "company": "Hapag-Lloyd",
-                        "vessel": vessel.strip(),
-                        "etd": etd.strip(),
-                        "eta": eta.strip(),
-                        "schedule_url": page.url
-                    })
-
-            await browser.close()
+                logger.info("🌐 Hapag-Lloyd スケジュールページに移動中...")
+                await page.goto(HAPAG_SCHEDULE_URL, timeout=60000)
+                await page.wait_for_selector('input[placeholder*="Location name or code"]', timeout=30000)
+
+                # 入力欄（Start / End Location）取得
+                inputs = await page.query_selector_all('input[placeholder*="Location name or code"]')
+                if len(inputs) < 2:
+                    logger.error("❌ 出発地・到着地の入力欄が見つかりません")
+                    return []
+
+                logger.info(f"📍 出発地: {departure} / 到着地: {destination}")
+                await _select_location(page, inputs[0], departure)
+                await _select_location(page, inputs[1], destination)
+
+                # 出発日入力（任意）
+                if start_date:
+                    logger.info(f"📅 出発日: {start_date}")
+                    date_input = await page.query_selector('input[type="date"]')
+                    if date_input:
+                        await date_input.fill(start_date)
+
+                # 検索後に届くJSONレスポンスのうち、航海を取り出せた最初のものを結果とする
+                found: "asyncio.Future[List[dict]]" = asyncio.get_running_loop().create_future()
+
+                async def on_response(response: "Response"):
+                    if found.done() or response.request.resource_type not in ("xhr", "fetch"):
+                        return
+                    if not HAPAG_SCHEDULE_RESPONSE_PATTERN.search(response.url):
+                        return
+                    if "json" not in (response.headers.get("content-type") or ""):
+                        return
+                    try:
+                        sailings = parse_schedule_json(await response.json(), page.url)
+                    except Exception as e:
+                        logger.debug(f"[Hapag-Lloyd] JSONの解析に失敗: {response.url} {e}")
+                        return
+                    if sailings and not found.done():
+                        logger.info(f"📡 スケジュールJSONを取得: {response.url}")
+                        found.set_result(sailings)
+
+                if HAPAG_SCRAPE_MODE == "xhr":
+                    page.on("response", on_response)
+
+                # Findボタンをクリック
+                logger.info("🔍 検索を実行")
+                await page.click('button:has-text("Find")')
+
+                if HAPAG_SCRAPE_MODE == "xhr":
+                    try:
+                        results = await asyncio.wait_for(found, timeout=HAPAG_RESULT_TIMEOUT_SECONDS)
+                        logger.info(f"✅ {len(results)}件の航海を取得しました（JSON）")
+                        return results
+                    except asyncio.TimeoutError:
+                        logger.warning("⚠️ スケジュールJSONを取得できなかったため、表示された表から読み取ります")
+
+                results = await _read_table(page)
+                logger.info(f"✅ {len(results)}件の航海を取得しました（表）")
+                return results
+            except Exception:
+                try:
+                    await page.screenshot(path="debug_exception.png")
+                except Exception:
+                    logger.warning("⚠️ スクリーンショット撮影失敗")
+                raise
     except Exception as e:
         logger.error(f"[ERROR] {e}")
-        try:
-            await page.screenshot(path="debug_exception.png")
-        except:
-            logger.warning("⚠️ スクリーンショット撮影失敗")
         return []
 
-    return results
+
+async def _main_cli(args: list):
+    try:
+        if args[0] == "--login":
+            await save_login_state()
+            return
+        departure, destination = args[0], args[1]
+        start_date = args[2] if len(args) >= 3 else datetime.today().strftime("%Y-%m-%d")
+        result = await get_hapaglloyd_schedule(departure, destination, start_date)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    finally:
+        logger.info(f"[ブラウザプール] {browser_pool.stats()}")
+        await browser_pool.close()
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python get_hapaglloyd_schedule.py <departure> <destination> [<start_date>]")
+    if not sys.argv[1:] or (sys.argv[1] != "--login" and len(sys.argv) < 3):
+        print("Usage: python -m app.get_hapaglloyd_scraping <departure> <destination> [<start_date>]")
+        print("       python -m app.get_hapaglloyd_scraping --login   # CAPTCHAを手動で突破してセッションを保存")
         sys.exit(1)
 
-    departure = sys.argv[1]
-    destination = sys.argv[2]
-    start_date = sys.argv[3] if len(sys.argv) >= 4 else datetime.today().strftime("%Y-%m-%d")
-
     try:
-        result = asyncio.run(get_hapaglloyd_schedule(departure, destination, start_date))
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        asyncio.run(_main_cli(sys.argv[1:]))
     except Exception as e:
         logger.error(f"[ERROR] {e}")
         print("[]")
@@ -51,14 +51,15 @@
 
 import sys
 import json
+import asyncio
 import logging
-import requests
 from bs4 import BeautifulSoup, Tag
+from app.services.http_client import get_http_client
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-def get_fixed_pdf_link_for_shanghai():
+async def get_fixed_pdf_link_for_shanghai():
     href = "N/A"  # 初期値を設定
     url = "https://www.kinka-agency.com/asp/newsitem.asp?nw_id=54"
     headers = {
@@ -66,7 +67,7 @@ def get_fixed_pdf_link_for_shanghai():
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await get_http_client().get(url, headers=headers, timeout=10)
         response.raise_for_status()
     except Exception as e:
         logger.exception("[ERROR] KINKAサイト取得失敗")
@@ -97,7 +98,7 @@ if __name__ == "__main__":
     destination_keyword = sys.argv[1].lower()
 
     if "上海" in destination_keyword or "shanghai" in destination_keyword:
-        result = get_fixed_pdf_link_for_shanghai()
+        result = asyncio.run(get_fixed_pdf_link_for_shanghai())
         print(json.dumps(result, ensure_ascii=False))
     else:
         print("[]")
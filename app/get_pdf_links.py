@@ -122,14 +122,17 @@
 import sys
 import json
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
-import requests
 from bs4 import BeautifulSoup, Tag
 from typing import cast
 # from openai import OpenAI
-from openai import AzureOpenAI
+from app.services.region_cache import get_cached_region, set_cached_region
+from app.services.metrics import record_llm_usage
+from app.services.llm_client import get_llm_client
+from app.services.http_client import get_http_client
 
 # .env 読み込み
 dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -142,15 +145,8 @@ logger.info(f"[DEBUG] .env path = {dotenv_path}")
 api_key = os.getenv('OPENAI_API_KEY')
 logger.info(f"[DEBUG] OPENAI_API_KEY = {api_key[:8]}..." if api_key else "[DEBUG] OPENAI_API_KEY is not set.")
 
-# OpenAIクライアント初期化
+# OpenAIクライアントは app.services.llm_client で共有（初回利用時に作成）
 # client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("OPENAI_API_BASE") or ""
-)
-
-logger.info("[DEBUG] OpenAI client initialized successfully.")
 
 # 地域マッピング
 region_map = {
@@ -170,16 +166,24 @@ region_map = {
 
 # ChatGPTで地域カテゴリを判定
 def get_region_by_chatgpt(destination_keyword, silent=False):
+    # キャッシュ済みであればChatGPTを呼ばない
+    cached = get_cached_region("ONE", destination_keyword)
+    if cached in region_map:
+        if not silent:
+            logger.info(f"[地域キャッシュ] {destination_keyword} → {cached}")
+        return region_map[cached]
+
     prompt = f"""
 以下の目的地「{destination_keyword}」は、ONE社の輸出スケジュールPDFのどの地域カテゴリに該当しますか？
 以下の英語リストから最も適切なものを **1つだけ** 英語で出力してください（他の説明文は不要）：
 ["NORTH AMERICA EAST COAST", "NORTH AMERICA WEST COAST", "HAWAII", "EUROPE NORTH", "EUROPE MEDITERRANEAN", "EAST ASIA", "SOUTHEAST ASIA", "MIDDLE EAST", "SOUTH AMERICA WEST COAST", "SOUTH AMERICA EAST COAST", "AFRICA", "OCEANIA"]
 """
     try:
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
         )
+        record_llm_usage("region", response, "ONE")
         content = response.choices[0].message.content
         if content is None:
             raise ValueError("ChatGPTの返答が空です")
@@ -191,47 +195,67 @@ def get_region_by_chatgpt(destination_keyword, silent=False):
         if result not in region_map:
             raise ValueError(f"ChatGPTの返答が不正です: {result}")
 
+        set_cached_region("ONE", destination_keyword, result)
         return region_map[result]
 
     except Exception as e:
         logger.exception("[ERROR] ChatGPTによる地域判定で例外:")
         raise
 
-# PDFリンク取得（BeautifulSoup版）
-def get_pdf_links(destination_keyword, silent=False):
-    pdf_links = []
-    region = get_region_by_chatgpt(destination_keyword, silent=silent)
-
-    if not silent:
-        logger.info(f"[INFO] 判定された日本語PDFカテゴリ: {region}")
-
+# 輸出スケジュールページの全PDFリンクを (リンク文字列, URL) で取得
+async def fetch_export_pdf_links():
     url = "https://jp.one-line.com/ja/schedules/export"
     headers = {"User-Agent": "Mozilla/5.0"}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await get_http_client().get(url, headers=headers, timeout=10)
         response.raise_for_status()
     except Exception as e:
-        logger.exception("[ERROR] requests.get に失敗しました")
+        logger.exception("[ERROR] スケジュールページの取得に失敗しました")
         raise
 
     soup = BeautifulSoup(response.content, "html.parser")
     links = soup.find_all("a", href=True)
 
+    pdf_links = []
     for link in links:
     # `link` を `Tag` 型として明示
         tag = cast(Tag, link)
         href = tag.get("href", "N/A")  # ✅ `get()` メソッドが使えるようになる
         text = tag.get_text(strip=True)
 
-        if str(href).endswith(".pdf") and region in text:
-            full_url = f"https://jp.one-line.com{href}" if str(href).startswith("/") else href
+        if str(href).endswith(".pdf"):
+            full_url = f"https://jp.one-line.com{href}" if str(href).startswith("/") else str(href)
+            pdf_links.append((text, full_url))
+
+    return pdf_links
+
+# 指定した日本語PDFカテゴリのPDFリンクを取得
+async def get_pdf_links_for_region(region, silent=False):
+    pdf_links = []
+    for text, full_url in await fetch_export_pdf_links():
+        if region in text:
             pdf_links.append(full_url)
             if not silent:
                 logger.info(f"[抽出] {text} -> {full_url}")
 
     return pdf_links
 
+# PDFリンク取得（BeautifulSoup版）
+async def get_pdf_links(destination_keyword, silent=False):
+    # 地域判定（ChatGPT）はブロッキングなのでスレッドで実行
+    region = await asyncio.to_thread(get_region_by_chatgpt, destination_keyword, silent)
+
+    if not silent:
+        logger.info(f"[INFO] 判定された日本語PDFカテゴリ: {region}")
+
+    return await get_pdf_links_for_region(region, silent=silent)
+
+# 全地域カテゴリのPDFリンクを取得（事前クロール用）
+async def get_all_region_pdf_links():
+    regions = set(region_map.values())
+    return [full_url for text, full_url in await fetch_export_pdf_links() if any(region in text for region in regions)]
+
 # エントリポイント
 if __name__ == "__main__":
     try:
@@ -243,7 +267,7 @@ if __name__ == "__main__":
         keyword = sys.argv[1]
         silent = "--silent" in sys.argv
 
-        result = get_pdf_links(keyword, silent=silent)
+        result = asyncio.run(get_pdf_links(keyword, silent=silent))
         print(json.dumps(result, ensure_ascii=False))  # subprocess用出力
 
     except Exception as e:
@@ -1,14 +1,18 @@
 import sys
 import json
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
-import requests
 from bs4 import BeautifulSoup, Tag
 # from openai import OpenAI
-from openai import AzureOpenAI
 import re
+from app.services.region_cache import get_cached_region, set_cached_region
+from app.services.metrics import record_llm_usage
+from app.services.llm_client import get_llm_client
+from app.services.http_client import get_http_client
+from app.services.instrumentation import track_stage
 
 # # .env 読み込み
 # if os.getenv("OPENAI_API_KEY") is None:
@@ -25,11 +29,6 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 logger = logging.getLogger(__name__)
 
 # client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("OPENAI_API_BASE") or ""
-)
 
 # 出発港 → locコードマッピング
 departure_port_map = {
@@ -59,6 +58,13 @@ destination_region_map = {
 }
 
 def get_region_by_chatgpt(destination_keyword: str, silent=False):
+    # キャッシュ済みであればChatGPTを呼ばない
+    cached = get_cached_region("Shipmentlink", destination_keyword)
+    if cached in destination_region_map:
+        if not silent:
+            logger.info(f"[地域キャッシュ] {destination_keyword} → {cached}")
+        return destination_region_map[cached]
+
     prompt = f"""
 次の目的地「{destination_keyword}」が、Shipmentlink社のスケジュール表示ページで使われるカテゴリのどれに該当しますか？
 以下から英語1単語で出力してください（他の文は不要）：
@@ -66,11 +72,12 @@ def get_region_by_chatgpt(destination_keyword: str, silent=False):
 ["NORTH AMERICA", "CENTRAL AMERICA", "SOUTH AMERICA", "EUROPE", "OCEANIA", "SOUTHEAST ASIA", "INDIAN SUBCONTINENT", "CHINA", "TAIWAN", "HONG KONG", "KOREA", "MIDDLE EAST", "AFRICA"]
 """
     try:
-        response = client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
+        record_llm_usage("region", response, "Shipmentlink")
 
         content = response.choices[0].message.content
         if content is None:
@@ -81,26 +88,30 @@ def get_region_by_chatgpt(destination_keyword: str, silent=False):
             raise ValueError(f"ChatGPTの返答が不正です: {result}")
         if not silent:
             logger.info(f"[ChatGPT地域判定] {result} → {destination_region_map[result]}")
+        set_cached_region("Shipmentlink", destination_keyword, result)
         return destination_region_map[result]
     except Exception as e:
         logger.exception("ChatGPT地域判定で失敗しました")
         raise
 
 
-def get_pdf_links(departure_port: str, destination_port: str, silent=False):
+# 出発港のスケジュール結果ページから全PDFリンクを (リンク文字列, URL) で取得
+async def fetch_schedule_pdf_links(dep_code: str):
     href = ""  # ✅ 事前に初期化
     text = ""  # ✅ 事前に初期化
-    dep_code = departure_port_map.get(departure_port.title())
-    if not dep_code:
-        logger.error(f"出発港 '{departure_port}' に対応するコードが見つかりません")
-        return []
-
-    region_name = get_region_by_chatgpt(destination_port, silent=silent)
     url_initial = 'https://www.shipmentlink.com/jp/tvs2/jsp/TVS2_ViewSchedule.jsp?loc='
     url_result = 'https://www.shipmentlink.com/loc/tvs2/jsp/TVS2_ViewScheduleResult.jsp'
 
-    session = requests.Session()
-    session.get(url_initial)
+    # 初期ページで発行されるセッションCookieは、この呼び出しの中だけで使う（共有クライアントには保存しない）
+    # リダイレクトの途中で発行されたCookieも含め、後の応答で上書きされたものを優先する
+    client = get_http_client()
+    initial_response = await client.get(url_initial)
+    cookies = {}
+    for hop in [*initial_response.history, initial_response]:
+        for cookie in hop.cookies.jar:
+            if cookie.value is not None:
+                cookies[cookie.name] = cookie.value
+    session_cookie = "; ".join(f"{name}={value}" for name, value in cookies.items())
 
     params = {
         'loc': dep_code,
@@ -115,8 +126,10 @@ def get_pdf_links(departure_port: str, destination_port: str, silent=False):
         'Referer': url_initial,
         'Origin': 'https://www.shipmentlink.com'
     }
+    if session_cookie:
+        headers['Cookie'] = session_cookie
 
-    response = session.get(url_result, params=params, headers=headers)
+    response = await client.get(url_result, params=params, headers=headers)
     logger.info(f"[DEBUG] HTTP status: {response.status_code}")
 
     pdf_links = []
@@ -137,7 +150,31 @@ def get_pdf_links(departure_port: str, destination_port: str, silent=False):
             full_url = "https://www.shipmentlink.com" + str(href) if str(href).startswith("/") else str(href)
         else:
             continue  # PDFでない場合スキップ
-    
+
+        pdf_links.append((text, full_url))
+
+    return pdf_links
+
+
+async def get_pdf_links(departure_port: str, destination_port: str, silent=False):
+    dep_code = departure_port_map.get(departure_port.title())
+    if not dep_code:
+        logger.error(f"出発港 '{departure_port}' に対応するコードが見つかりません")
+        return []
+
+    # 地域判定（ChatGPT）とスケジュールページ取得を並行して実行（所要時間は "region" / "links" として別々に計測）
+    async def classify_region():
+        with track_stage("region", "Shipmentlink"):
+            return await asyncio.to_thread(get_region_by_chatgpt, destination_port, silent)
+
+    async def fetch_links():
+        with track_stage("links", "Shipmentlink"):
+            return await fetch_schedule_pdf_links(dep_code)
+
+    region_name, schedule_links = await asyncio.gather(classify_region(), fetch_links())
+
+    pdf_links = []
+    for text, full_url in schedule_links:
         # ▼ 英語でも日本語でもマッチさせる
         normalized_text = text.lower()
         normalized_dest = destination_port.lower()
@@ -154,6 +191,18 @@ def get_pdf_links(departure_port: str, destination_port: str, silent=False):
 
     return pdf_links
 
+
+# 全出発港・全地域カテゴリのPDFリンクを取得（事前クロール用）
+async def get_all_region_pdf_links():
+    keywords = [keyword.lower() for names in destination_region_map.values() for keyword in names]
+    pdf_links = []
+    all_links = await asyncio.gather(*[fetch_schedule_pdf_links(dep_code) for dep_code in departure_port_map.values()])
+    for links in all_links:
+        for text, full_url in links:
+            if any(keyword in text.lower() for keyword in keywords) and full_url not in pdf_links:
+                pdf_links.append(full_url)
+    return pdf_links
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Usage: python get_shipmentlink_pdf_links.py <departure> <destination> [--silent]")
@@ -164,7 +213,7 @@ if __name__ == "__main__":
     silent = "--silent" in sys.argv
 
     try:
-        result = get_pdf_links(departure, destination, silent=silent)
+        result = asyncio.run(get_pdf_links(departure, destination, silent=silent))
         print(json.dumps(result, ensure_ascii=False))
     except Exception as e:
         logger.exception("[ERROR] Shipmentlink PDF取得失敗")
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from app.services.sqlite_store import CACHE_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# GPTのスケジュール選定結果のキャッシュ（PDF内容・航路・日付・プロンプト版ごと）
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(CACHE_DIR, "llm_answers.sqlite3"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+_initialized = False
+
+
+def _get_connection():
+    global _initialized
+    conn = connect(ANSWER_CACHE_PATH)
+    if not _initialized:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_answers (
+                cache_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                pdf_sha256 TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_answers_url ON llm_answers (url)")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def make_key(pdf_sha256: str, departure: str, destination: str, etd_date: str, eta_date: str, prompt_version: str) -> str:
+    parts = [pdf_sha256, departure.strip().upper(), destination.strip().upper(), etd_date, eta_date, prompt_version]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_answer(cache_key: str) -> Optional[Dict[str, Any]]:
+    try:
+        conn = _get_connection()
+        try:
+            row = conn.execute(
+                "SELECT answer FROM llm_answers WHERE cache_key = ? AND created_at > ?",
+                (cache_key, time.time() - ANSWER_CACHE_TTL_SECONDS)
+            ).fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"[WARN] GPT回答キャッシュの読み込みに失敗: {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def put_answer(cache_key: str, url: str, pdf_sha256: str, answer: Dict[str, Any]):
+    """ 回答を保存し、同じURLで内容が変わった古いPDFの回答は削除する """
+    try:
+        conn = _get_connection()
+        try:
+            conn.execute("DELETE FROM llm_answers WHERE url = ? AND pdf_sha256 != ?", (url, pdf_sha256))
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_answers (cache_key, url, pdf_sha256, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, url, pdf_sha256, json.dumps(answer, ensure_ascii=False), time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"[WARN] GPT回答キャッシュの書き込みに失敗: {e}")
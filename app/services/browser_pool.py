@@ -0,0 +1,155 @@
+import os
+import re
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page, Playwright, Route
+
+logger = logging.getLogger(__name__)
+
+# Playwright（Chromium）を使うスクレイパー用のブラウザプール
+# ブラウザは1つを使い回し、ログイン状態（storage_state）を復元したコンテキストを貸し出す
+# 同時に貸し出すコンテキスト数と作り直すまでの使用回数は、使う側（スクレイパーごと）の設定で渡す
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") == "1"
+
+
+class _PooledContext:
+    def __init__(self, context: "BrowserContext"):
+        self.context = context
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    長時間起動したままのヘッドレスChromiumと、storage_state から作ったコンテキストのプール。
+    同時に貸し出すのは size コンテキストまでで、max_uses 回使ったコンテキストは閉じて作り直す（メモリ・Cookieの肥大化を防ぐ）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        max_uses: int,
+        storage_state: Optional[str] = None,
+        blocked_resource_types: Iterable[str] = (),
+        blocked_url_pattern: Optional[str] = None
+    ):
+        self.name = name
+        self.storage_state = storage_state
+        self.size = size
+        self.max_uses = max_uses
+        # 結果の取得に不要な通信（画像・フォント・解析タグなど）はコンテキスト単位で遮断する
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_url = re.compile(blocked_url_pattern, re.I) if blocked_url_pattern else None
+        self._playwright: Optional["Playwright"] = None
+        self._browser: Optional["Browser"] = None
+        self._idle: List[_PooledContext] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._stats = {"launches": 0, "contexts_created": 0, "contexts_recycled": 0, "pages": 0, "blocked_requests": 0}
+
+    async def _ensure_browser(self) -> "Browser":
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning(f"[ブラウザプール] {self.name}: ブラウザが切断されたため再起動します")
+                await self._discard_all()
+            if self._playwright is None:
+                # playwright の読み込みは重いため、最初に使うときまで遅らせる
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=BROWSER_HEADLESS)
+            self._stats["launches"] += 1
+            logger.info(f"🧭 [ブラウザプール] {self.name}: Chromiumを起動しました（同時{self.size}コンテキスト / {self.max_uses}回で作り直し）")
+            return self._browser
+
+    async def _new_context(self, browser: "Browser") -> _PooledContext:
+        state = self.storage_state if self.storage_state and os.path.exists(self.storage_state) else None
+        if self.storage_state and state is None:
+            logger.warning(f"[ブラウザプール] {self.name}: {self.storage_state} が無いため未ログインのコンテキストを使います")
+        context = await browser.new_context(storage_state=state)
+        if self.blocked_resource_types or self.blocked_url:
+            await context.route("**/*", self._route)
+        self._stats["contexts_created"] += 1
+        return _PooledContext(context)
+
+    async def _route(self, route: "Route"):
+        request = route.request
+        if request.resource_type in self.blocked_resource_types or (self.blocked_url and self.blocked_url.search(request.url)):
+            self._stats["blocked_requests"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _close_context(self, pooled: _PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"[ブラウザプール] コンテキストのクローズに失敗: {e}")
+
+    async def _discard_all(self):
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._close_context(pooled)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator["Page"]:
+        """ プールのコンテキストで新しいページを開いて貸し出す（上限を超える分は空きを待つ） """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            browser = await self._ensure_browser()
+            pooled = self._idle.pop() if self._idle else await self._new_context(browser)
+            try:
+                page = await pooled.context.new_page()
+            except Exception:
+                self._stats["contexts_recycled"] += 1
+                await self._close_context(pooled)
+                raise
+            self._stats["pages"] += 1
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                pooled.uses += 1
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+                if healthy and pooled.uses < self.max_uses and browser.is_connected():
+                    self._idle.append(pooled)
+                else:
+                    self._stats["contexts_recycled"] += 1
+                    await self._close_context(pooled)
+
+    async def close(self):
+        await self._discard_all()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.debug(f"[ブラウザプール] ブラウザのクローズに失敗: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._slots = None
+        self._launch_lock = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self._browser is not None,
+            "size": self.size,
+            "idle_contexts": len(self._idle),
+            "max_uses": self.max_uses,
+            **self._stats,
+        }
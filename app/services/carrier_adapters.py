@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+# 各社スクレイパーはプロセス起動時に一度だけ import する
+# （以前は subprocess で毎回インタプリタを起動し、openai/bs4/dotenv を再 import していた）
+from app import get_pdf_links as one_links
+from app import get_cosco_pdf_links as cosco_links
+from app import get_kinka_pdf_links as kinka_links
+from app import get_shipmentlink_pdf_links as shipmentlink_links
+from app.services.instrumentation import track_stage
+
+logger = logging.getLogger(__name__)
+
+
+class CarrierAdapter(ABC):
+    """ 船会社ごとのPDFリンク取得インターフェース """
+
+    name: str = ""
+    # PDFリンクが地域カテゴリだけで決まる（resolve_region / fetch_region_links を実装している）か
+    has_regions: bool = False
+
+    def is_applicable(self, departure: str, destination: str) -> bool:
+        """ このリクエストで検索対象とするかどうか """
+        return True
+
+    @abstractmethod
+    async def fetch_links(self, departure: str, destination: str) -> List[str]:
+        """ 出発港・目的地に該当するスケジュールPDFのURL """
+
+    async def fetch_all_links(self) -> List[str]:
+        """ 全地域カテゴリのPDFリンク（事前クロール用） """
+        return []
+
+    async def resolve_region(self, departure: str, destination: str) -> Optional[str]:
+        """ PDFリンクが地域カテゴリだけで決まる船会社は、その地域カテゴリを返す（一括検索で地域ごとにリンク取得を共有する） """
+        return None
+
+    async def fetch_region_links(self, region: str) -> List[str]:
+        """ resolve_region が返した地域カテゴリのPDFリンク """
+        return []
+
+    async def get_region(self, departure: str, destination: str) -> Optional[str]:
+        """ 地域カテゴリを判定し（"region" として計測）、地域カテゴリを使わない船会社・失敗時は None を返す """
+        if not self.has_regions:
+            return None
+        try:
+            with track_stage("region", self.name):
+                return await self.resolve_region(departure, destination)
+        except Exception as e:
+            logger.error(f"[ERROR] {self.name} 地域判定失敗: {e}")
+            return None
+
+    async def list_precrawl_links(self) -> List[str]:
+        try:
+            return list(await self.fetch_all_links() or [])
+        except Exception as e:
+            logger.error(f"[ERROR] {self.name} 事前クロール用PDFリンク取得失敗: {e}")
+            return []
+
+    async def get_pdf_links(self, departure: str, destination: str, region: Optional[str] = None) -> List[str]:
+        """
+        スクレイパーを実行し、失敗時は空リストを返す（地域カテゴリ判定済みの場合はその地域のリンク）。
+        地域カテゴリの判定は "region"、ページ取得は "links" として別々に計測する。
+        """
+        if self.has_regions and region is None:
+            region = await self.get_region(departure, destination)
+            if region is None:
+                return []
+        try:
+            if region is not None:
+                with track_stage("links", self.name):
+                    links = await self.fetch_region_links(region)
+            else:
+                # 地域カテゴリを使わない船会社は、スクレイパー側で "region" / "links" を計測する
+                links = await self.fetch_links(departure, destination)
+            logger.info(f"[{self.name} PDFリンク取得] {links}")
+            return list(links or [])
+        except Exception as e:
+            logger.error(f"[ERROR] {self.name} get_pdf_links 実行失敗: {e}")
+            return []
+
+
+class OneAdapter(CarrierAdapter):
+    name = "ONE"
+    has_regions = True
+
+    async def fetch_links(self, departure: str, destination: str) -> List[str]:
+        return await one_links.get_pdf_links(destination, silent=True)
+
+    async def fetch_all_links(self) -> List[str]:
+        return await one_links.get_all_region_pdf_links()
+
+    async def resolve_region(self, departure: str, destination: str) -> Optional[str]:
+        return await asyncio.to_thread(one_links.get_region_by_chatgpt, destination, True)
+
+    async def fetch_region_links(self, region: str) -> List[str]:
+        return await one_links.get_pdf_links_for_region(region, silent=True)
+
+
+class CoscoAdapter(CarrierAdapter):
+    name = "COSCO"
+    has_regions = True
+
+    async def fetch_links(self, departure: str, destination: str) -> List[str]:
+        return await cosco_links.get_pdf_links(destination, silent=True)
+
+    async def fetch_all_links(self) -> List[str]:
+        # COSCO社はURLを組み立てるだけで通信しない
+        return cosco_links.get_all_region_pdf_links()
+
+    async def resolve_region(self, departure: str, destination: str) -> Optional[str]:
+        return await asyncio.to_thread(cosco_links.get_region_by_chatgpt, destination, True)
+
+    async def fetch_region_links(self, region: str) -> List[str]:
+        return cosco_links.get_pdf_links_for_region(region, silent=True)
+
+
+class KinkaAdapter(CarrierAdapter):
+    name = "KINKA"
+    has_regions = True
+
+    # KINKA社は目的地が「上海」の場合のみ検索対象
+    def is_applicable(self, departure: str, destination: str) -> bool:
+        return "上海" in destination or "shanghai" in destination.lower()
+
+    async def fetch_links(self, departure: str, destination: str) -> List[str]:
+        return await kinka_links.get_fixed_pdf_link_for_shanghai()
+
+    async def fetch_all_links(self) -> List[str]:
+        return await kinka_links.get_fixed_pdf_link_for_shanghai()
+
+    async def resolve_region(self, departure: str, destination: str) -> Optional[str]:
+        return "SHANGHAI"  # 上海向けの固定PDFのみ
+
+    async def fetch_region_links(self, region: str) -> List[str]:
+        return await kinka_links.get_fixed_pdf_link_for_shanghai()
+
+
+class ShipmentlinkAdapter(CarrierAdapter):
+    name = "Shipmentlink"
+
+    # Shipmentlink社のリンクは出発港ごとの結果ページと目的地名でも絞り込むため、地域カテゴリでは共有しない
+
+    async def fetch_links(self, departure: str, destination: str) -> List[str]:
+        raw_links = await shipmentlink_links.get_pdf_links(departure, destination, silent=True)
+        return [unquote(url) for url in raw_links]  # URLデコードして返す
+
+    async def fetch_all_links(self) -> List[str]:
+        return [unquote(url) for url in await shipmentlink_links.get_all_region_pdf_links()]
+
+
+# 検索順に並べた登録済みアダプタ
+CARRIER_ADAPTERS: Dict[str, CarrierAdapter] = {}
+
+
+def register_adapter(adapter: CarrierAdapter) -> CarrierAdapter:
+    CARRIER_ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+for _adapter in (OneAdapter(), CoscoAdapter(), KinkaAdapter(), ShipmentlinkAdapter()):
+    register_adapter(_adapter)
@@ -0,0 +1,373 @@
+import os
+import uuid
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.database import get_db_connection
+from app.services.port_aliases import canonical_port
+from app.services.sqlite_store import CACHE_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# 選定結果（decision）と利用者のフィードバックを保存する schedule_decisions テーブル（MySQL、ローカルではSQLiteも可）
+DECISION_LOG_BACKEND = os.getenv("DECISION_LOG_BACKEND", "mysql")
+DECISION_LOG_SQLITE_PATH = os.getenv("DECISION_LOG_SQLITE_PATH", os.path.join(CACHE_DIR, "decisions.sqlite3"))
+# 書き込みはメモリ上に溜めて、この間隔またはこの件数ごとにまとめて保存する
+DECISION_LOG_FLUSH_SECONDS = float(os.getenv("DECISION_LOG_FLUSH_SECONDS", "2"))
+DECISION_LOG_BATCH_SIZE = int(os.getenv("DECISION_LOG_BATCH_SIZE", "200"))
+# 保存に失敗し続けた場合にメモリ上に保持する上限（超えた分は古いものから捨てる）
+DECISION_LOG_MAX_BUFFER = int(os.getenv("DECISION_LOG_MAX_BUFFER", "10000"))
+# 一括保存にこの回数失敗した記録は1件ずつ保存し直し、それでも失敗するもの（不正なデータ）は破棄する
+DECISION_LOG_MAX_ATTEMPTS = int(os.getenv("DECISION_LOG_MAX_ATTEMPTS", "3"))
+# 「正解」とみなすフィードバックの値（カンマ区切り、大文字小文字は区別しない）。それ以外は不正解として集計する
+DECISION_FEEDBACK_POSITIVE = {
+    v.strip().lower() for v in os.getenv("DECISION_FEEDBACK_POSITIVE", "good,correct,ok,yes,true,1,正しい,正解").split(",") if v.strip()
+}
+
+MYSQL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS schedule_decisions (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        decision_id CHAR(32) NOT NULL,
+        created_at DATETIME NOT NULL,
+        carrier VARCHAR(64) NOT NULL DEFAULT '',
+        departure_port VARCHAR(64) NOT NULL DEFAULT '',
+        destination_port VARCHAR(64) NOT NULL DEFAULT '',
+        input_date VARCHAR(32) NOT NULL DEFAULT '',
+        schedule_url VARCHAR(1024) NOT NULL,
+        etd VARCHAR(32) NOT NULL DEFAULT '',
+        eta VARCHAR(32) NOT NULL DEFAULT '',
+        vessel VARCHAR(128) NOT NULL DEFAULT '',
+        voyage VARCHAR(64) NOT NULL DEFAULT '',
+        source VARCHAR(16) NOT NULL DEFAULT '',
+        feedback VARCHAR(255) NULL,
+        is_correct TINYINT NULL,
+        feedback_at DATETIME NULL,
+        UNIQUE KEY uq_decisions_id (decision_id),
+        KEY idx_decisions_carrier (carrier, created_at, is_correct),
+        KEY idx_decisions_lane (departure_port, destination_port, created_at, is_correct),
+        KEY idx_decisions_answer (schedule_url(255), etd, eta)
+    )
+    """,
+]
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS schedule_decisions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        decision_id TEXT NOT NULL UNIQUE,
+        created_at TEXT NOT NULL,
+        carrier TEXT NOT NULL DEFAULT '',
+        departure_port TEXT NOT NULL DEFAULT '',
+        destination_port TEXT NOT NULL DEFAULT '',
+        input_date TEXT NOT NULL DEFAULT '',
+        schedule_url TEXT NOT NULL,
+        etd TEXT NOT NULL DEFAULT '',
+        eta TEXT NOT NULL DEFAULT '',
+        vessel TEXT NOT NULL DEFAULT '',
+        voyage TEXT NOT NULL DEFAULT '',
+        source TEXT NOT NULL DEFAULT '',
+        feedback TEXT,
+        is_correct INTEGER,
+        feedback_at TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_decisions_carrier ON schedule_decisions (carrier, created_at, is_correct)",
+    "CREATE INDEX IF NOT EXISTS idx_decisions_lane ON schedule_decisions (departure_port, destination_port, created_at, is_correct)",
+    "CREATE INDEX IF NOT EXISTS idx_decisions_answer ON schedule_decisions (schedule_url, etd, eta)",
+]
+
+DECISION_COLUMNS = (
+    "decision_id", "created_at", "carrier", "departure_port", "destination_port", "input_date",
+    "schedule_url", "etd", "eta", "vessel", "voyage", "source",
+)
+
+# ("decision", 行) または ("feedback", (decision_id, url, etd, eta, feedback, 受信時刻)) を、保存に失敗した回数と共に到着順に保持する
+Entry = Tuple[str, tuple, int]
+
+_buffer: Deque[Entry] = deque()
+_dropped = 0
+_flush_event: Optional[asyncio.Event] = None
+_flush_lock: Optional[asyncio.Lock] = None
+_task: Optional[asyncio.Task] = None
+
+
+def _connect():
+    if DECISION_LOG_BACKEND == "sqlite":
+        return connect(DECISION_LOG_SQLITE_PATH)
+    return get_db_connection()
+
+
+def _sql(query: str) -> str:
+    # SQLiteのプレースホルダは "?"
+    return query.replace("%s", "?") if DECISION_LOG_BACKEND == "sqlite" else query
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ensure_schema():
+    """ schedule_decisions テーブルとインデックスを作成（存在する場合は何もしない） """
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        for statement in (SQLITE_SCHEMA if DECISION_LOG_BACKEND == "sqlite" else MYSQL_SCHEMA):
+            cursor.execute(statement)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _trim_buffer(limit: int):
+    """ 上限を超えた分を古いものから捨てる """
+    global _dropped
+    while len(_buffer) > limit:
+        _buffer.popleft()
+        _dropped += 1
+        if _dropped % 100 == 1:
+            logger.warning(f"[決定ログ] バッファが上限（{DECISION_LOG_MAX_BUFFER}件）に達したため古い記録を破棄しました（累計 {_dropped}件）")
+
+
+def _enqueue(kind: str, row: tuple):
+    _trim_buffer(DECISION_LOG_MAX_BUFFER - 1)
+    _buffer.append((kind, row, 0))
+    if _flush_event is not None and len(_buffer) >= DECISION_LOG_BATCH_SIZE:
+        _flush_event.set()
+
+
+def is_correct_feedback(feedback: str) -> bool:
+    return feedback.strip().lower() in DECISION_FEEDBACK_POSITIVE
+
+
+def record_decision(
+    carrier: str,
+    departure: str,
+    destination: str,
+    input_date: str,
+    schedule_url: str,
+    etd: Optional[str],
+    eta: Optional[str],
+    vessel: Optional[str],
+    voyage: Optional[str],
+    source: str
+) -> str:
+    """ 選定結果を書き込み待ちに追加し、フィードバック用の decision_id を返す（I/Oは行わない） """
+    decision_id = uuid.uuid4().hex
+    # 列の長さを超える値で一括保存全体が失敗しないよう切り詰める
+    _enqueue("decision", (
+        decision_id, _now(), (carrier or "")[:64], canonical_port(departure)[:64], canonical_port(destination)[:64],
+        (input_date or "")[:32], schedule_url[:1024], (etd or "")[:32], (eta or "")[:32], (vessel or "")[:128],
+        (voyage or "")[:64], source,
+    ))
+    return decision_id
+
+
+def record_feedback(feedback: str, decision_id: Optional[str] = None, url: str = "", etd: str = "", eta: str = ""):
+    """
+    フィードバックを書き込み待ちに追加する。
+    decision_id が無い場合は同じURL・ETD・ETAの直近の選定結果に紐付ける（見つからなければ単独の行として残す）
+    """
+    _enqueue("feedback", (decision_id, url[:1024], etd[:32], eta[:32], feedback[:255], _now()))
+
+
+def _apply_feedback(cursor, decision_id: Optional[str], url: str, etd: str, eta: str, feedback: str, received_at: str):
+    if decision_id:
+        cursor.execute(_sql("SELECT id FROM schedule_decisions WHERE decision_id = %s"), (decision_id,))
+    else:
+        cursor.execute(
+            _sql(
+                "SELECT id FROM schedule_decisions WHERE schedule_url = %s AND etd = %s AND eta = %s AND created_at <= %s "
+                "ORDER BY id DESC LIMIT 1"
+            ),
+            (url, etd, eta, received_at),
+        )
+    row = cursor.fetchone()
+    correct = 1 if is_correct_feedback(feedback) else 0
+    if row:
+        cursor.execute(
+            _sql("UPDATE schedule_decisions SET feedback = %s, is_correct = %s, feedback_at = %s WHERE id = %s"),
+            (feedback, correct, received_at, row[0]),
+        )
+        return
+    logger.info(f"[決定ログ] 対応する選定結果が見つからないフィードバックを記録: URL={url}, ETD={etd}, ETA={eta}")
+    placeholders = ", ".join(["%s"] * (len(DECISION_COLUMNS) + 3))
+    cursor.execute(
+        _sql(f"INSERT INTO schedule_decisions ({', '.join(DECISION_COLUMNS)}, feedback, is_correct, feedback_at) VALUES ({placeholders})"),
+        (uuid.uuid4().hex, received_at, "", "", "", "", url, etd, eta, "", "", "feedback",
+         feedback, correct, received_at),
+    )
+
+
+def _write_items(conn, items: List[Entry]):
+    """ 到着順に保存する（フィードバックより前に届いた選定結果は先に INSERT される） """
+    insert_sql = _sql(
+        f"INSERT INTO schedule_decisions ({', '.join(DECISION_COLUMNS)}) VALUES ({', '.join(['%s'] * len(DECISION_COLUMNS))})"
+    )
+    cursor = conn.cursor()
+    try:
+        pending: List[tuple] = []
+        for kind, row, _ in items:
+            if kind == "decision":
+                pending.append(row)
+                continue
+            if pending:
+                cursor.executemany(insert_sql, pending)
+                pending = []
+            _apply_feedback(cursor, *row)
+        if pending:
+            cursor.executemany(insert_sql, pending)
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception as e:
+            logger.debug(f"[決定ログ] ロールバックに失敗: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def _write_batch(items: List[Entry]) -> Tuple[int, List[Entry]]:
+    """
+    まとめて保存し、(保存した件数, 次回に持ち越す記録) を返す。
+    接続できない場合（DB障害）は例外をそのまま送出し、失敗回数には数えない。
+    """
+    conn = _connect()
+    try:
+        try:
+            _write_items(conn, items)
+            return len(items), []
+        except Exception as e:
+            logger.warning(f"[決定ログ] {len(items)}件の一括保存に失敗（次回再試行）: {e}")
+
+        failed = [(kind, row, attempts + 1) for kind, row, attempts in items]
+        retry = [entry for entry in failed if entry[2] < DECISION_LOG_MAX_ATTEMPTS]
+        saved = 0
+        # 失敗し続けている記録は1件ずつ保存して、保存できないものだけを特定して捨てる
+        for entry in failed:
+            if entry[2] < DECISION_LOG_MAX_ATTEMPTS:
+                continue
+            try:
+                _write_items(conn, [entry])
+                saved += 1
+            except Exception as e:
+                logger.error(f"[決定ログ] {DECISION_LOG_MAX_ATTEMPTS}回保存に失敗したため破棄しました: {entry[0]} {entry[1][:1]}（{e}）")
+        return saved, retry
+    finally:
+        conn.close()
+
+
+async def flush() -> int:
+    """ 書き込み待ちをまとめて保存し、保存した件数を返す。失敗した場合は次回に持ち越す """
+    global _flush_lock
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+    async with _flush_lock:
+        if not _buffer:
+            return 0
+        items = [_buffer.popleft() for _ in range(len(_buffer))]
+        try:
+            saved, retry = await asyncio.to_thread(_write_batch, items)
+        except Exception as e:
+            logger.warning(f"[決定ログ] 接続できないため{len(items)}件の保存を次回に持ち越します: {e}")
+            saved, retry = 0, items
+        if retry:
+            # 保存待ちの間に届いた記録より前に戻し、上限を超えた分は _enqueue と同じく古いものから捨てる
+            _buffer.extendleft(reversed(retry))
+            _trim_buffer(DECISION_LOG_MAX_BUFFER)
+        return saved
+
+
+async def _flush_loop():
+    assert _flush_event is not None
+    while True:
+        try:
+            await asyncio.wait_for(_flush_event.wait(), timeout=DECISION_LOG_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_event.clear()
+        await flush()
+
+
+async def start_decision_log() -> Optional[asyncio.Task]:
+    """ テーブルを用意して定期保存を開始する """
+    global _flush_event, _task
+    try:
+        await asyncio.to_thread(ensure_schema)
+    except Exception as e:
+        logger.warning(f"[決定ログ] schedule_decisions テーブルの準備に失敗（保存時に再試行）: {e}")
+    _flush_event = asyncio.Event()
+    _task = asyncio.create_task(_flush_loop())
+    logger.info(f"📝 [決定ログ] 保存先: {DECISION_LOG_BACKEND}（{DECISION_LOG_FLUSH_SECONDS}秒 / {DECISION_LOG_BATCH_SIZE}件ごとに保存）")
+    return _task
+
+
+async def stop_decision_log():
+    """ 定期保存を止め、残っている書き込み待ちを保存する """
+    global _flush_event, _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+    _flush_event = None
+    saved = await flush()
+    if _buffer:
+        logger.warning(f"[決定ログ] 終了時に {len(_buffer)}件を保存できませんでした。")
+    elif saved:
+        logger.info(f"[決定ログ] 終了時に {saved}件を保存しました。")
+
+
+def _accuracy_rows(rows) -> List[Dict[str, Any]]:
+    results = []
+    for *keys, decisions, rated, correct in rows:
+        rated = int(rated or 0)
+        correct = int(correct or 0)
+        results.append({
+            "keys": keys,
+            "decisions": int(decisions or 0),
+            "rated": rated,
+            "correct": correct,
+            "accuracy": round(correct / rated, 4) if rated else None,
+        })
+    return results
+
+
+def get_accuracy_stats(since_days: Optional[int] = None) -> Dict[str, Any]:
+    """ 船会社別・航路別の正解率（フィードバックのあった選定結果のうち正解の割合） """
+    since = (datetime.now() - timedelta(days=since_days)).strftime("%Y-%m-%d %H:%M:%S") if since_days else "1970-01-01 00:00:00"
+    aggregates = "COUNT(*), COUNT(is_correct), SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END)"
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            _sql(f"SELECT carrier, {aggregates} FROM schedule_decisions WHERE created_at >= %s AND source <> 'feedback' GROUP BY carrier"),
+            (since,),
+        )
+        carriers = _accuracy_rows(cursor.fetchall())
+        cursor.execute(
+            _sql(
+                f"SELECT departure_port, destination_port, {aggregates} FROM schedule_decisions "
+                "WHERE created_at >= %s AND source <> 'feedback' GROUP BY departure_port, destination_port"
+            ),
+            (since,),
+        )
+        lanes = _accuracy_rows(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+
+    for row in carriers:
+        row["carrier"] = row.pop("keys")[0]
+    for row in lanes:
+        row["departure"], row["destination"] = row.pop("keys")
+    return {
+        "since_days": since_days,
+        "carriers": sorted(carriers, key=lambda r: r["decisions"], reverse=True),
+        "lanes": sorted(lanes, key=lambda r: r["decisions"], reverse=True),
+        "pending_writes": len(_buffer),
+    }
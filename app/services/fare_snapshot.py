@@ -0,0 +1,145 @@
+import os
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.database import fetch_all
+
+logger = logging.getLogger(__name__)
+
+# faredate テーブルのメモリ上スナップショット（(出発港, 目的地) → {船会社: 運賃}）
+# キーはMySQLの照合順序と同じく大文字小文字・前後の空白を区別しない形に正規化して持つ
+FARE_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("FARE_SNAPSHOT_REFRESH_SECONDS", "600"))
+
+# CHECKSUM TABLE の結果が変わった時だけ全行を読み直す
+FARE_CHECKSUM_QUERY = "CHECKSUM TABLE faredate"
+FARE_SNAPSHOT_QUERY = """
+    SELECT departure_port, destination_port, shipping_company, freight_rate_usd
+    FROM faredate;
+"""
+
+Lane = Tuple[str, str]
+
+_rates: Dict[Lane, Dict[str, float]] = {}
+_row_count = 0
+_rate_count = 0
+_loaded_at: Optional[float] = None
+_checked_at: Optional[float] = None
+_checksum: Any = None
+_lock = asyncio.Lock()
+
+
+def _normalize(value: Any) -> str:
+    return str(value or "").strip().casefold()
+
+
+def _lane_key(departure_port: str, destination_port: str) -> Lane:
+    return (_normalize(departure_port), _normalize(destination_port))
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # ✅ Decimal を float に変換
+    if isinstance(value, (Decimal, int, float)):
+        return float(value)
+    logger.warning(f"Unexpected data type for freight_rate_usd: {type(value)}")
+    return None
+
+
+async def _table_checksum() -> Any:
+    try:
+        rows = await fetch_all(FARE_CHECKSUM_QUERY)
+        return rows[0].get("Checksum") if rows else None
+    except Exception as e:
+        logger.warning(f"[WARN] faredate のチェックサム取得に失敗（全件読み直します）: {e}")
+        return None
+
+
+async def refresh_snapshot(force: bool = False) -> bool:
+    """ faredate が変わっていればスナップショットを作り直す。更新した場合 True """
+    global _rates, _row_count, _rate_count, _loaded_at, _checked_at, _checksum
+    async with _lock:
+        checksum = await _table_checksum()
+        _checked_at = time.time()
+        if not force and _loaded_at is not None and checksum is not None and checksum == _checksum:
+            return False
+
+        rows = await fetch_all(FARE_SNAPSHOT_QUERY)
+        rates: Dict[Lane, Dict[str, float]] = {}
+        for row in rows:
+            lane = _lane_key(row["departure_port"], row["destination_port"])
+            company = _normalize(row["shipping_company"])
+            if company in rates.get(lane, {}):
+                continue  # 同じ航路・船会社の行が複数ある場合は最初の1件を採用
+            value = _to_float(row["freight_rate_usd"])
+            if value is not None:
+                rates.setdefault(lane, {})[company] = value
+
+        # 差分をログに残してから参照を差し替える（読み取り側はロック不要）
+        old = {(lane, c): v for lane, fares in _rates.items() for c, v in fares.items()}
+        new = {(lane, c): v for lane, fares in rates.items() for c, v in fares.items()}
+        added = len(new.keys() - old.keys())
+        removed = len(old.keys() - new.keys())
+        changed = sum(1 for key in new.keys() & old.keys() if new[key] != old[key])
+
+        _rates = rates
+        _row_count = len(rows)
+        _rate_count = len(new)
+        _checksum = checksum
+        _loaded_at = time.time()
+        logger.info(
+            f"💴 運賃スナップショットを更新: {_row_count}行 → {_rate_count}件（追加{added} / 変更{changed} / 削除{removed}）"
+        )
+        return True
+
+
+async def invalidate_snapshot() -> bool:
+    """ 明示的な無効化。チェックサムに関わらず読み直す """
+    return await refresh_snapshot(force=True)
+
+
+def is_loaded() -> bool:
+    return _loaded_at is not None
+
+
+def get_lane_rates(departure_port: str, destination_port: str, shipping_companies: Iterable[str]) -> Dict[str, float]:
+    """ 指定した船会社の {船会社: 運賃} を返す（港名・船会社名の大文字小文字と前後の空白は区別しない。未読込の場合は空） """
+    fares = _rates.get(_lane_key(departure_port, destination_port), {})
+    return {company: fares[_normalize(company)] for company in shipping_companies if _normalize(company) in fares}
+
+
+def get_snapshot_stats() -> Dict[str, Any]:
+    now = time.time()
+    return {
+        "loaded": is_loaded(),
+        "row_count": _row_count,  # faredate から読み込んだ行数
+        "rate_count": _rate_count,  # 航路・船会社ごとの運賃の件数（重複行を除く）
+        "lane_count": len(_rates),
+        "age_seconds": round(now - _loaded_at, 1) if _loaded_at else None,
+        "checked_seconds_ago": round(now - _checked_at, 1) if _checked_at else None,
+        "refresh_interval_seconds": FARE_SNAPSHOT_REFRESH_SECONDS,
+    }
+
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(FARE_SNAPSHOT_REFRESH_SECONDS)
+        try:
+            await refresh_snapshot()
+        except Exception as e:
+            logger.warning(f"[WARN] 運賃スナップショットの更新に失敗（前回の内容を継続使用）: {e}")
+
+
+async def start_snapshot_refresh() -> asyncio.Task:
+    """ 起動時に初回読込を行い、定期更新タスクを開始する """
+    try:
+        await refresh_snapshot(force=True)
+    except Exception as e:
+        logger.warning(f"[WARN] 運賃スナップショットの初回読込に失敗（DBへの直接問い合わせで代替）: {e}")
+    return asyncio.create_task(_refresh_loop())
+
+
+async def stop_snapshot_refresh(task: asyncio.Task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
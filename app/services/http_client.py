@@ -0,0 +1,62 @@
+import os
+import logging
+import importlib.util
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 各社サイト・PDFへのアクセスで共有する非同期HTTPクライアント（ホストごとに接続を再利用）
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+# HTTP/2 は h2 パッケージ（httpx[http2]）がある場合のみ有効
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    client = httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers=DEFAULT_HEADERS,
+        follow_redirects=True,
+    )
+    # 共有クライアントにはCookieを溜めない（必要なスクレイパーは呼び出しごとにヘッダーで渡す）
+    client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return client
+
+
+async def start_http_client():
+    """ アプリ起動時に共有クライアントを作成する """
+    global _client
+    if _client is None:
+        _client = _create_client()
+        logger.info(f"🌐 共有HTTPクライアントを作成しました（HTTP/2: {'有効' if HTTP2_ENABLED else '無効'}）")
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """ 共有クライアントを返す（CLI実行などライフスパン外では初回に作成） """
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
@@ -0,0 +1,48 @@
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 処理中の船会社（run_carrier_pipeline で設定。asyncio のタスクには自動で引き継がれる）
+current_carrier: ContextVar[str] = ContextVar("current_carrier", default="")
+
+
+class StageTiming(NamedTuple):
+    stage: str
+    carrier: str
+    seconds: float
+    ok: bool
+
+
+StageObserver = Callable[[StageTiming], None]
+
+_observers: List[StageObserver] = []
+
+
+def add_stage_observer(observer: StageObserver):
+    """ 各段階の所要時間を受け取る関数を登録する（ベンチマーク・メトリクス用） """
+    _observers.append(observer)
+
+
+@contextmanager
+def track_stage(stage: str, carrier: Optional[str] = None) -> Iterator[None]:
+    """
+    with ブロックの所要時間を stage（"region" / "links" / "download" / "parse" / "llm" / "db" など）として記録する。
+    例外で抜けた場合は ok=False で記録し、例外はそのまま送出する。
+    """
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        if _observers:
+            timing = StageTiming(stage, carrier if carrier is not None else current_carrier.get(), time.perf_counter() - started, ok)
+            for observer in list(_observers):
+                try:
+                    observer(timing)
+                except Exception as e:
+                    logger.warning(f"[WARN] 計測オブザーバーで例外: {e}")
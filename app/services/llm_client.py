@@ -0,0 +1,27 @@
+import os
+import logging
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from openai import AzureOpenAI
+
+logger = logging.getLogger(__name__)
+
+# main・各社スクレイパーで共有する Azure OpenAI クライアント
+# openai パッケージの読み込みは重いため、初回利用時（または起動後のウォームアップ）まで遅らせる
+_client: Optional["AzureOpenAI"] = None
+
+
+def get_llm_client() -> "AzureOpenAI":
+    """ 共有クライアントを返す（初回に openai を読み込んで作成） """
+    global _client
+    if _client is None:
+        from openai import AzureOpenAI
+
+        _client = AzureOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("OPENAI_API_BASE") or ""
+        )
+        logger.info("[DEBUG] OpenAI client initialized successfully.")
+    return _client
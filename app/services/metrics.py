@@ -0,0 +1,87 @@
+import logging
+from typing import Any, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from app.services.instrumentation import StageTiming, add_stage_observer, current_carrier
+
+logger = logging.getLogger(__name__)
+
+# /metrics で公開する Prometheus メトリクス
+STAGE_DURATION = Histogram(
+    "shipit_stage_duration_seconds",
+    "処理段階ごとの所要時間（region / links / download / parse / llm / db / request）",
+    ["stage", "carrier"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+STAGE_ERRORS = Counter(
+    "shipit_stage_errors_total",
+    "例外で終了した処理段階の数",
+    ["stage", "carrier"],
+)
+CACHE_REQUESTS = Counter(
+    "shipit_cache_requests_total",
+    "キャッシュの参照数（result=hit / miss）",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "shipit_llm_tokens_total",
+    "GPTの使用トークン数（purpose=schedule / region、kind=prompt / completion）",
+    ["purpose", "kind", "carrier"],
+)
+CARRIER_RESULTS = Counter(
+    "shipit_carrier_results_total",
+    "船会社ごとの結果（outcome=matched / unmatched / timeout / error）",
+    ["carrier", "outcome"],
+)
+PARSE_POOL_JOBS = Gauge(
+    "shipit_parse_pool_jobs",
+    "PDF解析プロセスプールのジョブ数（state=waiting / in_flight）",
+    ["state"],
+)
+PARSE_POOL_EVENTS = Counter(
+    "shipit_parse_pool_events_total",
+    "PDF解析プロセスプールのイベント数（event=completed / failed / timeout / recycle）",
+    ["event"],
+)
+
+
+def _observe_stage(timing: StageTiming):
+    STAGE_DURATION.labels(timing.stage, timing.carrier).observe(timing.seconds)
+    if not timing.ok:
+        STAGE_ERRORS.labels(timing.stage, timing.carrier).inc()
+
+
+add_stage_observer(_observe_stage)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_llm_usage(purpose: str, response: Any, carrier: Optional[str] = None):
+    """ chat.completions のレスポンスから使用トークン数を記録する """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    carrier = carrier if carrier is not None else current_carrier.get()
+    LLM_TOKENS.labels(purpose, "prompt", carrier).inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels(purpose, "completion", carrier).inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_carrier_result(carrier: str, outcome: str):
+    CARRIER_RESULTS.labels(carrier, outcome).inc()
+
+
+def record_parse_pool_jobs(waiting: int, in_flight: int):
+    PARSE_POOL_JOBS.labels("waiting").set(waiting)
+    PARSE_POOL_JOBS.labels("in_flight").set(in_flight)
+
+
+def record_parse_pool_event(event: str):
+    PARSE_POOL_EVENTS.labels(event).inc()
+
+
+def render_metrics() -> tuple:
+    """ (本文, Content-Type) """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,28 @@
+import logging
+from typing import Optional
+
+from app.services.port_aliases import contains_alias, get_port_aliases
+
+logger = logging.getLogger(__name__)
+
+
+def find_candidate_pages(content: bytes, destination: str) -> Optional[str]:
+    """
+    PyMuPDFのテキスト検索で目的地の港名を含むページを探し、Camelot用のページ指定（"1,4,5"）を返す。
+    絞り込めない場合（該当ページなし・全ページ該当）は None。
+    """
+    import fitz  # PyMuPDF（起動を軽くするため使用時に読み込む）
+
+    aliases = get_port_aliases(destination)
+    with fitz.open(stream=content, filetype="pdf") as doc:
+        page_count = doc.page_count
+        pages = [
+            str(page.number + 1)
+            for page in doc
+            if contains_alias(page.get_text().upper(), aliases)
+        ]
+
+    if not pages or len(pages) == page_count:
+        return None
+    logger.info(f"🔎 ページ絞り込み: {destination} → {len(pages)}/{page_count}ページ（{','.join(pages)}）")
+    return ",".join(pages)
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import logging
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+
+from app.services.metrics import record_parse_pool_event, record_parse_pool_jobs
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# PDF解析（Camelot/pdfminer）はCPU処理のため、イベントループとは別プロセスで実行する
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+# 実行中＋待機中のジョブがこの数を超えたら、空きが出るまで投入を待たせる
+PDF_PARSE_MAX_IN_FLIGHT = int(os.getenv("PDF_PARSE_MAX_IN_FLIGHT", "0")) or PDF_PARSE_WORKERS * 2
+PDF_PARSE_TIMEOUT_SECONDS = float(os.getenv("PDF_PARSE_TIMEOUT_SECONDS", "120"))
+# タイムアウト後も終わらないジョブがこの数に達したらプールを作り直し、止まったワーカーを終了させる
+PDF_PARSE_MAX_STUCK_JOBS = int(os.getenv("PDF_PARSE_MAX_STUCK_JOBS", "1"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+# 現在のプールで実行中のジョブと、そのうちタイムアウト後も終わっていないジョブ
+_running: Set["asyncio.Future[Any]"] = set()
+_stuck: Set["asyncio.Future[Any]"] = set()
+# 作り直し前のプールを停止するタスク
+_retiring: Set["asyncio.Task[None]"] = set()
+_stats = {"waiting": 0, "in_flight": 0, "completed": 0, "failed": 0, "timeouts": 0, "recycles": 0}
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    # uvicorn のスレッドを引き継がないよう spawn で起動する
+    return ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _publish_jobs():
+    record_parse_pool_jobs(_stats["waiting"], _stats["in_flight"])
+
+
+def start_parse_pool():
+    """ アプリ起動時にプロセスプールを作成する（CPUコア数分のワーカー） """
+    global _executor, _slots
+    if _executor is not None:
+        return
+    _executor = _create_executor()
+    _slots = asyncio.Semaphore(PDF_PARSE_MAX_IN_FLIGHT)
+    _publish_jobs()
+    logger.info(f"🧮 PDF解析プロセスプールを作成しました（{PDF_PARSE_WORKERS}ワーカー / 同時{PDF_PARSE_MAX_IN_FLIGHT}件）")
+
+
+def _import_modules(names: List[str]) -> int:
+    for name in names:
+        importlib.import_module(name)
+    return os.getpid()
+
+
+async def warm_parse_pool(modules: List[str]):
+    """ ワーカーを起動して解析用モジュールを読み込ませておく（初回の解析で import を待たないため） """
+    executor = _executor
+    if executor is None:
+        return
+    loop = asyncio.get_running_loop()
+    # ワーカー数分を同時に投入して全ワーカーを起動させる（どのワーカーが受け取るかは保証されない）
+    pids = await asyncio.gather(*[
+        loop.run_in_executor(executor, _import_modules, modules) for _ in range(PDF_PARSE_WORKERS)
+    ])
+    logger.info(f"🧮 PDF解析ワーカー{len(set(pids))}個で {', '.join(modules)} を読み込みました")
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    """ 実行中のジョブごとワーカープロセスを終了させる（残っていたジョブは BrokenProcessPool で失敗する） """
+    terminate = getattr(executor, "terminate_workers", None)  # Python 3.14 以降
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _retire(executor: ProcessPoolExecutor, running: Set["asyncio.Future[Any]"], stuck: Set["asyncio.Future[Any]"]):
+    """ 作り直し前のプールは、止まっていないジョブが終わるのを待ってから（最大でタイムアウト秒）ワーカーごと停止する """
+    try:
+        others = [future for future in running if future not in stuck]
+        if others:
+            await asyncio.wait(others, timeout=PDF_PARSE_TIMEOUT_SECONDS)
+    finally:
+        _terminate_workers(executor)
+
+
+def _recycle():
+    global _executor, _running, _stuck
+    if _executor is None:
+        return
+    executor, running, stuck = _executor, _running, _stuck
+    _executor, _running, _stuck = _create_executor(), set(), set()
+    _stats["recycles"] += 1
+    record_parse_pool_event("recycle")
+    logger.warning(f"♻️ PDF解析が{len(stuck)}件止まったままのため、プロセスプールを作り直しました（古いワーカーは実行中の解析の終了後に停止）")
+    task = asyncio.create_task(_retire(executor, running, stuck))
+    _retiring.add(task)
+    task.add_done_callback(_retiring.discard)
+
+
+async def stop_parse_pool():
+    global _executor, _slots, _running, _stuck
+    for task in list(_retiring):
+        task.cancel()
+    await asyncio.gather(*_retiring, return_exceptions=True)
+    if _executor is not None:
+        executor, running, stuck = _executor, _running, _stuck
+        _executor, _slots, _running, _stuck = None, None, set(), set()
+        # 止まったジョブで終了処理が止まらないよう、作り直し時と同じく最大でタイムアウト秒だけ待ってからワーカーを停止する
+        await _retire(executor, running, stuck)
+
+
+async def run_in_parse_pool(func: Callable[..., T], *args: Any, timeout: float = PDF_PARSE_TIMEOUT_SECONDS) -> T:
+    """
+    関数をプロセスプールで実行して結果を返す。タイムアウト時は TimeoutError。
+    プール未起動時（CLI実行など）はスレッドで実行する。
+    """
+    slots = _slots
+    if _executor is None or slots is None:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout)
+
+    _stats["waiting"] += 1
+    _publish_jobs()
+    if slots.locked():
+        logger.info(f"⏳ PDF解析の空き待ち（待機{_stats['waiting']}件 / 実行中{_stats['in_flight']}件）")
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+        _publish_jobs()
+
+    # 空きを待つ間にプールが作り直されている場合があるため、投入先は枠を得てから決める
+    executor, running = _executor, _running
+    if executor is None:
+        slots.release()
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout)
+
+    _stats["in_flight"] += 1
+    _publish_jobs()
+    future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    running.add(future)
+
+    def release(done: "asyncio.Future[T]"):
+        # タイムアウトで呼び出し元が先に戻っても、ワーカーが実際に終わる（または停止される）まで枠は空けない
+        running.discard(done)
+        _stuck.discard(done)
+        _stats["in_flight"] -= 1
+        if done.cancelled() or done.exception() is not None:
+            _stats["failed"] += 1
+            record_parse_pool_event("failed")
+        else:
+            _stats["completed"] += 1
+            record_parse_pool_event("completed")
+        _publish_jobs()
+        slots.release()
+
+    future.add_done_callback(release)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        record_parse_pool_event("timeout")
+        logger.error(f"❌ PDF解析が{timeout}秒以内に終わらなかったため打ち切りました")
+        if not future.done() and running is _running:
+            _stuck.add(future)
+            if len(_stuck) >= PDF_PARSE_MAX_STUCK_JOBS:
+                _recycle()
+        raise
+
+
+def get_parse_pool_stats() -> Dict[str, Any]:
+    return {
+        "workers": PDF_PARSE_WORKERS if _executor is not None else 0,
+        "max_in_flight": PDF_PARSE_MAX_IN_FLIGHT,
+        "timeout_seconds": PDF_PARSE_TIMEOUT_SECONDS,
+        "stuck": len(_stuck),
+        **_stats,
+    }
@@ -0,0 +1,214 @@
+import os
+import tempfile
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from app.services.http_client import get_http_client
+from app.services.instrumentation import track_stage
+from app.services.metrics import record_cache
+from app.services.sqlite_store import CACHE_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# スケジュールPDFのダウンロードキャッシュ（本体は内容のSHA-256で保存）
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(CACHE_DIR, "pdf"))
+# この秒数以内に取得したPDFは再検証せずにそのまま使う
+PDF_CACHE_FRESH_SECONDS = float(os.getenv("PDF_CACHE_FRESH_SECONDS", str(6 * 3600)))
+# キャッシュ全体の上限サイズ（超えたら最終アクセスが古いものから削除）
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+# 1件のPDFとして受け付ける最大サイズ（ストリーミング中に超えたら中断）
+PDF_MAX_DOWNLOAD_BYTES = int(os.getenv("PDF_MAX_DOWNLOAD_BYTES", str(100 * 1024 * 1024)))
+PDF_DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+_initialized = False
+
+
+class CachedPdf(NamedTuple):
+    sha256: str
+    content: bytes
+    from_cache: bool
+
+
+def _get_connection():
+    global _initialized
+    conn = connect(os.path.join(PDF_CACHE_DIR, "index.sqlite3"))
+    if not _initialized:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_cache (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_cache_sha256 ON pdf_cache (sha256)")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def _blob_path(sha256: str) -> Path:
+    return Path(PDF_CACHE_DIR) / "blobs" / f"{sha256}.pdf"
+
+
+def _read_blob(sha256: str) -> Optional[bytes]:
+    try:
+        return _blob_path(sha256).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write_blob(sha256: str, content: bytes):
+    path = _blob_path(sha256)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 同じPDFを複数スレッドが同時に保存しても衝突しないよう、一時ファイル名は毎回一意にする
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_name, path)  # 書き込み途中のファイルを他プロセスに見せない
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _touch(conn, url: str, fetched: bool = False):
+    now = time.time()
+    if fetched:
+        conn.execute("UPDATE pdf_cache SET last_access = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+    else:
+        conn.execute("UPDATE pdf_cache SET last_access = ? WHERE url = ?", (now, url))
+    conn.commit()
+
+
+def _evict(conn):
+    """ 上限サイズを超えた分を最終アクセスが古いPDFから削除（LRU） """
+    rows = conn.execute("""
+        SELECT sha256, MAX(size), MAX(last_access) AS accessed
+        FROM pdf_cache GROUP BY sha256 ORDER BY accessed ASC
+    """).fetchall()
+    total = sum(size for _, size, _ in rows)
+    for sha256, size, _ in rows:
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        conn.execute("DELETE FROM pdf_cache WHERE sha256 = ?", (sha256,))
+        try:
+            _blob_path(sha256).unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        logger.info(f"🧹 PDFキャッシュから削除しました: {sha256[:12]} ({size} bytes)")
+    conn.commit()
+
+
+def _lookup(url: str) -> Tuple[Optional[tuple], Optional[bytes]]:
+    conn = _get_connection()
+    try:
+        entry = conn.execute(
+            "SELECT sha256, etag, last_modified, fetched_at FROM pdf_cache WHERE url = ?", (url,)
+        ).fetchone()
+        return entry, (_read_blob(entry[0]) if entry else None)
+    finally:
+        conn.close()
+
+
+def _mark_used(url: str, fetched: bool = False):
+    conn = _get_connection()
+    try:
+        _touch(conn, url, fetched=fetched)
+    finally:
+        conn.close()
+
+
+def _store(url: str, sha256: str, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+    _write_blob(sha256, content)
+    conn = _get_connection()
+    try:
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO pdf_cache (url, sha256, etag, last_modified, size, fetched_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, sha256, etag, last_modified, len(content), now, now)
+        )
+        conn.commit()
+        _evict(conn)
+    finally:
+        conn.close()
+
+
+async def fetch_pdf(url: str, timeout: float = 30) -> Optional[CachedPdf]:
+    """
+    URLのPDFをキャッシュ経由で取得する。
+    鮮度期間内はディスクから返し、それ以降は ETag / Last-Modified で条件付きGETを行う。
+    ダウンロードは共有HTTPクライアントでストリーミングし、受信しながらハッシュを計算する。
+    """
+    entry, cached_content = await asyncio.to_thread(_lookup, url)
+
+    if entry and cached_content is not None and time.time() - entry[3] < PDF_CACHE_FRESH_SECONDS:
+        await asyncio.to_thread(_mark_used, url)
+        record_cache("pdf", True)
+        logger.info(f"📦 PDFキャッシュを使用（鮮度期間内）: {url}")
+        return CachedPdf(entry[0], cached_content, True)
+
+    headers = {}
+    if entry and cached_content is not None:
+        if entry[1]:
+            headers["If-None-Match"] = entry[1]
+        if entry[2]:
+            headers["If-Modified-Since"] = entry[2]
+
+    try:
+        with track_stage("download"):
+            async with get_http_client().stream("GET", url, headers=headers, timeout=timeout) as response:
+                if response.status_code == 304 and entry and cached_content is not None:
+                    await asyncio.to_thread(_mark_used, url, True)
+                    record_cache("pdf", True)
+                    logger.info(f"📦 PDFキャッシュを使用（304 Not Modified）: {url}")
+                    return CachedPdf(entry[0], cached_content, True)
+
+                if response.status_code != 200:
+                    logger.error(f"❌ PDFのダウンロードに失敗しました。ステータスコード: {response.status_code}")
+                    return None
+
+                digest = hashlib.sha256()
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes(PDF_DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > PDF_MAX_DOWNLOAD_BYTES:
+                        logger.error(f"❌ PDFが上限サイズ（{PDF_MAX_DOWNLOAD_BYTES} bytes）を超えたため中断しました: {url}")
+                        return None
+                    digest.update(chunk)
+                    chunks.append(chunk)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+    except Exception as e:
+        if entry and cached_content is not None:
+            logger.warning(f"[WARN] PDFの再検証に失敗したためキャッシュを使用します: {e}")
+            record_cache("pdf", True)
+            return CachedPdf(entry[0], cached_content, True)
+        logger.error(f"❌ PDFのダウンロードに失敗しました: {e}")
+        return None
+
+    content = b"".join(chunks)
+    sha256 = digest.hexdigest()
+    try:
+        await asyncio.to_thread(_store, url, sha256, content, etag, last_modified)
+    except Exception as e:
+        # キャッシュへの保存に失敗しても、ダウンロードした本文はそのまま使う
+        logger.warning(f"[WARN] PDFキャッシュへの保存に失敗しました: {url}: {e}")
+    record_cache("pdf", False)
+    logger.info(f"📥 PDFをダウンロードしてキャッシュしました: {url} ({len(content)} bytes)")
+    return CachedPdf(sha256, content, False)
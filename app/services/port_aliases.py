@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List
+
+# 目的地の表記揺れ（PDF上の港名・略号）
+DESTINATION_ALIASES: Dict[str, List[str]] = {
+    "New York": ["NEW YORK", "NYC", "NEWYORK", "N.Y.", "NY", "NYO"],
+    "Los Angeles": ["LOS ANGELES", "LA", "L.A."],
+    "Rotterdam": ["ROTTERDAM"],
+    "Hamburg": ["HAMBURG"],
+    "Norfolk": ["NORFOLK", "ORF"],
+    "Savannah": ["SAVANNAH", "SAV"],
+    "Charleston": ["CHARLESTON"],
+    "Miami": ["MIAMI", "MIA"],
+    "Oakland": ["OAKLAND", "OAK"],
+    "Houston": ["HOUSTON", "HOU"],
+    "Dallas": ["DALLAS", "FWO", "FORT WORTH", "FT WORTH"],
+    "Memphis": ["MEMPHIS", "MEM"],
+    "Atlanta": ["ATLANTA", "ATL"],
+    "Chicago": ["CHICAGO", "CHI"],
+    "Columbus": ["COLUMBUS", "CMH"],
+    "Singapore": ["SINGAPORE", "SGP"],
+    "Jakarta": ["JAKARTA"],
+    "Port Klang": ["PORT KLANG", "PORT KLANG (W)", "PORT KLANG (N)", "PKG", "PKW"],
+    "Penang": ["PENANG"],
+    "Surabaya": ["SURABAYA"],
+    "Bangkok": ["BANGKOK"],
+    "Ho Chi Minh": ["HO CHI MINH", "HCM", "SAIGON"],
+    "Haiphong": ["HAIPHONG", "HPH"],
+    "Hanoi": ["HANOI"],
+    "Manila": ["MANILA", "MNL"],
+    "Busan": ["BUSAN", "PUSAN", "PUS"],
+    "Hong Kong": ["HONG KONG", "HK", "HKG"],
+    "Kaohsiung": ["KAOHSIUNG", "KHH"],
+    "Sydney": ["SYDNEY", "SYD"],
+    "Melbourne": ["MELBOURNE", "MEL"],
+    "Adelaide": ["ADELAIDE", "ADL"],
+    "Fremantle": ["FREMANTLE", "FRE"],
+    "Brisbane": ["BRISBANE", "BNE"],
+    "Xiamen": ["XIAMEN"],
+    "Qingdao": ["QINGDAO", "TSINGTAO"],
+    "Dalian": ["DALIAN"],
+    "Shanghai": ["SHANGHAI", "SHA"],
+    "Ningbo": ["NINGBO"],
+    "Shekou": ["SHEKOU"],
+    "Yantian": ["YANTIAN", "YTN"],
+    "Nansha": ["NANSHA"],
+    "Shenzhen": ["SHENZHEN"],
+    "Tanjung Pelepas": ["TANJUNG PELEPAS", "TPP"],
+    "Port Kelang": ["PORT KELANG", "PORTKLANG"],  # 通称違い対応
+}
+
+# 出発港（日本）の表記揺れ
+DEPARTURE_ALIASES: Dict[str, List[str]] = {
+    "Tokyo": ["TOKYO", "東京"],
+    "Yokohama": ["YOKOHAMA", "横浜"],
+    "Osaka": ["OSAKA", "大阪"],
+    "Nagoya": ["NAGOYA", "名古屋"],
+    "Kobe": ["KOBE", "神戸"],
+}
+
+
+def get_port_aliases(port: str) -> List[str]:
+    """ 港名に対応する別名を大文字で返す（未登録の場合は港名そのもの） """
+    aliases = DESTINATION_ALIASES.get(port) or DEPARTURE_ALIASES.get(port.title()) or [port]
+    return [a.upper() for a in aliases]
+
+
+def contains_alias(text: str, aliases: List[str]) -> bool:
+    """ 別名を単語として含むか（"LA" が "PLACE" に一致しないよう前後が英字でないことを確認） """
+    text = text.upper()
+    return any(re.search(rf"(?<![A-Z]){re.escape(alias)}(?![A-Z])", text) for alias in aliases)
+
+
+def canonical_port(port: str) -> str:
+    """ 港名を別名テーブルのキー表記に揃える（"los angeles" → "Los Angeles"） """
+    name = " ".join(port.split())
+    for key in list(DESTINATION_ALIASES) + list(DEPARTURE_ALIASES):
+        if key.upper() == name.upper():
+            return key
+    return name.title()
@@ -0,0 +1,121 @@
+import os
+import random
+import asyncio
+import logging
+from datetime import datetime
+from collections import defaultdict
+from typing import IO, Dict, List, Optional
+from urllib.parse import urlparse
+
+from app.services.carrier_adapters import CARRIER_ADAPTERS, CarrierAdapter
+from app.services.schedule_tables import load_schedule_tables
+from app.services.schedule_parser import parse_all_sailings
+from app.services.sailings_store import upsert_sailings
+from app.services.sqlite_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# 全船会社・全地域のスケジュールPDFを定期的に取得・解析しておく事前クロール
+# 各社サイトへのアクセスが発生するため、既定では無効（クロールを担当するデプロイでのみ PRECRAWL_ENABLED=1 にする）
+PRECRAWL_ENABLED = os.getenv("PRECRAWL_ENABLED", "0") == "1"
+# 同じホストの複数ワーカープロセスのうち、このロックを取れた1プロセスだけがクロールする
+PRECRAWL_LOCK_PATH = os.getenv("PRECRAWL_LOCK_PATH", os.path.join(CACHE_DIR, "precrawl.lock"))
+PRECRAWL_INTERVAL_SECONDS = float(os.getenv("PRECRAWL_INTERVAL_SECONDS", str(6 * 3600)))
+PRECRAWL_JITTER_SECONDS = float(os.getenv("PRECRAWL_JITTER_SECONDS", "600"))
+PRECRAWL_INITIAL_DELAY_SECONDS = float(os.getenv("PRECRAWL_INITIAL_DELAY_SECONDS", "30"))
+# 同一ホストへの同時ダウンロード・解析数
+PRECRAWL_HOST_CONCURRENCY = int(os.getenv("PRECRAWL_HOST_CONCURRENCY", "2"))
+
+_host_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(PRECRAWL_HOST_CONCURRENCY))
+_lock_file: Optional[IO[str]] = None
+
+
+def _acquire_runner_lock() -> bool:
+    """ ホスト内でクロールを担当するプロセスを1つに絞る（ロックはプロセス終了時にも自動で解放される） """
+    global _lock_file
+    try:
+        import fcntl
+    except ImportError:
+        logger.warning("[事前クロール] fcntl が使えないため、プロセス間の排他を行わずに実行します。")
+        return True
+    os.makedirs(os.path.dirname(PRECRAWL_LOCK_PATH) or ".", exist_ok=True)
+    lock_file = open(PRECRAWL_LOCK_PATH, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    _lock_file = lock_file
+    return True
+
+
+def _release_runner_lock():
+    global _lock_file
+    if _lock_file is not None:
+        _lock_file.close()  # close でロックも解放される
+        _lock_file = None
+
+
+def get_precrawl_interval(carrier: str) -> float:
+    """ PRECRAWL_INTERVAL_SECONDS_<社名> で船会社ごとに間隔を変更可能 """
+    value = os.getenv(f"PRECRAWL_INTERVAL_SECONDS_{carrier.upper()}")
+    return float(value) if value else PRECRAWL_INTERVAL_SECONDS
+
+
+async def _precrawl_url(carrier: str, url: str) -> bool:
+    async with _host_semaphores[urlparse(url).netloc]:
+        try:
+            schedule = await load_schedule_tables(url, carrier=carrier)
+        except Exception as e:
+            logger.warning(f"[事前クロール] {carrier} {url} の解析に失敗: {e}")
+            return False
+    if schedule is None:
+        return False
+
+    # 表に含まれる全航路の航海レコードを sailings テーブルに保存
+    try:
+        sailings = await asyncio.to_thread(parse_all_sailings, schedule.tables, datetime.now())
+        count = await asyncio.to_thread(upsert_sailings, carrier, url, schedule.sha256, sailings)
+        logger.info(f"[事前クロール] {carrier} {url}: {count}件の航海を保存")
+    except Exception as e:
+        logger.warning(f"[事前クロール] {carrier} {url} の sailings 保存に失敗: {e}")
+    return True
+
+
+async def precrawl_carrier(adapter: CarrierAdapter) -> int:
+    """ 1社分の全PDFを取得・解析してキャッシュを温める。成功件数を返す """
+    urls = list(dict.fromkeys(await adapter.list_precrawl_links()))
+    results = await asyncio.gather(*[_precrawl_url(adapter.name, url) for url in urls])
+    logger.info(f"🗂 [事前クロール] {adapter.name}: {sum(results)}/{len(urls)}件のPDFを解析済み")
+    return sum(results)
+
+
+async def _precrawl_loop(adapter: CarrierAdapter):
+    await asyncio.sleep(PRECRAWL_INITIAL_DELAY_SECONDS + random.uniform(0, PRECRAWL_JITTER_SECONDS))
+    while True:
+        try:
+            await precrawl_carrier(adapter)
+        except Exception:
+            logger.exception(f"[事前クロール] {adapter.name} で例外")
+        await asyncio.sleep(get_precrawl_interval(adapter.name) + random.uniform(0, PRECRAWL_JITTER_SECONDS))
+
+
+def start_precrawl() -> List[asyncio.Task]:
+    if not PRECRAWL_ENABLED:
+        logger.info("[事前クロール] PRECRAWL_ENABLED=0 のため無効です。")
+        return []
+    if not _acquire_runner_lock():
+        logger.info(f"[事前クロール] 同じホストの別プロセスが実行中のため、このプロセスではクロールしません（{PRECRAWL_LOCK_PATH}）")
+        return []
+    return [asyncio.create_task(_precrawl_loop(adapter)) for adapter in CARRIER_ADAPTERS.values()]
+
+
+async def stop_precrawl(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _release_runner_lock()
@@ -0,0 +1,83 @@
+import os
+import logging
+from datetime import datetime
+from typing import List, Sequence, Tuple
+
+from app.services.port_aliases import contains_alias, get_port_aliases
+from app.services.schedule_parser import parse_cell_dates
+
+logger = logging.getLogger(__name__)
+
+# GPTに渡すテーブル部分のトークン上限
+LLM_TABLE_TOKEN_BUDGET = int(os.getenv("LLM_TABLE_TOKEN_BUDGET", "6000"))
+# 基準日の前後何日までの行を残すか
+LLM_DATE_WINDOW_DAYS = int(os.getenv("LLM_DATE_WINDOW_DAYS", "21"))
+# 各テーブル先頭の何行をヘッダーとして必ず残すか
+HEADER_ROWS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """ トークン数の概算（英数字は約4文字で1トークン、日本語などは1文字1トークン） """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def _render_row(cells: Sequence[str]) -> str:
+    return " | ".join(" ".join(str(cell).split()) for cell in cells)
+
+
+def build_table_context(
+    tables: Sequence,
+    departure: str,
+    destination: str,
+    base_date: datetime,
+    token_budget: int = LLM_TABLE_TOKEN_BUDGET
+) -> str:
+    """
+    テーブルからヘッダー行・港名を含む行・基準日付近の日付を含む行だけを残し、
+    トークン上限に収まるように基準日に近い行から順に採用してGPT用の文字列にする。
+    """
+    port_aliases = get_port_aliases(departure) + get_port_aliases(destination)
+    all_rows = [table.values.tolist() if hasattr(table, "values") else table for table in tables]
+
+    headers: List[Tuple[int, int]] = []
+    dated: List[Tuple[int, int, int]] = []  # (基準日との差, テーブル番号, 行番号)
+    others: List[Tuple[int, int]] = []
+    for t, rows in enumerate(all_rows):
+        for r, row in enumerate(rows):
+            cells = [str(cell) for cell in row]
+            if r < HEADER_ROWS or any(contains_alias(cell, port_aliases) for cell in cells):
+                headers.append((t, r))
+                continue
+            gaps = [abs((d - base_date).days) for cell in cells for d in parse_cell_dates(cell, base_date)]
+            if gaps and min(gaps) <= LLM_DATE_WINDOW_DAYS:
+                dated.append((min(gaps), t, r))
+            else:
+                others.append((t, r))
+
+    # 基準日付近の行が1件もない場合は、全行を元の順序で候補にする
+    candidates = [(t, r) for _, t, r in sorted(dated)] if dated else others
+
+    selected = set()
+    used_tokens = 0
+    for t, r in headers + candidates:
+        tokens = estimate_tokens(_render_row(all_rows[t][r])) + 1
+        if used_tokens + tokens > token_budget:
+            if (t, r) in headers:
+                continue
+            break
+        selected.add((t, r))
+        used_tokens += tokens
+
+    context = ""
+    for t, rows in enumerate(all_rows):
+        lines = [_render_row(row) for r, row in enumerate(rows) if (t, r) in selected]
+        if lines:
+            context += f"\n--- テーブル {t + 1} ---\n" + "\n".join(lines)
+
+    full_tokens = sum(estimate_tokens(_render_row(row)) + 1 for rows in all_rows for row in rows)
+    logger.info(
+        f"✂️ GPT用テーブル: {len(selected)}行 / 約{estimate_tokens(context)}トークン"
+        f"（全体 約{full_tokens}トークン、約{max(full_tokens - estimate_tokens(context), 0)}トークン削減）"
+    )
+    return context
@@ -0,0 +1,147 @@
+import logging
+from statistics import median
+from typing import List, Optional, Sequence, Tuple
+
+from app.services.port_aliases import DEPARTURE_ALIASES, DESTINATION_ALIASES, contains_alias
+
+logger = logging.getLogger(__name__)
+
+# 単語の座標（x0, y0, x1, y1, 文字列）
+Word = Tuple[float, float, float, float, str]
+# セル（x0, x1, 文字列）
+Cell = Tuple[float, float, str]
+
+# 行の高さに対する比率で、同じ行・同じセルとみなす距離を決める
+ROW_TOLERANCE_RATIO = 0.5
+CELL_GAP_RATIO = 0.8
+# ページ幅に対してこれより広いセル（タイトル・注記など）は列の推定に使わない
+WIDE_CELL_RATIO = 0.4
+
+PORT_ALIASES = [alias for aliases in list(DEPARTURE_ALIASES.values()) + list(DESTINATION_ALIASES.values()) for alias in aliases]
+
+
+def _parse_pages(pages: str, page_count: int) -> List[int]:
+    """ Camelot形式のページ指定（"all" / "1,3,5-7"）を0始まりのページ番号に変換 """
+    if pages == "all":
+        return list(range(page_count))
+    numbers = []
+    for part in pages.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            numbers.extend(range(int(start), (page_count if end == "end" else int(end)) + 1))
+        elif part.strip():
+            numbers.append(int(part))
+    return [n - 1 for n in numbers if 1 <= n <= page_count]
+
+
+def _group_rows(words: Sequence[Word], line_height: float) -> List[List[Word]]:
+    """ y座標の中心が近い単語を1行にまとめる """
+    rows: List[List[Word]] = []
+    centers: List[float] = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if rows and abs(center - centers[-1]) <= line_height * ROW_TOLERANCE_RATIO:
+            rows[-1].append(word)
+            centers[-1] = (centers[-1] * (len(rows[-1]) - 1) + center) / len(rows[-1])
+        else:
+            rows.append([word])
+            centers.append(center)
+    return rows
+
+
+def _merge_cells(row: Sequence[Word], line_height: float) -> List[Cell]:
+    """ 行内で間隔の狭い単語を1つのセルにまとめる """
+    cells: List[Cell] = []
+    for x0, _, x1, _, text in sorted(row, key=lambda w: w[0]):
+        if cells and x0 - cells[-1][1] <= line_height * CELL_GAP_RATIO:
+            prev_x0, _, prev_text = cells[-1]
+            cells[-1] = (prev_x0, x1, f"{prev_text} {text}")
+        else:
+            cells.append((x0, x1, text))
+    return cells
+
+
+def _column_bounds(rows: Sequence[Sequence[Cell]], page_width: float) -> List[Tuple[float, float]]:
+    """ 複数セルを持つ行のセル範囲を重ね合わせ、重なった範囲を1列とする """
+    spans = sorted(
+        (x0, x1) for cells in rows if len(cells) > 1
+        for x0, x1, _ in cells if x1 - x0 <= page_width * WIDE_CELL_RATIO
+    )
+    bounds: List[Tuple[float, float]] = []
+    for x0, x1 in spans:
+        if bounds and x0 <= bounds[-1][1]:
+            bounds[-1] = (bounds[-1][0], max(bounds[-1][1], x1))
+        else:
+            bounds.append((x0, x1))
+    return bounds
+
+
+def _find_header_row(rows: Sequence[Sequence[Cell]]) -> Optional[int]:
+    """ 港名が2つ以上並ぶ行を港名ヘッダー行とみなす """
+    for index, cells in enumerate(rows):
+        if sum(1 for _, _, text in cells if contains_alias(text.upper(), PORT_ALIASES)) >= 2:
+            return index
+    return None
+
+
+def _split_by_header(bounds: List[Tuple[float, float]], header: Sequence[Cell]) -> List[Tuple[float, float]]:
+    """ 1列に2つ以上のヘッダーセルが入った場合は、ヘッダーセルの中間で列を分割する """
+    result = []
+    for start, end in bounds:
+        inside = [cell for cell in header if start <= (cell[0] + cell[1]) / 2 <= end]
+        for left, right in zip(inside, inside[1:]):
+            cut = (left[1] + right[0]) / 2
+            result.append((start, cut))
+            start = cut
+        result.append((start, end))
+    return result
+
+
+def _assign_column(cell: Cell, bounds: Sequence[Tuple[float, float]]) -> int:
+    center = (cell[0] + cell[1]) / 2
+    for index, (start, end) in enumerate(bounds):
+        if start <= center <= end:
+            return index
+    # どの列にも入らない場合は最も近い列
+    return min(range(len(bounds)), key=lambda i: min(abs(center - bounds[i][0]), abs(center - bounds[i][1])))
+
+
+def _page_table(page) -> List[List[str]]:
+    words: List[Word] = [tuple(w[:5]) for w in page.get_text("words")]  # type: ignore[misc]
+    if not words:
+        return []
+    line_height = median(w[3] - w[1] for w in words) or 1.0
+
+    rows = [_merge_cells(row, line_height) for row in _group_rows(words, line_height)]
+    bounds = _column_bounds(rows, page.rect.width)
+    if not bounds:
+        return [[" ".join(text for _, _, text in cells)] for cells in rows]
+
+    header_index = _find_header_row(rows)
+    if header_index is not None:
+        bounds = _split_by_header(bounds, rows[header_index])
+
+    table = []
+    for cells in rows:
+        out = [""] * len(bounds)
+        for cell in cells:
+            column = _assign_column(cell, bounds)
+            out[column] = f"{out[column]}\n{cell[2]}" if out[column] else cell[2]
+        table.append(out)
+    return table
+
+
+def parse_pdf_tables_pymupdf(content: bytes, pages: str = "all") -> List[List[List[str]]]:
+    """
+    PyMuPDFの単語座標から行・列を復元し、Camelot（stream）と同じ形式（ページごとの行データ）で返す。
+    """
+    import fitz  # PyMuPDF（起動を軽くするため使用時に読み込む）
+
+    tables = []
+    with fitz.open(stream=content, filetype="pdf") as doc:
+        for page_number in _parse_pages(pages, doc.page_count):
+            table = _page_table(doc[page_number])
+            if table:
+                tables.append(table)
+    logger.info(f"📄 PyMuPDF解析完了: {len(tables)}テーブル")
+    return tables
@@ -0,0 +1,110 @@
+import sys
+import os
+import json
+import time
+import logging
+import unicodedata
+from typing import Dict, Optional
+
+from app.services.metrics import record_cache
+from app.services.sqlite_store import CACHE_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# (船会社, 正規化した目的地) → 地域カテゴリ のキャッシュ
+REGION_CACHE_PATH = os.getenv("REGION_CACHE_PATH", os.path.join(CACHE_DIR, "region_cache.sqlite3"))
+REGION_CACHE_TTL_SECONDS = int(os.getenv("REGION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+_initialized = False
+
+
+def _get_connection():
+    global _initialized
+    conn = connect(REGION_CACHE_PATH)
+    if not _initialized:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS region_cache (
+                carrier TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                region TEXT NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (carrier, destination)
+            )
+        """)
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def normalize_destination(destination: str) -> str:
+    """ 全角/半角・大文字小文字・空白の揺れを吸収 """
+    return " ".join(unicodedata.normalize("NFKC", destination).upper().split())
+
+
+def get_cached_region(carrier: str, destination: str) -> Optional[str]:
+    """ 有効期限内のキャッシュがあれば地域カテゴリを返す """
+    try:
+        conn = _get_connection()
+        try:
+            row = conn.execute(
+                "SELECT region, expires_at FROM region_cache WHERE carrier = ? AND destination = ?",
+                (carrier, normalize_destination(destination))
+            ).fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"[WARN] 地域キャッシュの読み込みに失敗: {e}")
+        return None
+
+    if not row:
+        record_cache("region", False)
+        return None
+    region, expires_at = row
+    if expires_at is not None and expires_at < time.time():
+        record_cache("region", False)
+        return None
+    record_cache("region", True)
+    return region
+
+
+def set_cached_region(carrier: str, destination: str, region: str, ttl: Optional[float] = REGION_CACHE_TTL_SECONDS):
+    """ 地域カテゴリを保存（ttl=None の場合は無期限） """
+    seed_region_cache(carrier, {destination: region}, ttl=ttl)
+
+
+def seed_region_cache(carrier: str, mapping: Dict[str, str], ttl: Optional[float] = None) -> int:
+    """ 目的地 → 地域カテゴリ を一括登録（事前投入はデフォルトで無期限） """
+    expires_at = time.time() + ttl if ttl is not None else None
+    rows = [(carrier, normalize_destination(dest), region, expires_at) for dest, region in mapping.items()]
+    try:
+        conn = _get_connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO region_cache (carrier, destination, region, expires_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"[WARN] 地域キャッシュの書き込みに失敗: {e}")
+        return 0
+    return len(rows)
+
+
+def load_seed_file(path: str) -> int:
+    """ {"ONE": {"Los Angeles": "NORTH AMERICA WEST COAST"}, ...} 形式のJSONを事前投入 """
+    with open(path, encoding="utf-8") as f:
+        seeds = json.load(f)
+    return sum(seed_region_cache(carrier, mapping) for carrier, mapping in seeds.items())
+
+
+# 使用例: python -m app.services.region_cache seed region_seeds.json
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if len(sys.argv) < 3 or sys.argv[1] != "seed":
+        print("Usage: python -m app.services.region_cache seed <seed.json>")
+        sys.exit(1)
+
+    count = load_seed_file(sys.argv[2])
+    logger.info(f"[INFO] 地域キャッシュに {count} 件を登録しました: {REGION_CACHE_PATH}")
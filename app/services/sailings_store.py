@@ -0,0 +1,195 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.database import get_db_connection
+from app.services.port_aliases import canonical_port
+from app.services.schedule_parser import SCHEDULE_PARSER_MAX_DAY_GAP, Sailing
+from app.services.sqlite_store import CACHE_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# 解析済みの航海スケジュールを保存する sailings テーブル（MySQL、ローカルではSQLiteも可）
+SAILINGS_DB_BACKEND = os.getenv("SAILINGS_DB_BACKEND", "mysql")
+SAILINGS_SQLITE_PATH = os.getenv("SAILINGS_SQLITE_PATH", os.path.join(CACHE_DIR, "sailings.sqlite3"))
+# この秒数以内に更新された行だけをリクエストへの回答に使う
+SAILINGS_MAX_AGE_SECONDS = float(os.getenv("SAILINGS_MAX_AGE_SECONDS", str(12 * 3600)))
+
+MYSQL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sailings (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        carrier VARCHAR(64) NOT NULL,
+        vessel VARCHAR(128) NOT NULL,
+        voyage VARCHAR(64) NOT NULL DEFAULT '',
+        departure_port VARCHAR(64) NOT NULL,
+        destination_port VARCHAR(64) NOT NULL,
+        etd DATE NOT NULL,
+        eta DATE NOT NULL,
+        etd_text VARCHAR(32) NOT NULL,
+        eta_text VARCHAR(32) NOT NULL,
+        source_url VARCHAR(1024) NOT NULL,
+        pdf_sha256 CHAR(64) NOT NULL,
+        updated_at DATETIME NOT NULL,
+        UNIQUE KEY uq_sailings_call (carrier, vessel, voyage, departure_port, destination_port, etd),
+        KEY idx_sailings_lane_etd (departure_port, destination_port, etd),
+        KEY idx_sailings_lane_eta (departure_port, destination_port, eta),
+        KEY idx_sailings_source (source_url(255))
+    )
+    """,
+]
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sailings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        carrier TEXT NOT NULL,
+        vessel TEXT NOT NULL,
+        voyage TEXT NOT NULL DEFAULT '',
+        departure_port TEXT NOT NULL,
+        destination_port TEXT NOT NULL,
+        etd TEXT NOT NULL,
+        eta TEXT NOT NULL,
+        etd_text TEXT NOT NULL,
+        eta_text TEXT NOT NULL,
+        source_url TEXT NOT NULL,
+        pdf_sha256 TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        UNIQUE (carrier, vessel, voyage, departure_port, destination_port, etd)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sailings_lane_etd ON sailings (departure_port, destination_port, etd)",
+    "CREATE INDEX IF NOT EXISTS idx_sailings_lane_eta ON sailings (departure_port, destination_port, eta)",
+    "CREATE INDEX IF NOT EXISTS idx_sailings_source ON sailings (source_url)",
+]
+
+UPSERT_COLUMNS = (
+    "carrier", "vessel", "voyage", "departure_port", "destination_port", "etd", "eta",
+    "etd_text", "eta_text", "source_url", "pdf_sha256", "updated_at",
+)
+UPDATE_COLUMNS = ("eta", "etd_text", "eta_text", "source_url", "pdf_sha256", "updated_at")
+
+
+def _connect():
+    if SAILINGS_DB_BACKEND == "sqlite":
+        return connect(SAILINGS_SQLITE_PATH)
+    return get_db_connection()
+
+
+def _sql(query: str) -> str:
+    # SQLiteのプレースホルダは "?"
+    return query.replace("%s", "?") if SAILINGS_DB_BACKEND == "sqlite" else query
+
+
+def _upsert_sql() -> str:
+    placeholders = ", ".join(["%s"] * len(UPSERT_COLUMNS))
+    if SAILINGS_DB_BACKEND == "sqlite":
+        updates = ", ".join(f"{c} = excluded.{c}" for c in UPDATE_COLUMNS)
+        conflict = "ON CONFLICT (carrier, vessel, voyage, departure_port, destination_port, etd) DO UPDATE SET"
+    else:
+        updates = ", ".join(f"{c} = VALUES({c})" for c in UPDATE_COLUMNS)
+        conflict = "ON DUPLICATE KEY UPDATE"
+    return _sql(f"INSERT INTO sailings ({', '.join(UPSERT_COLUMNS)}) VALUES ({placeholders}) {conflict} {updates}")
+
+
+def ensure_schema():
+    """ sailings テーブルとインデックスを作成（存在する場合は何もしない） """
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        for statement in (SQLITE_SCHEMA if SAILINGS_DB_BACKEND == "sqlite" else MYSQL_SCHEMA):
+            cursor.execute(statement)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def upsert_sailings(
+    carrier: str,
+    source_url: str,
+    pdf_sha256: str,
+    sailings: Iterable[Tuple[str, str, Sailing]]
+) -> int:
+    """ (出発港, 目的地, 航海レコード) を保存。同じURLの古いPDF由来の行は置き換える """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (carrier, s.vessel, s.voyage, canonical_port(dep), canonical_port(dest),
+         s.etd.strftime("%Y-%m-%d"), s.eta.strftime("%Y-%m-%d"), s.etd_text, s.eta_text,
+         source_url, pdf_sha256, now)
+        for dep, dest, s in sailings
+        if not s.guessed_columns  # 船名列を推定した行は信頼度が低いため保存しない
+    ]
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            _sql("DELETE FROM sailings WHERE source_url = %s AND pdf_sha256 <> %s"), (source_url, pdf_sha256)
+        )
+        if rows:
+            cursor.executemany(_upsert_sql(), rows)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def find_sailing(
+    carrier: str,
+    departure: str,
+    destination: str,
+    etd_date: Optional[datetime] = None,
+    eta_date: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """ 航路・日付のインデックス範囲検索で、鮮度内かつ指定日に最も近い便を返す """
+    base_date = etd_date or eta_date
+    if base_date is None:
+        return None
+    date_column = "etd" if etd_date else "eta"
+    window = timedelta(days=SCHEDULE_PARSER_MAX_DAY_GAP)
+    cutoff = (datetime.now() - timedelta(seconds=SAILINGS_MAX_AGE_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            _sql(f"""
+                SELECT vessel, voyage, etd, eta, etd_text, eta_text, source_url
+                FROM sailings
+                WHERE departure_port = %s AND destination_port = %s
+                  AND {date_column} BETWEEN %s AND %s
+                  AND carrier = %s AND updated_at >= %s
+            """),
+            (canonical_port(departure), canonical_port(destination),
+             (base_date - window).strftime("%Y-%m-%d"), (base_date + window).strftime("%Y-%m-%d"),
+             carrier, cutoff)
+        )
+        rows: List[tuple] = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    if not rows:
+        return None
+
+    def day_gap(row: tuple) -> int:
+        value = row[2] if etd_date else row[3]
+        return abs((datetime.strptime(str(value)[:10], "%Y-%m-%d") - base_date).days)
+
+    ranked = sorted(rows, key=day_gap)
+    best_gap = day_gap(ranked[0])
+    # 同じ日付差で別の船がある場合は schedule_parser.find_closest_sailing と同様に判断できないため、PDF解析側に任せる
+    if any(day_gap(row) == best_gap and row[0] != ranked[0][0] for row in ranked[1:]):
+        logger.info(f"[sailings] {carrier} {departure}→{destination}: 同じ日付差の便が複数あるため使用しません")
+        return None
+
+    vessel, voyage, _, _, etd_text, eta_text, source_url = ranked[0]
+    return {
+        "vessel": vessel,
+        "voy": voyage,
+        "etd": etd_text,
+        "eta": eta_text,
+        "schedule_url": source_url,
+    }
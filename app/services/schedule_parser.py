@@ -0,0 +1,208 @@
+import os
+import re
+import logging
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from app.services.port_aliases import DEPARTURE_ALIASES, DESTINATION_ALIASES, contains_alias, get_port_aliases
+
+logger = logging.getLogger(__name__)
+
+# この信頼度未満の場合はLLMにフォールバックする
+SCHEDULE_PARSER_MIN_CONFIDENCE = float(os.getenv("SCHEDULE_PARSER_MIN_CONFIDENCE", "0.7"))
+# 指定日からこの日数以上離れた便しか見つからない場合は信頼度を下げる
+SCHEDULE_PARSER_MAX_DAY_GAP = int(os.getenv("SCHEDULE_PARSER_MAX_DAY_GAP", "14"))
+# ETD〜ETAの日数がこれを超える組み合わせは誤検出とみなす
+MAX_TRANSIT_DAYS = 90
+
+MONTHS = {m: i + 1 for i, m in enumerate(
+    ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+)}
+
+DATE_PATTERN = re.compile(
+    r"(?P<m1>\d{1,2})/(?P<d1>\d{1,2})"                          # 04/11
+    r"|(?P<d2>\d{1,2})[-\s](?P<mon2>[A-Za-z]{3})(?![A-Za-z])"   # 11-Apr
+    r"|(?<![A-Za-z])(?P<mon3>[A-Za-z]{3})[-.\s]?(?P<d3>\d{1,2})(?!\d)"  # Apr 11
+)
+VESSEL_HEADERS = ["VESSEL", "船名", "本船"]
+VOYAGE_HEADERS = ["VOY", "航海", "次航"]
+
+
+class Sailing(NamedTuple):
+    vessel: str
+    voyage: str
+    etd: datetime
+    eta: datetime
+    etd_text: str
+    eta_text: str
+    table_index: int
+    row_index: int
+    guessed_columns: bool
+
+
+class SailingMatch(NamedTuple):
+    sailing: Sailing
+    confidence: float
+
+
+def _resolve_year(month: int, day: int, base_date: datetime) -> Optional[datetime]:
+    """ 年のない日付を基準日に最も近い年で補完 """
+    candidates = []
+    for year in (base_date.year - 1, base_date.year, base_date.year + 1):
+        try:
+            candidates.append(datetime(year, month, day))
+        except ValueError:
+            continue
+    if not candidates:
+        return None
+    return min(candidates, key=lambda d: abs((d - base_date).days))
+
+
+def parse_cell_dates(cell: str, base_date: datetime) -> List[datetime]:
+    """ セル内の日付を出現順に返す（"04/11 - 04/13" なら2件） """
+    dates = []
+    for m in DATE_PATTERN.finditer(cell or ""):
+        if m.group("m1"):
+            month, day = int(m.group("m1")), int(m.group("d1"))
+        else:
+            mon = (m.group("mon2") or m.group("mon3")).upper()
+            if mon not in MONTHS:
+                continue
+            month, day = MONTHS[mon], int(m.group("d2") or m.group("d3"))
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            continue
+        date = _resolve_year(month, day, base_date)
+        if date:
+            dates.append(date)
+    return dates
+
+
+def _find_column(header_rows: Sequence[Sequence[str]], keywords: List[str]) -> Optional[int]:
+    for row in header_rows:
+        for col, cell in enumerate(row):
+            text = str(cell).upper()
+            if any(keyword in text for keyword in keywords):
+                return col
+    return None
+
+
+def _first_vessel(cell: str) -> str:
+    """ 複数の船名がある場合は1st Vesselを採用 """
+    first_line = next((line for line in str(cell).splitlines() if line.strip()), "")
+    return re.split(r"\s*/\s*", first_line.strip())[0]
+
+
+def _format_dates(dates: List[datetime]) -> str:
+    if len(dates) > 1:
+        return f"{dates[0]:%m/%d} - {dates[-1]:%m/%d}"
+    return f"{dates[0]:%m/%d}"
+
+
+def parse_sailings(tables: Sequence, departure: str, destination: str, base_date: datetime) -> List[Sailing]:
+    """
+    Camelotのテーブル（DataFrame または行のリスト）から出発港・目的地の列を特定し、
+    各行を 船名・航海番号・ETD・ETA の航海レコードに変換する。
+    """
+    departure_aliases = get_port_aliases(departure)
+    destination_aliases = get_port_aliases(destination)
+    sailings = []
+
+    for table_index, table in enumerate(tables):
+        rows = table.values.tolist() if hasattr(table, "values") else table
+        columns = None  # (出発列, 目的地列, 船名列, 航海番号列, 船名列を推定したか)
+
+        for row_index, row in enumerate(rows):
+            cells = [str(cell) for cell in row]
+            dep_cols = [i for i, cell in enumerate(cells) if contains_alias(cell, departure_aliases)]
+            dest_cols = [i for i, cell in enumerate(cells) if contains_alias(cell, destination_aliases)]
+
+            # 港名が並ぶヘッダー行を見つけたら列位置を更新（1テーブルに複数ブロックある場合にも対応）
+            if dep_cols and dest_cols:
+                dep_col = dep_cols[0]
+                dest_col = next((c for c in dest_cols if c > dep_col), dest_cols[0])
+                if dest_col != dep_col:
+                    header_rows = rows[max(0, row_index - 2):row_index + 1]
+                    vessel_col = _find_column(header_rows, VESSEL_HEADERS)
+                    voyage_col = _find_column(header_rows, VOYAGE_HEADERS)
+                    columns = (dep_col, dest_col, vessel_col if vessel_col is not None else 0, voyage_col, vessel_col is None)
+                    continue
+
+            if not columns:
+                continue
+
+            dep_col, dest_col, vessel_col, voyage_col, guessed = columns
+            if max(dep_col, dest_col, vessel_col) >= len(cells):
+                continue
+            etd_dates = parse_cell_dates(cells[dep_col], base_date)
+            eta_dates = parse_cell_dates(cells[dest_col], base_date)
+            vessel = _first_vessel(cells[vessel_col])
+            if not etd_dates or not eta_dates or not vessel:
+                continue
+
+            etd, eta = etd_dates[-1], eta_dates[0]  # 出発港は離岸日、目的地は着岸日を採用
+            if not (0 <= (eta - etd).days <= MAX_TRANSIT_DAYS):
+                continue
+
+            voyage = cells[voyage_col].strip() if voyage_col is not None and voyage_col < len(cells) else ""
+            sailings.append(Sailing(
+                vessel=vessel,
+                voyage=voyage,
+                etd=etd,
+                eta=eta,
+                etd_text=_format_dates(etd_dates),
+                eta_text=_format_dates(eta_dates[:1]),
+                table_index=table_index,
+                row_index=row_index,
+                guessed_columns=guessed,
+            ))
+
+    return sailings
+
+
+def parse_all_sailings(tables: Sequence, base_date: datetime) -> List[Tuple[str, str, Sailing]]:
+    """ テーブルに登場する全ての (出発港, 目的地) の組み合わせについて航海レコードを返す（事前クロール用） """
+    text = "\n".join(
+        " ".join(str(cell) for cell in row)
+        for table in tables
+        for row in (table.values.tolist() if hasattr(table, "values") else table)
+    )
+    departures = [port for port in DEPARTURE_ALIASES if contains_alias(text, get_port_aliases(port))]
+    destinations = [port for port in DESTINATION_ALIASES if contains_alias(text, get_port_aliases(port))]
+
+    results = []
+    for departure in departures:
+        for destination in destinations:
+            for sailing in parse_sailings(tables, departure, destination, base_date):
+                results.append((departure, destination, sailing))
+    return results
+
+
+def find_closest_sailing(
+    sailings: List[Sailing],
+    etd_date: Optional[datetime] = None,
+    eta_date: Optional[datetime] = None
+) -> Optional[SailingMatch]:
+    """ ETD指定時は出発日、ETAのみ指定時は到着日が最も近い便を信頼度付きで返す """
+    if not sailings or not (etd_date or eta_date):
+        return None
+
+    def day_gap(sailing: Sailing) -> int:
+        if etd_date:
+            return abs((sailing.etd - etd_date).days)
+        return abs((sailing.eta - eta_date).days)  # type: ignore[operator]
+
+    ranked: List[Tuple[int, Sailing]] = sorted(((day_gap(s), s) for s in sailings), key=lambda x: x[0])
+    gap, best = ranked[0]
+
+    confidence = 1.0
+    if best.guessed_columns:
+        confidence -= 0.3
+    if not best.voyage:
+        confidence -= 0.1
+    if gap > SCHEDULE_PARSER_MAX_DAY_GAP:
+        confidence -= 0.4
+    # 同じ日付差で別の船がある場合はどちらを選ぶべきか判断できない
+    if any(g == gap and s.vessel != best.vessel for g, s in ranked[1:]):
+        confidence -= 0.3
+
+    return SailingMatch(best, round(max(confidence, 0.0), 2))
@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+import tempfile
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+from app.services.page_filter import find_candidate_pages
+from app.services.instrumentation import track_stage
+from app.services.parse_pool import run_in_parse_pool
+from app.services.pymupdf_tables import parse_pdf_tables_pymupdf
+from app.services.pdf_cache import fetch_pdf
+from app.services.table_cache import get_tables, put_tables
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# PDFダウンロードのタイムアウト（秒）
+PDF_DOWNLOAD_TIMEOUT = float(os.getenv("PDF_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+# テーブル抽出エンジン（"camelot" / "pymupdf"）。PDF_TABLE_ENGINE_<社名> で船会社ごとに変更可能
+PDF_TABLE_ENGINE = os.getenv("PDF_TABLE_ENGINE", "camelot")
+TABLE_ENGINES = ("camelot", "pymupdf")
+
+
+class ScheduleTables(NamedTuple):
+    sha256: str
+    tables: List["pd.DataFrame"]
+
+
+def parse_pdf_tables(content: bytes, pages: str = "all", flavor: str = "stream") -> List[List[List[str]]]:
+    """ PDFの内容を専用の一時ディレクトリに書き出してCamelotで解析し、行データを返す """
+    # pymupdf エンジンのみで運用する場合は camelot（Ghostscript/OpenCV）を読み込まない
+    import camelot.io as camelot
+
+    with tempfile.TemporaryDirectory(prefix="schedule_") as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "schedule.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(content)
+        tables = camelot.read_pdf(pdf_path, pages=pages, flavor=flavor)
+        logger.info(f"📄 Camelot解析完了: {len(tables)}テーブル")
+        return [table.df.values.tolist() for table in tables]
+
+
+def _to_frames(tables: List[List[List[str]]]) -> List["pd.DataFrame"]:
+    # pandas の読み込みは重いため、最初にテーブルを返すときまで遅らせる
+    import pandas as pd
+
+    return [pd.DataFrame(table) for table in tables]
+
+
+def get_table_engine(carrier: Optional[str] = None) -> str:
+    engine = (os.getenv(f"PDF_TABLE_ENGINE_{carrier.upper()}") if carrier else None) or PDF_TABLE_ENGINE
+    if engine not in TABLE_ENGINES:
+        logger.warning(f"[WARN] 不明なテーブル抽出エンジン '{engine}' のため camelot を使用します")
+        return "camelot"
+    return engine
+
+
+def _variant(engine: str, flavor: str, pages: str) -> str:
+    # pymupdf は flavor を使わないためキーに含めない
+    return f"pymupdf:{pages}" if engine == "pymupdf" else f"camelot:{flavor}:{pages}"
+
+
+async def load_schedule_tables(
+    url: str,
+    pages: str = "all",
+    flavor: str = "stream",
+    destination: Optional[str] = None,
+    carrier: Optional[str] = None
+) -> Optional[ScheduleTables]:
+    """
+    スケジュールPDFを取得し、船会社ごとに設定したエンジンで抽出したテーブルを返す（同一内容のPDFは再解析しない）。
+    destination を指定すると、その港名を含むページだけを解析する。
+    """
+    engine = get_table_engine(carrier)
+    # PDFを取得（ディスクキャッシュ＋条件付きGET、共有HTTPクライアントでストリーミング）
+    logger.info(f"📥 PDFリンクにアクセス中: {url}")
+    pdf = await fetch_pdf(url, PDF_DOWNLOAD_TIMEOUT)
+    if pdf is None:
+        return None
+
+    # 全ページ解析済み（事前クロールなど）のテーブルがあればそれを優先
+    variants = [_variant(engine, flavor, pages)]
+    if destination and pages == "all":
+        try:
+            candidate_pages = await asyncio.to_thread(find_candidate_pages, pdf.content, destination)
+        except Exception as e:
+            logger.warning(f"[WARN] ページ絞り込みに失敗したため全ページを解析します: {e}")
+            candidate_pages = None
+        if candidate_pages:
+            pages = candidate_pages
+            variants.append(_variant(engine, flavor, pages))
+
+    for variant in variants:
+        rows = await asyncio.to_thread(get_tables, pdf.sha256, variant)
+        if rows is not None:
+            logger.info(f"📦 テーブルキャッシュを使用: {pdf.sha256[:12]} {variant}（{len(rows)}テーブル）")
+            return ScheduleTables(pdf.sha256, _to_frames(rows))
+
+    # CPU処理のためプロセスプールで解析（ジョブごとの一時ディレクトリなので同時実行でも衝突しない）
+    with track_stage("parse"):
+        if engine == "pymupdf":
+            tables = await run_in_parse_pool(parse_pdf_tables_pymupdf, pdf.content, pages)
+        else:
+            tables = await run_in_parse_pool(parse_pdf_tables, pdf.content, pages, flavor)
+    await asyncio.to_thread(put_tables, pdf.sha256, variants[-1], tables)
+    return ScheduleTables(pdf.sha256, _to_frames(tables))
@@ -0,0 +1,15 @@
+import os
+import sqlite3
+from pathlib import Path
+
+# ローカルキャッシュ類の保存先（プロセス間・再起動後も共有される）
+CACHE_DIR = os.getenv("SHIPIT_CACHE_DIR", str(Path(__file__).resolve().parents[2] / ".cache"))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """ WALモードでSQLiteに接続（複数ワーカープロセスからの同時アクセス用） """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
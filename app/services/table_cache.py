@@ -0,0 +1,87 @@
+import os
+import gzip
+import json
+import tempfile
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.metrics import record_cache
+from app.services.sqlite_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Camelotの抽出結果をPDF内容のSHA-256ごとに保存するキャッシュ
+TABLE_CACHE_DIR = os.getenv("TABLE_CACHE_DIR", os.path.join(CACHE_DIR, "tables"))
+TABLE_CACHE_MAX_ENTRIES = int(os.getenv("TABLE_CACHE_MAX_ENTRIES", "500"))
+
+# テーブル = 行のリスト、行 = セル文字列のリスト
+Table = List[List[str]]
+
+stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _cache_path(sha256: str, variant: str) -> Path:
+    # 抽出条件（flavor・対象ページ等）が異なる結果は別エントリとして扱う
+    variant_key = hashlib.sha1(variant.encode("utf-8")).hexdigest()[:10]
+    return Path(TABLE_CACHE_DIR) / f"{sha256}-{variant_key}.json.gz"
+
+
+def get_tables(sha256: str, variant: str) -> Optional[List[Table]]:
+    path = _cache_path(sha256, variant)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            tables = json.load(f)
+        os.utime(path)  # LRU判定用に最終アクセス時刻を更新
+    except FileNotFoundError:
+        stats["misses"] += 1
+        record_cache("table", False)
+        return None
+    except Exception as e:
+        logger.warning(f"[WARN] テーブルキャッシュの読み込みに失敗: {e}")
+        stats["misses"] += 1
+        record_cache("table", False)
+        return None
+
+    stats["hits"] += 1
+    record_cache("table", True)
+    return tables
+
+
+def put_tables(sha256: str, variant: str, tables: List[Table]):
+    path = _cache_path(sha256, variant)
+    tmp_name = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 同じPDFの結果を複数スレッドが同時に書いても衝突しないよう、一時ファイル名は毎回一意にする
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_name, path)
+        tmp_name = None
+        evict()
+    except Exception as e:
+        logger.warning(f"[WARN] テーブルキャッシュの書き込みに失敗: {e}")
+    finally:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+
+
+def evict():
+    """ エントリ数が上限を超えた分を最終アクセスが古いものから削除 """
+    entries = sorted(Path(TABLE_CACHE_DIR).glob("*.json.gz"), key=lambda p: p.stat().st_mtime)
+    for path in entries[:max(0, len(entries) - TABLE_CACHE_MAX_ENTRIES)]:
+        try:
+            path.unlink()
+            stats["evictions"] += 1
+        except FileNotFoundError:
+            pass
+
+
+def get_stats() -> Dict[str, float]:
+    total = stats["hits"] + stats["misses"]
+    return {**stats, "hit_ratio": stats["hits"] / total if total else 0.0}
@@ -0,0 +1,62 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 起動後（ポートのバインド後）にバックグラウンドで行う準備処理と、その進捗（/ready で公開）
+WarmupStep = Tuple[str, Callable[[], Awaitable[Any]]]
+
+_steps: Dict[str, Dict[str, Any]] = {}
+_started_at: Optional[float] = None
+_finished_at: Optional[float] = None
+
+
+async def _run_step(name: str, func: Callable[[], Awaitable[Any]]):
+    _steps[name]["status"] = "running"
+    started = time.perf_counter()
+    try:
+        await func()
+        _steps[name]["status"] = "ok"
+    except Exception as e:
+        # 失敗しても各処理は初回利用時に再試行・代替されるため、準備完了は妨げない
+        _steps[name].update(status="failed", error=str(e))
+        logger.warning(f"[ウォームアップ] {name} に失敗: {e}")
+    finally:
+        _steps[name]["seconds"] = round(time.perf_counter() - started, 3)
+
+
+async def _run(steps: List[WarmupStep]):
+    global _finished_at
+    await asyncio.gather(*[_run_step(name, func) for name, func in steps])
+    _finished_at = time.perf_counter()
+    assert _started_at is not None
+    summary = ", ".join(f"{name} {s['seconds']}s" + ("（失敗）" if s["status"] == "failed" else "") for name, s in _steps.items())
+    logger.info(f"🔥 [ウォームアップ] 完了（{_finished_at - _started_at:.2f}秒）: {summary}")
+
+
+def start_warmup(steps: List[WarmupStep]) -> asyncio.Task:
+    """ 準備処理を並行して開始する（完了を待たずに返る） """
+    global _started_at, _finished_at
+    _steps.clear()
+    for name, _ in steps:
+        _steps[name] = {"status": "pending", "seconds": None}
+    _started_at, _finished_at = time.perf_counter(), None
+    return asyncio.create_task(_run(steps))
+
+
+async def stop_warmup(task: asyncio.Task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def is_ready() -> bool:
+    return _finished_at is not None
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    elapsed = None
+    if _started_at is not None:
+        elapsed = round((_finished_at or time.perf_counter()) - _started_at, 3)
+    return {"ready": is_ready(), "elapsed_seconds": elapsed, "steps": _steps}
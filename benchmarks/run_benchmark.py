@@ -0,0 +1,183 @@
+"""
+オフラインのエンドツーエンドベンチマーク。
+
+各社サイト・PDF・Azure OpenAI をローカルのスタンドインに置き換えて recommend_shipping を指定の同時実行数で呼び出し、
+段階ごと（links / download / parse / llm / db）とリクエスト全体の p50 / p95 / p99 とスループットを出力する。
+
+    python -m benchmarks.run_benchmark --requests 40 --concurrency 8
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_LANES = [
+    ("Tokyo", "Singapore"),
+    ("Tokyo", "Busan"),
+    ("Yokohama", "Shanghai"),
+    ("Tokyo", "Los Angeles"),
+    ("Kobe", "Rotterdam"),
+    ("Nagoya", "Sydney"),
+]
+STAGES = ["request", "region", "links", "download", "parse", "llm", "db"]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """ 最近順位法によるパーセンタイル """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shipit オフラインベンチマーク")
+    parser.add_argument("--requests", type=int, default=24, help="送信するリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時実行数")
+    parser.add_argument("--latency-ms", type=float, default=20, help="スタンドインの応答遅延（各社サイト・PDF）")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="スタンドインの応答遅延（Azure OpenAI）")
+    parser.add_argument("--pdf-pages", type=int, default=6, help="合成スケジュールPDFのページ数")
+    parser.add_argument("--engine", choices=["camelot", "pymupdf"], default=os.getenv("PDF_TABLE_ENGINE", "camelot"))
+    parser.add_argument("--fixtures-dir", type=Path, help="記録済みページ・PDF（<dir>/<ホスト>/<パス>）があれば優先して返す")
+    parser.add_argument("--cache-dir", type=Path, help="キャッシュディレクトリ（省略時は毎回空の一時ディレクトリ）")
+    parser.add_argument("--force-llm", action="store_true", help="ルールベース抽出を使わず、毎回GPT（スタンドイン）で判定させる")
+    parser.add_argument("--use-mysql", action="store_true", help="環境変数のMySQLをそのまま使う（省略時は運賃取得が失敗する前提で計測）")
+    parser.add_argument("--json", type=Path, help="結果をJSONでも保存する")
+    return parser.parse_args()
+
+
+def configure_environment(args, cache_dir: Path):
+    """ main を import する前にアプリの設定をベンチマーク用に切り替える """
+    os.environ.update({
+        "SHIPIT_CACHE_DIR": str(cache_dir),
+        "PRECRAWL_ENABLED": "0",
+        "SAILINGS_DB_BACKEND": "sqlite",
+        "DECISION_LOG_BACKEND": "sqlite",
+        "PDF_TABLE_ENGINE": args.engine,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_API_VERSION": "2024-02-01",
+    })
+    if args.force_llm:
+        os.environ["SCHEDULE_PARSER_MIN_CONFIDENCE"] = "1.1"
+    if not args.use_mysql:
+        os.environ.update({"MYSQL_HOST": "127.0.0.1", "MYSQL_SSL": "0"})
+
+
+async def run(args) -> Dict:
+    from benchmarks.standin import RewriteTransport, StandIn
+
+    standin = StandIn(
+        latency_ms=args.latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        pdf_pages=args.pdf_pages,
+        fixtures_dir=args.fixtures_dir,
+    )
+    standin.start()
+
+    import httpx
+    from openai import AzureOpenAI
+
+    import main
+    from app.services import http_client, llm_client, warmup
+    from app.services.instrumentation import StageTiming, add_stage_observer
+
+    # .env の値で上書きされても実サービスに出ないよう、共有クライアントを直接差し替える
+    llm_client._client = AzureOpenAI(api_key="benchmark", api_version="2024-02-01", azure_endpoint=standin.base_url)
+    http_client._client = httpx.AsyncClient(transport=RewriteTransport(standin.base_url), follow_redirects=True)
+
+    timings: Dict[str, List[StageTiming]] = defaultdict(list)
+    add_stage_observer(lambda timing: timings[timing.stage].append(timing))
+
+    base = datetime.now() + timedelta(days=14)
+    requests = [
+        main.ShippingRequest(
+            departure_port=departure,
+            destination_port=destination,
+            etd_date=(base + timedelta(days=(i * 3) % 28)).strftime("%Y-%m-%d"),
+        )
+        for i, (departure, destination) in enumerate(DEFAULT_LANES[i % len(DEFAULT_LANES)] for i in range(args.requests))
+    ]
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    matched = 0
+
+    async def one(req) -> None:
+        nonlocal matched
+        async with semaphore:
+            results = await main.recommend_shipping(req)  # request 段階はアプリ側で計測される
+            if isinstance(results, list):
+                matched += sum(1 for r in results if not r.get("error"))
+
+    async with main.lifespan(main.app):
+        # ウォームアップ（プール作成・モジュール読み込み）の完了後に計測を始める
+        while not warmup.is_ready():
+            await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await asyncio.gather(*[one(req) for req in requests])
+        wall = time.perf_counter() - started
+
+    standin.stop()
+
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "engine": args.engine,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 3) if wall else 0.0,
+        "matched_results": matched,
+        "standin_requests": standin.requests,
+        "stages": {},
+    }
+    for stage in STAGES + sorted(set(timings) - set(STAGES)):
+        values = [t.seconds for t in timings.get(stage, [])]
+        if not values:
+            continue
+        report["stages"][stage] = {
+            "count": len(values),
+            "errors": sum(1 for t in timings[stage] if not t.ok),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "mean_ms": round(sum(values) / len(values) * 1000, 1),
+            "total_s": round(sum(values), 3),
+        }
+    return report
+
+
+def print_report(report: Dict):
+    print()
+    print(f"requests={report['requests']} concurrency={report['concurrency']} engine={report['engine']}")
+    print(f"wall={report['wall_seconds']}s throughput={report['throughput_rps']} req/s matched={report['matched_results']}")
+    print(f"standin={report['standin_requests']}")
+    print(f"{'stage':<10}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'total s':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<10}{s['count']:>7}{s['errors']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['mean_ms']:>10}{s['total_s']:>10}")
+
+
+def main_cli():
+    args = parse_args()
+    output = args.json.resolve() if args.json else None
+    with tempfile.TemporaryDirectory(prefix="shipit_bench_") as tmp_dir:
+        cache_dir = args.cache_dir or Path(tmp_dir)
+        configure_environment(args, cache_dir)
+        # 実行ディレクトリに書かれるファイルも一時ディレクトリに置く
+        os.chdir(tmp_dir)
+        report = asyncio.run(run(args))
+    print_report(report)
+    if output:
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
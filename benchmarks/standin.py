@@ -0,0 +1,247 @@
+"""
+ベンチマーク用のローカルスタンドイン。
+各社サイト・スケジュールPDF・Azure OpenAI を1つのローカルHTTPサーバーで置き換える。
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import fitz  # PyMuPDF
+import httpx
+
+# ONE社の日本語PDFカテゴリ（app/get_pdf_links.py の region_map の値と一致させる）
+ONE_REGIONS = [
+    "北米東岸輸出", "北米西岸輸出", "ハワイ輸出", "北欧州輸出", "地中海輸出", "中国・香港・海峡地・インドネシア輸出",
+    "タイ・ベトナム・韓国・台湾・フィリピン輸出", "西アジア_中東輸出", "南米西岸輸出", "南米東岸輸出", "アフリカ輸出", "オセアニア輸出",
+]
+SHIPMENTLINK_CATEGORIES = ["Southeast Asia", "China", "Korea", "North America & Canada", "Europe", "Oceania"]
+
+# 合成PDFに載せる目的地（ページごとに2港ずつ）
+PDF_DESTINATIONS = [
+    "SINGAPORE", "BUSAN", "SHANGHAI", "LOS ANGELES", "ROTTERDAM", "HAMBURG",
+    "HONG KONG", "KAOHSIUNG", "BANGKOK", "MANILA", "SYDNEY", "NEW YORK",
+]
+PDF_DEPARTURES = ["TOKYO", "YOKOHAMA", "NAGOYA", "KOBE"]
+
+# 地域判定プロンプトへの決定的な回答（目的地 → 候補に含まれる語）
+REGION_HINTS = {
+    "SINGAPORE": ["SOUTHEAST ASIA", "SOUTH EAST ASIA", "MALAYSIA SINGAPORE INDONESIA", "中国・香港・海峡地"],
+    "BUSAN": ["KOREA", "タイ・ベトナム・韓国"],
+    "SHANGHAI": ["CHINA", "NINGBO", "EAST ASIA"],
+    "LOS ANGELES": ["NORTH AMERICA WEST COAST", "AMERICA CANADA", "NORTH AMERICA"],
+    "ROTTERDAM": ["EUROPE NORTH", "EUROPE"],
+    "SYDNEY": ["OCEANIA", "AUSTRALIA"],
+}
+
+
+def build_schedule_pdf(seed: str, pages: int, base_date: datetime) -> bytes:
+    """ 出発港・目的地の列と週次の便を並べた、各社PDFに似た合成スケジュールPDF """
+    digest = int(hashlib.sha256(seed.encode()).hexdigest(), 16)
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page(width=842, height=595)  # A4横
+        destinations = [PDF_DESTINATIONS[(page_index * 2 + i + digest) % len(PDF_DESTINATIONS)] for i in range(2)]
+        page.insert_text((40, 40), f"EXPORT SCHEDULE {seed.upper()} PAGE {page_index + 1}", fontsize=12)
+        columns = ["VESSEL", "VOY"] + PDF_DEPARTURES + destinations
+        xs = [40, 200, 260, 340, 420, 500, 600, 700]
+        for x, text in zip(xs, columns):
+            page.insert_text((x, 80), text, fontsize=9)
+        for week in range(24):
+            etd = base_date + timedelta(days=week * 7 + (digest + page_index) % 5)
+            cells = [f"BENCH {seed[:6].upper()} {week + 1:02d}", f"{week + 1:03d}E"]
+            cells += [f"{(etd + timedelta(days=i)):%m/%d}" for i in range(len(PDF_DEPARTURES))]
+            cells += [f"{(etd + timedelta(days=10 + 3 * i)):%m/%d}" for i in range(len(destinations))]
+            for x, text in zip(xs, cells):
+                page.insert_text((x, 100 + week * 18), text, fontsize=8)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def _one_export_page() -> str:
+    links = "".join(
+        f'<a href="/content/dam/bench/{i:02d}.pdf">{region}スケジュール</a>\n' for i, region in enumerate(ONE_REGIONS)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def _shipmentlink_result_page() -> str:
+    links = "".join(
+        f"<a href=\"javascript:GoWin('/tvs2/download/{i:02d}.pdf')\">{name}</a>\n"
+        for i, name in enumerate(SHIPMENTLINK_CATEGORIES)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def _choose_region(prompt: str) -> str:
+    destination_match = re.search(r"目的地「(.+?)」", prompt)
+    destination = destination_match.group(1).upper() if destination_match else ""
+    choices_match = re.search(r"\[(\".+?\")\]", prompt, re.S)
+    choices = re.findall(r"\"(.+?)\"", choices_match.group(1)) if choices_match else []
+    for hint in REGION_HINTS.get(destination, []):
+        for choice in choices:
+            if hint in choice:
+                return choice
+    return choices[0] if choices else ""
+
+
+def _chat_completion(body: dict) -> dict:
+    prompt = body["messages"][-1]["content"]
+    if "地域カテゴリ" in prompt or "カテゴリのどれに該当" in prompt:
+        content = _choose_region(prompt)
+    else:
+        dates = re.findall(r"\d{2}/\d{2}", prompt)
+        content = json.dumps({
+            "vessel": "BENCH LLM VESSEL",
+            "voy": "001E",
+            "etd": dates[0] if dates else "01/01",
+            "eta": dates[-1] if dates else "01/15",
+        }, ensure_ascii=False) + "\n理由: ベンチマーク用の固定回答です。"
+    prompt_tokens = sum(len(m.get("content", "")) for m in body["messages"]) // 3
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 40, "total_tokens": prompt_tokens + 40},
+    }
+
+
+class StandIn:
+    """ 各社サイト・PDF・Azure OpenAI の代わりに応答するローカルHTTPサーバー """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        llm_latency_ms: float = 0,
+        pdf_pages: int = 6,
+        pdf_variants: int = 6,
+        fixtures_dir: Optional[Path] = None,
+        base_date: Optional[datetime] = None
+    ):
+        self.latency = latency_ms / 1000
+        self.llm_latency = llm_latency_ms / 1000
+        self.fixtures_dir = fixtures_dir
+        self.base_date = base_date or datetime.now()
+        self.requests: Dict[str, int] = {}
+        # PDF生成は重いため、計測前に数種類だけ作っておきURLのハッシュで割り当てる
+        self._pdfs = [build_schedule_pdf(f"variant{i}", pdf_pages, self.base_date) for i in range(pdf_variants)]
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _pdf(self, path: str) -> bytes:
+        base = self._pdfs[int(hashlib.sha256(path.encode()).hexdigest(), 16) % len(self._pdfs)]
+        # URLごとに内容（SHA-256）が変わるよう末尾にコメントを付ける（PDFキャッシュ・テーブルキャッシュを共有させない）
+        return base + f"\n% {path}\n".encode()
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def route(self, host_path: str) -> Optional[tuple]:
+        """ "/<元のホスト><元のパス>" に対する (content-type, 本文) """
+        if self.fixtures_dir:
+            recorded = self.fixtures_dir / host_path.lstrip("/")
+            if recorded.is_file():
+                content_type = "application/pdf" if recorded.suffix == ".pdf" else "text/html; charset=utf-8"
+                return content_type, recorded.read_bytes()
+        if host_path.lower().endswith(".pdf"):
+            return "application/pdf", self._pdf(host_path)
+        if host_path.startswith("/jp.one-line.com/ja/schedules/export"):
+            return "text/html; charset=utf-8", _one_export_page().encode()
+        if host_path.startswith("/www.kinka-agency.com/"):
+            return "text/html; charset=utf-8", b'<html><body><a href="/pdf/shanghai.pdf">SHANGHAI</a></body></html>'
+        if "TVS2_ViewScheduleResult" in host_path:
+            return "text/html; charset=utf-8", _shipmentlink_result_page().encode()
+        if "TVS2_ViewSchedule" in host_path:
+            return "text/html; charset=utf-8", b"<html><body>ok</body></html>"
+        return None
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, content_type: str, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                routed = standin.route(path)
+                time.sleep(standin.latency)
+                if routed is None:
+                    standin._count("not_found")
+                    self._send(404, "text/plain", b"not found")
+                    return
+                content_type, body = routed
+                standin._count("pdf" if content_type == "application/pdf" else "page")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                headers = {"ETag": etag}
+                if "TVS2_ViewSchedule.jsp" in path:
+                    headers["Set-Cookie"] = "JSESSIONID=bench; Path=/"
+                self._send(200, content_type, body, headers)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if "/chat/completions" not in self.path:
+                    self._send(404, "text/plain", b"not found")
+                    return
+                standin._count("llm")
+                time.sleep(standin.llm_latency)
+                self._send(200, "application/json", json.dumps(_chat_completion(body), ensure_ascii=False).encode())
+
+        return Handler
+
+
+class RewriteTransport(httpx.AsyncBaseTransport):
+    """ 共有HTTPクライアントの宛先を全てスタンドインに向ける（http(s)://host/path → /host/path） """
+
+    def __init__(self, base_url: str):
+        self.base = httpx.URL(base_url)
+        self.inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        if url.host != self.base.host:
+            request.url = self.base.copy_with(path=f"/{url.host}{url.path}", query=url.query or None)
+            request.headers["Host"] = f"{self.base.host}:{self.base.port}"
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
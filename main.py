@@ -1,27 +1,25 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # 起動ログに import 時間を出す（コールドスタートの悪化に気付けるように）
+
 from fastapi import FastAPI,HTTPException,Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 import os
 import json
-import subprocess
-from typing import Optional, Dict, Any, cast
+import asyncio
+from typing import Optional, Dict, Any, List, Awaitable, Callable, Tuple, cast
+from contextlib import asynccontextmanager
 import logging
 from dateutil import parser
-import mysql.connector
 from decimal import Decimal
-import pymysql
 from collections import defaultdict
 # from openai import OpenAI
-from openai import AzureOpenAI
-import httpx
 from pathlib import Path
 import sys
-from urllib.parse import unquote
 from dotenv import load_dotenv
 import traceback
-from fastapi.responses import JSONResponse
-import camelot.io as camelot
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import warnings
 
 # ローカル用 .env 読み込み（Azure環境では無視される）
@@ -36,6 +34,32 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 各社スクレイパーはロギング設定後に読み込む（モジュール側の basicConfig を無効化するため）
+from app.database import close_db_pool, fetch_all, init_db_pool
+from app.services.carrier_adapters import CARRIER_ADAPTERS, CarrierAdapter
+from app.services.schedule_tables import ScheduleTables, get_table_engine, load_schedule_tables
+from app.services.port_aliases import get_port_aliases
+from app.services.schedule_parser import SCHEDULE_PARSER_MIN_CONFIDENCE, find_closest_sailing, parse_sailings
+from app.services.prompt_builder import build_table_context
+from app.services.answer_cache import get_answer, make_key, put_answer
+from app.services.precrawl import start_precrawl, stop_precrawl
+from app.services.sailings_store import ensure_schema as ensure_sailings_schema, find_sailing, upsert_sailings
+from app.services.http_client import close_http_client, start_http_client
+from app.services.instrumentation import current_carrier, track_stage
+from app.services.metrics import record_cache, record_carrier_result, record_llm_usage, render_metrics
+from app.services.decision_log import get_accuracy_stats, record_decision, record_feedback, start_decision_log, stop_decision_log
+from app.services.parse_pool import get_parse_pool_stats, start_parse_pool, stop_parse_pool, warm_parse_pool
+from app.services.table_cache import get_stats as get_table_cache_stats
+from app.services.llm_client import get_llm_client
+from app.services.warmup import WarmupStep, get_warmup_status, is_ready, start_warmup, stop_warmup
+from app.services.fare_snapshot import (
+    get_lane_rates, get_snapshot_stats, invalidate_snapshot, is_loaded as fare_snapshot_loaded,
+    start_snapshot_refresh, stop_snapshot_refresh,
+)
+
+IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 3)
+logger.info(f"⏱ main の import 完了（{IMPORT_SECONDS}秒）")
+
 # pdfminerのログレベルをERRORに設定
 for logger_name in ["pdfminer", "pdfminer.layout", "pdfminer.converter", "pdfminer.pdfinterp"]:
     logging.getLogger(logger_name).setLevel(logging.ERROR)
@@ -49,13 +73,64 @@ warnings.filterwarnings("ignore", message="Cannot set gray non-stroke color")
 
 # client = OpenAI(api_key=api_key)
 
-client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    api_version=os.getenv("OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("OPENAI_API_BASE") or ""
-)
+# Azure OpenAI クライアントは app.services.llm_client で共有（openai の読み込みは初回利用時かウォームアップ時）
+
+def preload_modules():
+    """ 初回リクエストで待たないよう、重いモジュール（pandas・PyMuPDF・openai）を読み込みLLMクライアントを作成しておく """
+    import pandas
+    import fitz
+
+    get_llm_client()
+
+
+def parse_worker_modules() -> List[str]:
+    """ PDF解析ワーカーで事前に読み込むモジュール（使用するテーブル抽出エンジンのもの） """
+    engines = {get_table_engine(name) for name in CARRIER_ADAPTERS}
+    modules = ["pandas"]
+    if "camelot" in engines:
+        modules.append("camelot.io")
+    if "pymupdf" in engines:
+        modules.append("fitz")
+    return modules
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 起動時: 軽い初期化だけを行ってすぐにポートを開け、MySQLコネクションプール・テーブル作成・運賃スナップショット・
+    # 重いモジュールの読み込みはバックグラウンドのウォームアップで行う（完了は /ready で確認できる）
+    await start_http_client()
+    start_parse_pool()
+    background: Dict[str, asyncio.Task] = {}
+
+    async def warm_mysql():
+        try:
+            await init_db_pool()
+        finally:
+            # プールが作れなくても、スナップショットは定期更新で再試行される
+            background["fare_snapshot"] = await start_snapshot_refresh()
+
+    steps: List[WarmupStep] = [
+        ("modules", lambda: asyncio.to_thread(preload_modules)),
+        ("parse_pool", lambda: warm_parse_pool(parse_worker_modules())),
+        ("mysql", warm_mysql),
+        ("sailings_schema", lambda: asyncio.to_thread(ensure_sailings_schema)),
+        ("decision_log", start_decision_log),
+    ]
+    warmup_task = start_warmup(steps)
+    precrawl_tasks = start_precrawl()
+    yield
+    # 終了時: バックグラウンド処理・コネクションプールを停止（決定ログの書き込み待ちは保存してから閉じる）
+    await stop_warmup(warmup_task)
+    await stop_precrawl(precrawl_tasks)
+    await asyncio.gather(*pending_sailings_writes.values(), return_exceptions=True)
+    if "fare_snapshot" in background:
+        await stop_snapshot_refresh(background["fare_snapshot"])
+    await stop_decision_log()
+    await close_db_pool()
+    await close_http_client()
+    await stop_parse_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS設定（Next.jsとの連携のため）
 app.add_middleware(
@@ -66,54 +141,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MySQL接続情報
-DB_CONFIG = {
-    "host": os.getenv("MYSQL_HOST", "tech0-gen-8-step4-dtx-db.mysql.database.azure.com"),
-    "user": os.getenv("MYSQL_USER", "ryoueno"),
-    "password": os.getenv("MYSQL_PASSWORD", "tech0-dtxdb"),
-    "database": "corporaiters"
-}
+# 船会社ごとの処理締め切り（秒）のデフォルト値
+DEFAULT_CARRIER_DEADLINE_SECONDS = float(os.getenv("CARRIER_DEADLINE_SECONDS", "90"))
+
+# プロンプトやGPT用テーブルの整形方法を変えたら更新する（GPT回答キャッシュが切り替わる）
+SCHEDULE_PROMPT_VERSION = "1"
 
-def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+# 一括検索で1リクエストに含められる航路数の上限
+BATCH_MAX_LANES = int(os.getenv("BATCH_MAX_LANES", "100"))
+
+# PDFリンク取得・テーブル読込を差し替えるための関数型（一括検索で航路間の共有に使う）
+LinksLoader = Callable[[str, str], Awaitable[List[str]]]
+TablesLoader = Callable[[str], Awaitable[Optional[ScheduleTables]]]
 
 def format_date(date_obj: Optional[datetime]) -> str:
     """ 日付オブジェクトを 'YYYY-MM-DD' 形式の文字列に変換 """
     return date_obj.strftime("%Y-%m-%d") if date_obj else "N/A"
 
+# 運賃取得クエリ（船会社分のプレースホルダは件数に応じて展開）
+FREIGHT_RATE_QUERY = """
+    SELECT shipping_company, freight_rate_usd
+    FROM faredate
+    WHERE departure_port = %s AND destination_port = %s AND shipping_company IN ({placeholders});
+"""
+
 # 🔽 この下に修正済みの関数を追加
-def get_freight_rate(departure_port: str, destination_port: str, shipping_company: str) -> Optional[float]:
+async def get_freight_rates(departure_port: str, destination_port: str, shipping_companies: List[str]) -> Dict[str, float]:
     """
-    運賃レートを取得して float 型で返す。取得できない場合は None を返す。
+    複数船会社の運賃レートを {船会社: float} で返す。取得できない船会社は含まれない。
+    通常はメモリ上の運賃スナップショットから返し、未読込の場合のみDBに1回のクエリで問い合わせる。
     """
+    if fare_snapshot_loaded():
+        return get_lane_rates(departure_port, destination_port, shipping_companies)
+
+    rates: Dict[str, float] = {}
+    if not shipping_companies:
+        return rates
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        query = """
-            SELECT freight_rate_usd
-            FROM faredate
-            WHERE departure_port = %s AND destination_port = %s AND shipping_company = %s
-            LIMIT 1;
-        """
-        cursor.execute(query, (departure_port, destination_port, shipping_company))
-        row = cast(Optional[Dict[str, Any]], cursor.fetchone())
-        cursor.close()
-        conn.close()
-
-        if row and "freight_rate_usd" in row:
+        query = FREIGHT_RATE_QUERY.format(placeholders=", ".join(["%s"] * len(shipping_companies)))
+        with track_stage("db"):
+            rows = await fetch_all(query, (departure_port, destination_port, *shipping_companies))
+
+        for row in rows:
             value = row["freight_rate_usd"]
+            company = row["shipping_company"]
+            if company in rates:
+                continue  # 同じ船会社の行が複数ある場合は最初の1件を採用
 
-            # ✅ Decimal を float に変換して返す
+            # ✅ Decimal を float に変換
             if isinstance(value, Decimal):
-                return float(value)
+                rates[company] = float(value)
             else:
                 logger.warning(f"Unexpected data type for freight_rate_usd: {type(value)}")
 
     except Exception as e:
         logger.error(f"[ERROR] 運賃取得失敗: {e}")
 
-    return None
+    return rates
+
+async def lookup_fare(fares_task: "asyncio.Task[Dict[str, float]]", carrier: str) -> str:
+    """ リクエスト全体で共有している運賃取得結果から1社分を文字列で返す """
+    # 締め切りで打ち切られた船会社が共有タスクをキャンセルしないよう shield する
+    fares = await asyncio.shield(fares_task)
+    return str(fares[carrier]) if carrier in fares else "N/A"
+
+# 運賃スナップショットの状態確認
+@app.get("/fare-snapshot")
+async def fare_snapshot_status():
+    return get_snapshot_stats()
+
+# faredate を更新した後に呼ぶと即時に読み直す
+@app.post("/fare-snapshot/refresh")
+async def refresh_fare_snapshot():
+    try:
+        await invalidate_snapshot()
+    except Exception as e:
+        logger.error(f"[ERROR] 運賃スナップショットの再読込失敗: {e}")
+        raise HTTPException(status_code=503, detail="運賃スナップショットの再読込に失敗しました")
+    return get_snapshot_stats()
+
+# Prometheus形式のメトリクス（段階ごとの所要時間・キャッシュヒット・GPTトークン数・船会社ごとの結果）
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# 起動後のウォームアップ（プール・キャッシュ・モジュール読み込み）の完了状況。完了前は 503
+@app.get("/ready")
+async def ready():
+    status = {**get_warmup_status(), "import_seconds": IMPORT_SECONDS, "fare_snapshot_loaded": fare_snapshot_loaded()}
+    return JSONResponse(status_code=200 if is_ready() else 503, content=status)
+
+# PDF解析プロセスプールの待ち行列・実行状況と、抽出テーブルキャッシュのヒット率
+@app.get("/parse-pool")
+async def parse_pool_status():
+    return {**get_parse_pool_stats(), "table_cache": get_table_cache_stats()}
 
 # 商品マスタ取得API
 TABLE_NAME = "shipping_company"
@@ -149,88 +271,75 @@ class FeedbackRequest(BaseModel):
     etd: str
     eta: str
     feedback: str
+    decision_id: Optional[str] = None  # 検索結果の decision_id（無い場合は URL・ETD・ETA で紐付け）
+
+def append_feedback_log(
+    url: str,
+    departure: str,
+    destination: str,
+    base_date: Optional[datetime],
+    etd: Optional[str],
+    eta: Optional[str],
+    vessel: Optional[str],
+    voyage: Optional[str],
+    company: str,
+    source: str
+) -> str:
+    """ 選定結果をフィードバック待ちとして決定ログに追加し、decision_id を返す（保存はバックグラウンドでまとめて行う） """
+    carrier = current_carrier.get() or company
+    return record_decision(carrier, departure, destination, format_date(base_date), url, etd, eta, vessel, voyage, source)
+
+# リクエストの応答を待たせずに行う sailings テーブルへの保存（同じPDF・航路の保存は1つにまとめ、終了時に完了を待つ）
+pending_sailings_writes: Dict[Tuple[str, str, str, str, str], asyncio.Task] = {}
+
+async def _save_sailings(carrier: str, url: str, sha256: str, rows: List[Tuple[str, str, Any]]):
+    try:
+        with track_stage("db"):
+            await asyncio.to_thread(upsert_sailings, carrier, url, sha256, rows)
+    except Exception as e:
+        logger.warning(f"[WARN] sailings テーブルへの保存に失敗: {e}")
+
+def save_sailings_in_background(carrier: str, url: str, sha256: str, departure: str, destination: str, sailings: List[Any]):
+    key = (carrier, url, sha256, departure, destination)
+    if key in pending_sailings_writes:
+        return
+    task = asyncio.create_task(_save_sailings(carrier, url, sha256, [(departure, destination, s) for s in sailings]))
+    pending_sailings_writes[key] = task
+    task.add_done_callback(lambda _: pending_sailings_writes.pop(key, None))
 
 async def extract_schedule_positions(
     url: str,
     departure: str,
     destination: str,
     etd_date: Optional[datetime] = None,
-    eta_date: Optional[datetime] = None
+    eta_date: Optional[datetime] = None,
+    carrier: Optional[str] = None,
+    load_tables: Optional[TablesLoader] = None
 ):
     
     import os
-    import csv
     import json
     import re
-    import requests
     # import fitz  # PyMuPDF
     from datetime import datetime
     # from openai import OpenAI
 
-    DESTINATION_ALIASES = {
-        "New York": ["NEW YORK", "NYC", "NEWYORK", "N.Y.", "NY", "NYO"],
-        "Los Angeles": ["LOS ANGELES", "LA", "L.A."],
-        "Rotterdam": ["ROTTERDAM"],
-        "Hamburg": ["HAMBURG"],
-        "Norfolk": ["NORFOLK", "ORF"],
-        "Savannah": ["SAVANNAH", "SAV"],
-        "Charleston": ["CHARLESTON"],
-        "Miami": ["MIAMI", "MIA"],
-        "Oakland": ["OAKLAND", "OAK"],
-        "Houston": ["HOUSTON", "HOU"],
-        "Dallas": ["DALLAS", "FWO", "FORT WORTH", "FT WORTH"],
-        "Memphis": ["MEMPHIS", "MEM"],
-        "Atlanta": ["ATLANTA", "ATL"],
-        "Chicago": ["CHICAGO", "CHI"],
-        "Columbus": ["COLUMBUS", "CMH"],
-        "Singapore": ["SINGAPORE", "SGP"],
-        "Jakarta": ["JAKARTA"],
-        "Port Klang": ["PORT KLANG", "PORT KLANG (W)", "PORT KLANG (N)", "PKG", "PKW"],
-        "Penang": ["PENANG"],
-        "Surabaya": ["SURABAYA"],
-        "Bangkok": ["BANGKOK"],
-        "Ho Chi Minh": ["HO CHI MINH", "HCM", "SAIGON"],
-        "Haiphong": ["HAIPHONG", "HPH"],
-        "Hanoi": ["HANOI"],
-        "Manila": ["MANILA", "MNL"],
-        "Busan": ["BUSAN", "PUSAN", "PUS"],
-        "Hong Kong": ["HONG KONG", "HK", "HKG"],
-        "Kaohsiung": ["KAOHSIUNG", "KHH"],
-        "Sydney": ["SYDNEY", "SYD"],
-        "Melbourne": ["MELBOURNE", "MEL"],
-        "Adelaide": ["ADELAIDE", "ADL"],
-        "Fremantle": ["FREMANTLE", "FRE"],
-        "Brisbane": ["BRISBANE", "BNE"],
-        "Xiamen": ["XIAMEN"],
-        "Qingdao": ["QINGDAO", "TSINGTAO"],
-        "Dalian": ["DALIAN"],
-        "Shanghai": ["SHANGHAI", "SHA"],
-        "Ningbo": ["NINGBO"],
-        "Shekou": ["SHEKOU"],
-        "Yantian": ["YANTIAN", "YTN"],
-        "Nansha": ["NANSHA"],
-        "Shenzhen": ["SHENZHEN"],
-        "Tanjung Pelepas": ["TANJUNG PELEPAS", "TPP"],
-        "Port Kelang": ["PORT KELANG", "PORTKLANG"],  # 通称違い対応
-    }
-
     if not etd_date and not eta_date:
         return {"error": "ETDかETAのいずれかを指定してください。"}
 
     base_date = etd_date or eta_date
 
-    # PDFをダウンロード
-    logger.info(f"📥 PDFリンクにアクセス中: {url}")
-    response = requests.get(url)
-    
-    if response.status_code != 200:
-        logger.error(f"❌ PDFのダウンロードに失敗しました。ステータスコード: {response.status_code}")
+    # PDFを取得してテーブル抽出（PDFキャッシュ・テーブルキャッシュ経由）
+    try:
+        if load_tables:
+            schedule = await load_tables(url)  # バッチ処理では航路間で共有したテーブルを使う
+        else:
+            schedule = await load_schedule_tables(url, destination=destination, carrier=carrier)
+    except Exception as e:
+        logger.error(f"PDF解析失敗: {e}")
+        return None
+    if schedule is None:
         return None
-
-    logger.info("📁 temp_schedule.pdf を保存中...")
-    with open("temp_schedule.pdf", "wb") as f:
-        f.write(response.content)
-    logger.info("📄 PDFファイルをtemp_schedule.pdfとして保存しました。")
 
     doc = None
     try:
@@ -240,8 +349,7 @@ async def extract_schedule_positions(
         # logger.info(f"✅ PDFからのテキスト抽出完了。")
 
         # エイリアス生成（大文字化して正規化）
-        aliases = DESTINATION_ALIASES.get(destination, [destination])
-        aliases = [a.upper() for a in aliases]
+        aliases = get_port_aliases(destination)
 
         # # 候補行のみ抽出（日付 + 目的地エイリアスを含む行）
         # lines = full_text.splitlines()
@@ -266,17 +374,11 @@ async def extract_schedule_positions(
         # # コンソールに condensed_text を出力
         # logger.info(f"✅ Condensed Text:\n{condensed_text}")
 
-        # Camelotでテーブル抽出
-        tables = camelot.read_pdf("temp_schedule.pdf", pages="all", flavor="stream")
+        tables = schedule.tables
         logger.info(f"抽出されたテーブル数: {len(tables)}")
         # closest_entry = None
         # closest_diff = float("inf")
 
-        # テーブルデータを文字列形式に変換
-        table_data = ""
-        for i, table in enumerate(tables):
-            table_data += f"\n--- テーブル {i + 1} ---\n"
-            table_data += table.df.to_string()
 
         # logger.info(f"抽出データ:\n{table_data}")
 
@@ -315,6 +417,45 @@ async def extract_schedule_positions(
     # finally:
     #     os.remove("temp_schedule.pdf")
 
+        # ルールベース抽出で十分な信頼度が得られた場合はLLMを呼ばない
+        sailings = parse_sailings(tables, departure, destination, base_date)
+
+        # 解析結果を sailings テーブルに保存（次回以降はインデックス検索で回答できる）。応答はDB書き込みを待たない
+        if carrier:
+            save_sailings_in_background(carrier, url, schedule.sha256, departure, destination, sailings)
+
+        match = find_closest_sailing(sailings, etd_date, eta_date)
+        if match and match.confidence >= SCHEDULE_PARSER_MIN_CONFIDENCE:
+            sailing = match.sailing
+            logger.info(f"🧮 ルールベース抽出で決定（信頼度 {match.confidence}）: {sailing.vessel} {sailing.etd_text} → {sailing.eta_text}")
+            decision_id = append_feedback_log(url, departure, destination, base_date, sailing.etd_text, sailing.eta_text,
+                                              sailing.vessel, sailing.voyage, "Unknown", "rule")
+            return {
+                "company": "Unknown",
+                "fare": "$",
+                "etd": sailing.etd_text,
+                "eta": sailing.eta_text,
+                "vessel": sailing.vessel,
+                "voy": sailing.voyage,
+                "schedule_url": url,
+                "raw_response": f"ルールベース抽出（信頼度 {match.confidence}、テーブル {sailing.table_index + 1} 行 {sailing.row_index + 1}）",
+                "decision_id": decision_id
+            }
+        logger.info(f"🤖 ルールベース抽出の信頼度が不足（候補 {len(sailings)}件）のためGPTで判定します。")
+
+        # 同じPDF・航路・日付・プロンプトの回答が保存されていればGPTを呼ばない
+        answer_key = make_key(schedule.sha256, departure, destination, format_date(etd_date), format_date(eta_date), SCHEDULE_PROMPT_VERSION)
+        cached_answer = await asyncio.to_thread(get_answer, answer_key)
+        record_cache("answer", cached_answer is not None)
+        if cached_answer:
+            logger.info(f"📦 GPT回答キャッシュを使用: {cached_answer.get('vessel')} {cached_answer.get('etd')} → {cached_answer.get('eta')}")
+            decision_id = append_feedback_log(url, departure, destination, base_date, cached_answer.get("etd"), cached_answer.get("eta"),
+                                              cached_answer.get("vessel"), cached_answer.get("voy"), cached_answer.get("company", "Unknown"), "answer_cache")
+            return {**cached_answer, "schedule_url": url, "decision_id": decision_id}
+
+        # 関連する行だけをトークン上限内で文字列化してGPTに渡す
+        table_data = build_table_context(tables, departure, destination, base_date)
+
         prompt = f"""
 以下はPDFから抽出されたスケジュール候補の行です。
 出発地「{departure}」と目的地「{destination}」（別名: {', '.join(aliases)}）に関連する、
@@ -340,13 +481,16 @@ async def extract_schedule_positions(
 
         # client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
-        chat_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "あなたは貿易実務に詳しい熟練の船便選定アドバイザーです。"},
-                {"role": "user", "content": prompt},
-            ]
-        )
+        with track_stage("llm"):
+            chat_response = await asyncio.to_thread(
+                get_llm_client().chat.completions.create,
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "あなたは貿易実務に詳しい熟練の船便選定アドバイザーです。"},
+                    {"role": "user", "content": prompt},
+                ]
+            )
+        record_llm_usage("schedule", chat_response)
 
         reply_text = chat_response.choices[0].message.content
 
@@ -388,29 +532,9 @@ async def extract_schedule_positions(
             if not company:
                 company = "Unknown"
 
-            log_path = "gpt_feedback_log.csv"
-            new_entry = [
-                datetime.now().isoformat(),
-                url,
-                departure,
-                destination,
-                format_date(base_date),
-                etd_date_str,
-                eta_date_str,
-                vessel,
-                voyage,
-                company,  # ✅ company を保存
-                "pending"
-            ]
-
-            file_exists = os.path.exists(log_path)
-            with open(log_path, "a", newline='', encoding='utf-8') as log_file:
-                writer = csv.writer(log_file)
-                if not file_exists:
-                    writer.writerow(["timestamp", "url", "departure", "destination", "input_date", "etd", "eta", "vessel", "voy", "company", "feedback"])
-                writer.writerow(new_entry)
+            decision_id = append_feedback_log(url, departure, destination, base_date, etd_date_str, eta_date_str, vessel, voyage, company, "llm")
 
-            return {
+            result = {
                 "company": company,  # ✅ JSON内の "company" を返す,
                 "fare": "$",
                 "etd": etd_date_str,
@@ -420,6 +544,8 @@ async def extract_schedule_positions(
                 "schedule_url": url,
                 "raw_response": reply_text
             }
+            await asyncio.to_thread(put_answer, answer_key, url, schedule.sha256, result)
+            return {**result, "decision_id": decision_id}
         except Exception as e:
             return {"error": "ChatGPTの返答がパースできませんでした", "raw_response": reply_text}
 
@@ -435,172 +561,7 @@ async def extract_schedule_positions(
                 doc.close()
         except:
             pass
-        try:
-            os.remove("temp_schedule.pdf")
-            logger.info("🧹 一時PDFファイルを削除しました。")
-        except Exception as e:
-            # import logging
-            # logger = logging.getLogger(__name__)
-            logger.warning(f"[WARN] PDF削除に失敗: {e}")
-
-
-async def get_pdf_links_from_one(destination_keyword: str) -> list[str]:
-    result = None  # 初期化
-    try:
-        # app/get_pdf_links.py のパスを指定
-        script_path = Path(__file__).resolve().parent / "app" / "get_pdf_links.py"
-        cwd_path = script_path.parent
-
-        result = subprocess.run(
-            [sys.executable, str(script_path), destination_keyword, "--silent"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=str(cwd_path),
-            env=os.environ.copy(),
-        )
-
-        # 正常な出力が存在する場合のみログ出力
-        if result.stdout:
-            logger.info(f"[DEBUG] get_pdf_links.py stdout:\n{result.stdout}")
-        
-        # 出力結果を JSON としてパース
-        return json.loads(result.stdout)
-    
-    except json.JSONDecodeError as je:
-        logger.error(f"[ERROR] JSON Decode Error: {je}")
-        # result が None でない場合のみ stdout にアクセス
-        if result and result.stdout:
-            logger.error(f"[DEBUG] 実際の出力内容: {result.stdout}")
-        else:
-            logger.error("[DEBUG] stdout is None")
-        return []
-    
-    except subprocess.CalledProcessError as cpe:
-        logger.error(f"[CalledProcessError] stderr:\n{cpe.stderr}")
-        # stdout が存在する場合のみログ出力
-        if cpe.stdout:
-            logger.error(f"[CalledProcessError] stdout:\n{cpe.stdout}")
-        else:
-            logger.error("[CalledProcessError] stdout is None")
-        return []
-    
-    except Exception as e:
-        logger.error(f"[ERROR] ONE get_pdf_links 実行失敗: {e}")
-        return []
-    
-# COSCOのPDFリンク取得用
-async def get_pdf_links_from_cosco(destination_keyword: str) -> list[str]:
-    result = None  # 初期化
-    try:
-        # get_cosco_pdf_links.py のフルパスを指定
-        script_path = Path(__file__).resolve().parent / "app" / "get_cosco_pdf_links.py"
-        cwd_path = script_path.parent
-
-        result = subprocess.run(
-            [sys.executable, str(script_path), destination_keyword, "--silent"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=str(cwd_path),  # .envが読めるように
-            env=os.environ.copy(),  # 現在の環境変数を明示的に渡す（Playwrightの実行にも必要）
-        )
-
-        # 正常な場合のみログ出力
-        if result.stdout:
-            logger.info(f"[COSCO PDFリンク取得] stdout:\n{result.stdout}")
-
-        return json.loads(result.stdout)
-    
-    except json.JSONDecodeError as je:
-        logger.error(f"[ERROR] JSON Decode Error: {je}")
-        # result が None でない場合のみ stdout にアクセス
-        if result and result.stdout:
-            logger.error(f"[DEBUG] 実際の出力内容: {result.stdout}")
-        else:
-            logger.error("[DEBUG] stdout is None")
-        return []
-
-    except subprocess.CalledProcessError as spe:
-        logger.error(f"[ERROR] CalledProcessError: {spe}")
-        # stdout と stderr が存在するかを確認してから出力
-        if spe.stdout:
-            logger.error(f"[stderr]\n{spe.stderr}")
-        else:
-            logger.error("[stderr] None")
-
-        if spe.stdout:
-            logger.error(f"[stdout]\n{spe.stdout}")
-        else:
-            logger.error("[stdout] None")
-        return []
-
-    except Exception as e:
-        logger.error(f"[ERROR] COSCO get_pdf_links 実行失敗: {e}")
-        return []
-    
-# KINKAのPDFリンク取得用
-async def get_pdf_links_from_kinka(destination_keyword: str) -> list[str]:
-    result = None  # 初期化
-    try:
-        script_path = Path(__file__).resolve().parent / "app" / "get_kinka_pdf_links.py"
-        cwd_path = script_path.parent
-
-        result = subprocess.run(
-            [sys.executable, str(script_path), destination_keyword, "--silent"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=str(cwd_path),  # .envが読めるように
-            env=os.environ.copy(),  # 現在の環境変数を明示的に渡す（Playwrightの実行にも必要）
-        )
 
-        # 正常な場合のみ stdout をログ出力
-        if result.stdout:
-            logger.info(f"[KINKA PDFリンク取得] stdout:\n{result.stdout}")
-
-        # 出力を JSON としてパース
-        return json.loads(result.stdout)
-    
-    except json.JSONDecodeError as je:
-        logger.error(f"[ERROR] JSON Decode Error: {je}")
-        # result が None でない場合のみ stdout を参照
-        if result and result.stdout:
-            logger.error(f"[DEBUG] 実際の出力内容: {result.stdout}")
-        else:
-            logger.error("[DEBUG] stdout is None")
-        return []
-
-    except Exception as e:
-        logger.error(f"[ERROR] KINKA get_pdf_links 実行失敗: {e}")
-        return []
-
-# ShipmentlinkのPDFリンク取得用
-async def get_pdf_links_from_shipmentlink(departure_port: str, destination_port: str) -> list[str]:
-    result = None  # 初期化
-    try:
-        script_path = Path(__file__).resolve().parent / "app" / "get_shipmentlink_pdf_links.py"
-        cwd_path = script_path.parent
-
-        result = subprocess.run(
-            [sys.executable, str(script_path), departure_port, destination_port, "--silent"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=str(cwd_path),  # .envが読めるように
-            env=os.environ.copy(),  # 現在の環境変数を明示的に渡す（Playwrightの実行にも必要）
-        )
-
-        logger.info(f"[Shipmentlink PDF取得] raw stdout:\n{result.stdout}")
-        # JSONデコード後、URLデコード
-        raw_links = json.loads(result.stdout)
-        decoded_links = [unquote(url) for url in raw_links]  # ✅ ここで一括変換
-        logger.info(f"[Shipmentlink PDF取得] decoded:\n{decoded_links}")  # ✅ ログに必ず出力！
-        
-        return decoded_links
-    except Exception as e:
-        logger.error(f"[Shipmentlink取得失敗] {e}")
-        return []
 
 # # FastAPI 内の非同期関数
 # async def get_schedule_from_maersk(departure: str, destination: str, etd_date: str) -> list[dict]:
@@ -714,117 +675,156 @@ async def get_pdf_links_from_shipmentlink(departure_port: str, destination_port:
 #         logger.error(f"[Hapag-Lloyd ERROR] {e}")
 #     return results
 
-@app.post("/recommend-shipping")
-async def recommend_shipping(req: ShippingRequest):
+def get_carrier_deadline(carrier: str) -> float:
+    """ 船会社ごとの締め切り秒数（CARRIER_DEADLINE_SECONDS_<社名> で個別指定可能） """
+    value = os.getenv(f"CARRIER_DEADLINE_SECONDS_{carrier.upper()}")
+    return float(value) if value else DEFAULT_CARRIER_DEADLINE_SECONDS
+
+def carrier_error_result(carrier: str, message: str) -> Dict[str, Any]:
+    """ 取得に失敗した船会社をフロントへ通知するための結果 """
+    return {
+        "company": carrier,
+        "error": message,
+        "vessel": "",
+        "voy": "",
+        "etd": "",
+        "eta": "",
+        "fare": "",
+        "schedule_url": ""
+    }
+
+async def run_carrier_pipeline(
+    adapter: CarrierAdapter,
+    departure: str,
+    destination: str,
+    etd_date: Optional[datetime],
+    eta_date: Optional[datetime],
+    fares_task: "asyncio.Task[Dict[str, float]]",
+    get_links: Optional[LinksLoader] = None,
+    load_tables: Optional[TablesLoader] = None
+) -> Optional[Dict[str, Any]]:
+    """ 1社分のPDFリンク取得 → スケジュール抽出 → 運賃付与 """
+    carrier = adapter.name
+    current_carrier.set(carrier)  # 段階ごとの計測に船会社名を付ける
+
+    # 鮮度内の解析済みスケジュールがあれば、スクレイピング・PDF解析・GPTを行わずに回答
+    try:
+        with track_stage("db"):
+            stored = await asyncio.to_thread(find_sailing, carrier, departure, destination, etd_date, eta_date)
+    except Exception as e:
+        logger.warning(f"[WARN] sailings テーブルの検索に失敗: {e}")
+        stored = None
+    record_cache("sailings", bool(stored))
+    if stored:
+        fare = await lookup_fare(fares_task, carrier)
+        decision_id = append_feedback_log(stored["schedule_url"], departure, destination, etd_date or eta_date,
+                                          stored["etd"], stored["eta"], stored["vessel"], stored["voy"], carrier, "sailings")
+        result = {
+            "company": carrier,
+            "fare": fare,
+            **stored,
+            "raw_response": "解析済みスケジュール（sailings テーブル）から取得",
+            "decision_id": decision_id
+        }
+        logger.info(f"[{carrier}社マッチ（sailings）] {result}")
+        return result
+
+    logger.info(f"🔍 {carrier}社 PDFリンク取得キーワード: '{destination}'")
+    pdf_urls = await (get_links or adapter.get_pdf_links)(departure, destination)
+    if not pdf_urls:
+        logger.warning(f"⚠️ {carrier}社のPDFリンク取得に失敗しました。")
+        return None
+
+    for pdf_url in pdf_urls:
+        result = await extract_schedule_positions(
+            url=pdf_url,
+            departure=departure,
+            destination=destination,
+            etd_date=etd_date,
+            eta_date=eta_date,
+            carrier=carrier,
+            load_tables=load_tables
+        )
+        if result:
+            result["company"] = carrier
+            result["fare"] = await lookup_fare(fares_task, carrier)
+            logger.info(f"[{carrier}社マッチ] {result}")
+            return result  # 最初のマッチで止める
+
+    logger.warning(f"⚠️ {carrier}社のスケジュール抽出に失敗しました。")
+    return None
+
+async def run_carrier_with_deadline(
+    adapter: CarrierAdapter,
+    departure: str,
+    destination: str,
+    etd_date: Optional[datetime],
+    eta_date: Optional[datetime],
+    fares_task: "asyncio.Task[Dict[str, float]]",
+    get_links: Optional[LinksLoader] = None,
+    load_tables: Optional[TablesLoader] = None
+) -> Optional[Dict[str, Any]]:
+    """ 締め切りを超えた船会社は打ち切り、エラー結果として返す（他社はブロックしない） """
+    deadline = get_carrier_deadline(adapter.name)
+    try:
+        result = await asyncio.wait_for(
+            run_carrier_pipeline(adapter, departure, destination, etd_date, eta_date, fares_task, get_links, load_tables),
+            timeout=deadline
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱ {adapter.name}社が締め切り（{deadline}秒）を超えたため打ち切りました。")
+        record_carrier_result(adapter.name, "timeout")
+        return carrier_error_result(adapter.name, f"{deadline}秒以内にスケジュールを取得できませんでした")
+    except Exception as e:
+        logger.exception(f"[ERROR] {adapter.name}社の処理で例外")
+        record_carrier_result(adapter.name, "error")
+        return carrier_error_result(adapter.name, f"スケジュール取得中にエラーが発生しました: {e}")
+    record_carrier_result(adapter.name, "matched" if result and not result.get("error") else "unmatched")
+    return result
+
+def select_adapters(departure: str, destination: str) -> List[CarrierAdapter]:
+    """ 今回のリクエストで検索対象とする船会社 """
+    adapters = []
+    for adapter in CARRIER_ADAPTERS.values():
+        if adapter.is_applicable(departure, destination):
+            adapters.append(adapter)
+        else:
+            logger.info(f"📛 {adapter.name}社は今回の目的地では検索対象外のため、スキップされました。")
+    return adapters
+
+def log_shipping_request(req: ShippingRequest):
     logger.info("📦 リクエスト受信:")
     logger.info(f"  Departure Port: {req.departure_port}")
     logger.info(f"  Destination Port: {req.destination_port}")
     logger.info(f"  ETD: {req.etd_date}")
     logger.info(f"  ETA: {req.eta_date}")
 
+@app.post("/recommend-shipping")
+async def recommend_shipping(req: ShippingRequest):
+    log_shipping_request(req)
+
     if not req.etd_date and not req.eta_date:
         return {"error": "ETDかETAのいずれかを指定してください。"}
 
     destination = req.destination_port
     departure = req.departure_port
-    keyword = destination
     etd_date = datetime.strptime(req.etd_date, "%Y-%m-%d") if req.etd_date else None
     eta_date = datetime.strptime(req.eta_date, "%Y-%m-%d") if req.eta_date else None
  
 
-    results = []
-
-    # ========== ONE社 ==========
-    logger.info(f"🔍 ONE社 get_pdf_links.py に渡すキーワード: '{keyword}'")
-    pdf_urls_one = await get_pdf_links_from_one(keyword)
-    if not pdf_urls_one:
-        logger.warning("⚠️ ONE社のPDFリンク取得に失敗しました。")
-    else:
-        for pdf_url in pdf_urls_one:
-            result = await extract_schedule_positions(
-                url=pdf_url,
-                departure=departure,
-                destination=destination,
-                etd_date=etd_date,
-                eta_date=eta_date
-            )
-            if result:
-                result["company"] = "ONE"
-                result["fare"] = str(get_freight_rate(departure, destination, "ONE")) if not None else "N/A"
-                results.append(result)
-                logger.info(f"[ONE社マッチ] {result}")
-                break  # 最初のマッチで止める
-
-    # ========== COSCO社 ==========
-    logger.info(f"🔍 COSCO社 get_cosco_pdf_links.py に渡すキーワード: '{keyword}'")
-    pdf_urls_cosco = await get_pdf_links_from_cosco(keyword)
-    if not pdf_urls_cosco:
-        logger.warning("⚠️ COSCO社のPDFリンク取得に失敗しました。")
-    else:
-        for pdf_url in pdf_urls_cosco:
-            result = await extract_schedule_positions(
-                url=pdf_url,
-                departure=departure,
-                destination=destination,
-                etd_date=etd_date,
-                eta_date=eta_date
-            )
-            if result:
-                result["company"] = "COSCO"
-                result["fare"] = str(get_freight_rate(departure, destination, "COSCO")) if not None else "N/A"
-                results.append(result)
-                logger.info(f"[COSCO社マッチ] {result}")
-                break  # 最初のマッチで止める
-
-# ========== KINKA社（目的地が「上海」の場合のみ） ==========
-    if "上海" in keyword or "Shanghai" in keyword:
-        logger.info(f"🔍 KINKA社 get_kinka_pdf_links.py に渡すキーワード: '{keyword}'")
-        pdf_urls_kinka = await get_pdf_links_from_kinka(keyword)
-        if not pdf_urls_kinka:
-            logger.warning("⚠️ KINKA社のPDFリンク取得に失敗しました。")
-        else:
-            for pdf_url in pdf_urls_kinka:
-                result = await extract_schedule_positions(
-                    url=pdf_url,
-                    departure=departure,
-                    destination=destination,
-                    etd_date=etd_date,
-                    eta_date=eta_date
-                )
-                if result:
-                    result["company"] = "KINKA"
-                    result["fare"] = str(get_freight_rate(departure, destination, "KINKA")) if not None else "N/A"
-                    results.append(result)
-                    logger.info(f"[KINKA社マッチ] {result}")
-                    break  # 最初のマッチで止める
-    else:
-        logger.info("📛 KINKA社は『上海』のときのみ検索対象となるため、今回はスキップされました。")
+    # ========== 各社を並行実行（各社ごとに締め切り時間を設定） ==========
+    adapters = select_adapters(departure, destination)
 
-# ========== Shipmentlink社 ========== 
-    logger.info(f"🔍 Shipmentlink社 get_pdf_links.py に渡すキーワード: '{keyword}'")
-    pdf_urls_shipmentlink = await get_pdf_links_from_shipmentlink(departure, destination)
-    
-    if not pdf_urls_shipmentlink:
-        logger.warning("⚠️ Shipmentlink社のPDFリンク取得に失敗しました。")
-    else:
-        success = False
-        for pdf_url in pdf_urls_shipmentlink:
-            result = await extract_schedule_positions(
-                url=pdf_url,
-                departure=departure,
-                destination=destination,
-                etd_date=etd_date,
-                eta_date=eta_date
-            )
-            if result:
-                result["company"] = "Shipmentlink"
-                result["fare"] = str(get_freight_rate(departure, destination, "Shipmentlink")) if not None else "N/A"
-                results.append(result)
-                logger.info(f"[Shipmentlink社マッチ] {result}")
-                success = True
-                break  # 最初のマッチで止める
-        if not success:
-            logger.warning("⚠️ Shipmentlink社のスケジュール抽出に失敗しました。")
+    # 全社分の運賃はスケジュール取得と並行して1回のクエリで取得
+    fares_task = asyncio.create_task(get_freight_rates(departure, destination, [a.name for a in adapters]))
+    with track_stage("request", ""):
+        carrier_results = await asyncio.gather(*[
+            run_carrier_with_deadline(adapter, departure, destination, etd_date, eta_date, fares_task)
+            for adapter in adapters
+        ])
+    if not fares_task.done():
+        fares_task.cancel()
+    results = [result for result in carrier_results if result]
 
     # # ========== Maersk社 ========== 
     # maersk_result = await get_schedule_from_maersk(departure, destination, etd_date=req.etd_date)
@@ -856,16 +856,149 @@ async def recommend_shipping(req: ShippingRequest):
         return []  # ← 空のリストで返す（フロントで [] を扱えるようにする）
     
 
+@app.post("/recommend-shipping/stream")
+async def recommend_shipping_stream(req: ShippingRequest):
+    """
+    /recommend-shipping のストリーミング版（NDJSON）。
+    船会社ごとに結果が出た時点で {"event": "result", ...} を1行で送り、最後に {"event": "summary", ...} を送る。
+    """
+    log_shipping_request(req)
+
+    if not req.etd_date and not req.eta_date:
+        return {"error": "ETDかETAのいずれかを指定してください。"}
+
+    destination = req.destination_port
+    departure = req.departure_port
+    etd_date = datetime.strptime(req.etd_date, "%Y-%m-%d") if req.etd_date else None
+    eta_date = datetime.strptime(req.eta_date, "%Y-%m-%d") if req.eta_date else None
+    adapters = select_adapters(departure, destination)
+
+    async def events():
+        started = time.monotonic()
+        # ストリームを最後まで送り終えるまでを1リクエストとして計測する
+        with track_stage("request", ""):
+            fares_task = asyncio.create_task(get_freight_rates(departure, destination, [a.name for a in adapters]))
+            tasks = {
+                asyncio.create_task(run_carrier_with_deadline(adapter, departure, destination, etd_date, eta_date, fares_task)): adapter.name
+                for adapter in adapters
+            }
+            matched, failed, unmatched = [], [], []
+            try:
+                for finished in asyncio.as_completed(list(tasks)):
+                    result = await finished
+                    if not result:
+                        continue
+                    if result.get("error"):
+                        failed.append(result["company"])
+                    else:
+                        matched.append(result["company"])
+                    yield json.dumps({"event": "result", "data": result}, ensure_ascii=False) + "\n"
+
+                unmatched = [name for name in tasks.values() if name not in matched and name not in failed]
+                logger.info(f"[✅STREAM] {len(matched)}件のスケジュールを送信しました")
+                yield json.dumps({
+                    "event": "summary",
+                    "matched": matched,
+                    "failed": failed,
+                    "unmatched": unmatched,
+                    "elapsed_seconds": round(time.monotonic() - started, 2),
+                }, ensure_ascii=False) + "\n"
+            finally:
+                # クライアントが途中で切断した場合も残りの処理を止める
+                for task in tasks:
+                    task.cancel()
+                if not fares_task.done():
+                    fares_task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/recommend-shipping/batch")
+async def recommend_shipping_batch(reqs: List[ShippingRequest]):
+    """
+    複数航路の一括検索。PDFリンク取得は船会社の地域カテゴリごと（地域で決まらない船会社は (出発港, 目的地) ごと）、
+    PDFの取得・解析はURLごとに1回だけ行い、全航路で結果を共有する。結果はリクエストと同じ順で {"request": ..., "results": [...]} のリストを返す。
+    """
+    if len(reqs) > BATCH_MAX_LANES:
+        raise HTTPException(status_code=400, detail=f"一度に検索できる航路は{BATCH_MAX_LANES}件までです。")
+    logger.info(f"📚 一括検索リクエスト受信: {len(reqs)}航路")
+
+    region_tasks: Dict[Tuple[str, str, str], "asyncio.Task[Optional[str]]"] = {}
+    link_tasks: Dict[Tuple[str, ...], "asyncio.Task[List[str]]"] = {}
+    table_tasks: Dict[Tuple[str, str], "asyncio.Task[Optional[ScheduleTables]]"] = {}
+
+    def shared_links(adapter: CarrierAdapter) -> LinksLoader:
+        async def get_links(departure: str, destination: str) -> List[str]:
+            lane_key = (adapter.name, departure, destination)
+            if lane_key not in region_tasks:
+                region_tasks[lane_key] = asyncio.create_task(adapter.get_region(departure, destination))
+            # 1航路が締め切りで打ち切られても、共有タスクは他の航路のために続行する
+            region = await asyncio.shield(region_tasks[lane_key])
+            key = (adapter.name, region) if region is not None else lane_key
+            if key not in link_tasks:
+                link_tasks[key] = asyncio.create_task(adapter.get_pdf_links(departure, destination, region))
+            return await asyncio.shield(link_tasks[key])
+        return get_links
+
+    def shared_tables(carrier: str) -> TablesLoader:
+        async def load_tables(url: str) -> Optional[ScheduleTables]:
+            key = (carrier, url)
+            if key not in table_tasks:
+                # 複数航路で使うため、ページを絞り込まずに全ページを解析する
+                table_tasks[key] = asyncio.create_task(load_schedule_tables(url, carrier=carrier))
+            return await asyncio.shield(table_tasks[key])
+        return load_tables
+
+    async def run_lane(req: ShippingRequest) -> Dict[str, Any]:
+        lane = req.model_dump()
+        if not req.etd_date and not req.eta_date:
+            return {"request": lane, "error": "ETDかETAのいずれかを指定してください。", "results": []}
+        departure, destination = req.departure_port, req.destination_port
+        try:
+            etd_date = datetime.strptime(req.etd_date, "%Y-%m-%d") if req.etd_date else None
+            eta_date = datetime.strptime(req.eta_date, "%Y-%m-%d") if req.eta_date else None
+        except ValueError:
+            # 1航路の日付が不正でも、他の航路の検索は続ける
+            return {"request": lane, "error": "日付は YYYY-MM-DD 形式で指定してください。", "results": []}
+
+        adapters = select_adapters(departure, destination)
+        fares_task = asyncio.create_task(get_freight_rates(departure, destination, [a.name for a in adapters]))
+        carrier_results = await asyncio.gather(*[
+            run_carrier_with_deadline(adapter, departure, destination, etd_date, eta_date, fares_task,
+                                      shared_links(adapter), shared_tables(adapter.name))
+            for adapter in adapters
+        ])
+        if not fares_task.done():
+            fares_task.cancel()
+        return {"request": lane, "results": [result for result in carrier_results if result]}
+
+    try:
+        with track_stage("request", ""):
+            lanes = await asyncio.gather(*[run_lane(req) for req in reqs])
+    finally:
+        for task in [*region_tasks.values(), *link_tasks.values(), *table_tasks.values()]:
+            if not task.done():
+                task.cancel()
+
+    logger.info(
+        f"[✅BATCH] {len(reqs)}航路: PDFリンク取得{len(link_tasks)}回 / PDF読込{len(table_tasks)}件"
+        f" / マッチ{sum(1 for lane in lanes for r in lane['results'] if not r.get('error'))}件"
+    )
+    return lanes
+
 @app.post("/update-feedback")
 async def update_feedback(data: FeedbackRequest):
     logger.info(f"フィードバック受信: URL={data.url}, ETD={data.etd}, ETA={data.eta}, Feedback={data.feedback}")
+    record_feedback(data.feedback, decision_id=data.decision_id, url=data.url, etd=data.etd, eta=data.eta)
+    return {"message": "フィードバックを記録しました。"}
+
+@app.get("/feedback/stats")
+async def feedback_stats(since_days: Optional[int] = None):
+    """ 船会社別・航路別の正解率（フィードバックに基づく） """
     try:
-        with open("gpt_feedback_log.csv", "a", encoding="utf-8", newline='') as f:
-            f.write(f'{data.url},{data.etd},{data.eta},{data.feedback}\n')
-        return {"message": "フィードバックを記録しました。"}
+        return await asyncio.to_thread(get_accuracy_stats, since_days)
     except Exception as e:
-        logger.exception("フィードバック記録中にエラー")
-        raise HTTPException(status_code=500, detail="フィードバックの保存に失敗しました。")
+        logger.exception("フィードバック集計中にエラー")
+        raise HTTPException(status_code=500, detail="フィードバックの集計に失敗しました。")
 
 # -------------------------------
 # エラーハンドリングミドルウェア
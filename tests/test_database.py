@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app import database
+from app.services import sailings_store
+
+POOL_SIZE = 2
+
+
+class FakeCursor:
+    def execute(self, query, args=()):
+        time.sleep(0.02)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    """ mysql.connector のプールと同じく、空きが無いと待たずに例外を投げる """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_use = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        with self.lock:
+            if self.in_use >= self.size:
+                raise RuntimeError("Failed getting connection; pool exhausted")
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, pool: FakePool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+    def close(self):
+        with self.pool.lock:
+            self.pool.in_use -= 1
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = FakePool(POOL_SIZE)
+    monkeypatch.setattr(database, "_sync_pool", pool)
+    monkeypatch.setattr(database, "_sync_slots", threading.BoundedSemaphore(POOL_SIZE))
+    monkeypatch.setattr(sailings_store, "SAILINGS_DB_BACKEND", "mysql")
+    return pool
+
+
+def test_lookups_wait_for_free_connection(fake_pool):
+    def lookup(_):
+        return sailings_store.find_sailing("ONE", "Tokyo", "Los Angeles", etd_date=datetime(2025, 4, 10))
+
+    with ThreadPoolExecutor(POOL_SIZE * 4) as executor:
+        results = list(executor.map(lookup, range(POOL_SIZE * 8)))
+
+    assert results == [None] * (POOL_SIZE * 8)
+    assert fake_pool.peak == POOL_SIZE
+    assert fake_pool.in_use == 0
+
+
+def test_acquire_timeout(fake_pool, monkeypatch):
+    monkeypatch.setattr(database, "MYSQL_SYNC_ACQUIRE_TIMEOUT_SECONDS", 0.05)
+    held = [database.get_db_connection() for _ in range(POOL_SIZE)]
+
+    with pytest.raises(TimeoutError):
+        database.get_db_connection()
+
+    held[0].close()
+    held[0].close()  # 二重に返却しても枠は1つだけ解放される
+    conn = database.get_db_connection()
+    with pytest.raises(TimeoutError):
+        database.get_db_connection()
+    for c in held[1:] + [conn]:
+        c.close()
+    assert fake_pool.in_use == 0
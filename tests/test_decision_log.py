@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.services import decision_log
+
+
+@pytest.fixture(autouse=True)
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(decision_log, "DECISION_LOG_BACKEND", "sqlite")
+    monkeypatch.setattr(decision_log, "DECISION_LOG_SQLITE_PATH", str(tmp_path / "decisions.sqlite3"))
+    monkeypatch.setattr(decision_log, "DECISION_LOG_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(decision_log, "_buffer", type(decision_log._buffer)())
+    monkeypatch.setattr(decision_log, "_flush_lock", None)
+    decision_log.ensure_schema()
+
+
+def _decide(vessel: str) -> str:
+    return decision_log.record_decision("ONE", "Tokyo", "Los Angeles", "2025-04-10", "http://example.com/a.pdf",
+                                        "04/10", "04/22", vessel, "001E", "rule")
+
+
+def _saved_vessels():
+    with sqlite3.connect(decision_log.DECISION_LOG_SQLITE_PATH) as conn:
+        return [row[0] for row in conn.execute("SELECT vessel FROM schedule_decisions ORDER BY id")]
+
+
+def test_bad_row_is_isolated_and_dropped():
+    _decide("ALPHA")
+    decision_log._buffer.append(("decision", ("broken",), 0))  # 列数が合わず必ず失敗する行
+    _decide("BRAVO")
+
+    assert asyncio.run(decision_log.flush()) == 0
+    _decide("CHARLIE")  # 失敗中に届いた記録も保存される
+    assert asyncio.run(decision_log.flush()) == 0
+    assert asyncio.run(decision_log.flush()) == 2  # 3回目: ALPHA・BRAVO を1件ずつ保存し、壊れた行を破棄
+
+    assert _saved_vessels() == ["ALPHA", "BRAVO"]
+    assert [entry[2] for entry in decision_log._buffer] == [2]
+    assert asyncio.run(decision_log.flush()) == 1  # 壊れた行が無くなれば通常どおり一括保存される
+    assert _saved_vessels() == ["ALPHA", "BRAVO", "CHARLIE"]
+    assert not decision_log._buffer
+
+
+def test_connection_failure_is_not_counted(monkeypatch):
+    _decide("ALPHA")
+
+    def refuse():
+        raise OSError("connection refused")
+
+    original = decision_log._connect
+    monkeypatch.setattr(decision_log, "_connect", refuse)
+    for _ in range(5):
+        assert asyncio.run(decision_log.flush()) == 0
+    assert [entry[2] for entry in decision_log._buffer] == [0]
+
+    monkeypatch.setattr(decision_log, "_connect", original)
+    assert asyncio.run(decision_log.flush()) == 1
+    assert _saved_vessels() == ["ALPHA"]
+
+
+def test_overflow_drops_oldest_when_requeued(monkeypatch):
+    monkeypatch.setattr(decision_log, "DECISION_LOG_MAX_BUFFER", 3)
+    monkeypatch.setattr(decision_log, "_connect", lambda: (_ for _ in ()).throw(OSError("down")))
+    for vessel in ("A", "B", "C", "D"):
+        _decide(vessel)
+
+    asyncio.run(decision_log.flush())
+
+    assert [entry[1][9] for entry in decision_log._buffer] == ["B", "C", "D"]
@@ -0,0 +1,41 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from app.services import fare_snapshot
+
+ROWS = [
+    {"departure_port": "Tokyo", "destination_port": "Los Angeles", "shipping_company": "ONE", "freight_rate_usd": Decimal("1200")},
+    {"departure_port": "Tokyo", "destination_port": "Los Angeles", "shipping_company": "ONE", "freight_rate_usd": Decimal("1500")},
+    {"departure_port": "TOKYO ", "destination_port": "los angeles", "shipping_company": "Evergreen", "freight_rate_usd": 900},
+    {"departure_port": "Yokohama", "destination_port": "Busan", "shipping_company": "ONE", "freight_rate_usd": "N/A"},
+]
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    async def fake_fetch_all(query, args=()):
+        if query == fare_snapshot.FARE_CHECKSUM_QUERY:
+            return [{"Table": "faredate", "Checksum": 1}]
+        return ROWS
+
+    monkeypatch.setattr(fare_snapshot, "fetch_all", fake_fetch_all)
+    assert asyncio.run(fare_snapshot.refresh_snapshot(force=True))
+
+
+def test_lookup_ignores_case_and_surrounding_spaces(loaded):
+    expected = {"ONE": 1200.0, "Evergreen": 900.0}
+
+    assert fare_snapshot.get_lane_rates("Tokyo", "Los Angeles", ["ONE", "Evergreen", "COSCO"]) == expected
+    assert fare_snapshot.get_lane_rates("tokyo", "LOS ANGELES ", ["ONE", "Evergreen"]) == expected
+    assert fare_snapshot.get_lane_rates(" Tokyo", "Los Angeles", ["one"]) == {"one": 1200.0}
+    assert fare_snapshot.get_lane_rates("Osaka", "Los Angeles", ["ONE"]) == {}
+
+
+def test_stats_count_table_rows(loaded):
+    stats = fare_snapshot.get_snapshot_stats()
+
+    assert stats["row_count"] == len(ROWS)
+    assert stats["rate_count"] == 2
+    assert stats["lane_count"] == 1
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import parse_pool
+
+
+@pytest.fixture
+def single_worker(monkeypatch):
+    monkeypatch.setattr(parse_pool, "PDF_PARSE_WORKERS", 1)
+    monkeypatch.setattr(parse_pool, "PDF_PARSE_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(parse_pool, "PDF_PARSE_MAX_STUCK_JOBS", 1)
+    monkeypatch.setattr(parse_pool, "_stats", {key: 0 for key in parse_pool._stats})
+
+
+def test_stuck_worker_is_replaced(single_worker):
+    async def scenario():
+        parse_pool.start_parse_pool()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await parse_pool.run_in_parse_pool(time.sleep, 60, timeout=1)
+
+            # 止まったワーカーが枠を持ったままでも、作り直したプールで次の解析が実行される
+            started = time.perf_counter()
+            assert await parse_pool.run_in_parse_pool(abs, -3, timeout=30) == 3
+            assert time.perf_counter() - started < 20
+            await asyncio.gather(*parse_pool._retiring)
+            return parse_pool.get_parse_pool_stats()
+        finally:
+            await parse_pool.stop_parse_pool()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["timeouts"] == 1
+    assert stats["recycles"] == 1
+    assert stats["completed"] == 1
+    assert stats["failed"] == 1  # 停止されたワーカーのジョブ
+    assert stats["in_flight"] == 0
+    assert stats["stuck"] == 0
+
+
+def test_runs_in_thread_without_pool():
+    assert asyncio.run(parse_pool.run_in_parse_pool(abs, -5)) == 5
+
+
+def test_stop_does_not_wait_for_stuck_job(single_worker, monkeypatch):
+    monkeypatch.setattr(parse_pool, "PDF_PARSE_MAX_STUCK_JOBS", 5)  # 作り直さず、現在のプールに止まったジョブが残る
+    monkeypatch.setattr(parse_pool, "PDF_PARSE_TIMEOUT_SECONDS", 1)
+
+    async def scenario():
+        parse_pool.start_parse_pool()
+        with pytest.raises(asyncio.TimeoutError):
+            await parse_pool.run_in_parse_pool(time.sleep, 60, timeout=1)
+        started = time.perf_counter()
+        await parse_pool.stop_parse_pool()
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 10
+    assert parse_pool.get_parse_pool_stats()["workers"] == 0
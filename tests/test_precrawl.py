@@ -0,0 +1,50 @@
+import asyncio
+import importlib
+import multiprocessing
+
+from app.services import precrawl
+
+
+async def _start_and_stop() -> int:
+    tasks = precrawl.start_precrawl()
+    await precrawl.stop_precrawl(tasks)
+    return len(tasks)
+
+
+def _try_lock(path: str, result):
+    precrawl.PRECRAWL_LOCK_PATH = path
+    result.put(precrawl._acquire_runner_lock())
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("PRECRAWL_ENABLED", raising=False)
+    importlib.reload(precrawl)
+
+    assert precrawl.PRECRAWL_ENABLED is False
+    assert asyncio.run(_start_and_stop()) == 0
+
+
+def test_only_one_process_per_host_crawls(tmp_path, monkeypatch):
+    path = str(tmp_path / "precrawl.lock")
+    monkeypatch.setattr(precrawl, "PRECRAWL_ENABLED", True)
+    monkeypatch.setattr(precrawl, "PRECRAWL_LOCK_PATH", path)
+    monkeypatch.setattr(precrawl, "CARRIER_ADAPTERS", {})
+
+    async def scenario():
+        tasks = precrawl.start_precrawl()
+        assert precrawl._lock_file is not None
+
+        context = multiprocessing.get_context("spawn")
+        result = context.Queue()
+        other = context.Process(target=_try_lock, args=(path, result))
+        other.start()
+        locked_elsewhere = result.get(timeout=30)
+        other.join()
+
+        await precrawl.stop_precrawl(tasks)
+        return locked_elsewhere
+
+    assert asyncio.run(scenario()) is False
+    assert precrawl._lock_file is None
+    assert precrawl._acquire_runner_lock() is True  # 停止後は別のプロセス（ここでは再取得）が担当できる
+    precrawl._release_runner_lock()
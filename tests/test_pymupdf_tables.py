@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.pymupdf_tables import _parse_pages, parse_pdf_tables_pymupdf
+from app.services.schedule_parser import parse_all_sailings, parse_sailings
+
+fitz = pytest.importorskip("fitz")
+from benchmarks.standin import build_schedule_pdf  # noqa: E402
+
+BASE_DATE = datetime(2025, 4, 1)
+
+
+@pytest.fixture(scope="module")
+def schedule_pdf() -> bytes:
+    return build_schedule_pdf("tests", 2, BASE_DATE)
+
+
+def _summary(results):
+    return [(departure, destination, s.vessel, s.voyage, s.etd, s.eta) for departure, destination, s in results]
+
+
+def test_parse_pages():
+    assert _parse_pages("all", 3) == [0, 1, 2]
+    assert _parse_pages("1,3", 3) == [0, 2]
+    assert _parse_pages("2-end", 4) == [1, 2, 3]
+    assert _parse_pages("5", 3) == []
+
+
+def test_rows_and_columns(schedule_pdf):
+    tables = parse_pdf_tables_pymupdf(schedule_pdf)
+
+    assert len(tables) == 2
+    header = tables[0][1]
+    assert header[:6] == ["VESSEL", "VOY", "TOKYO", "YOKOHAMA", "NAGOYA", "KOBE"]
+    assert len(tables[0]) == 26  # タイトル + ヘッダー + 24便
+    assert all(len(row) == len(header) for row in tables[0])
+
+    sailings = parse_sailings(tables, "Tokyo", header[6].title(), BASE_DATE)
+    assert len(sailings) == 24
+    assert sailings[0].voyage == "001E"
+
+
+def test_page_selection(schedule_pdf):
+    assert parse_pdf_tables_pymupdf(schedule_pdf, "2") == parse_pdf_tables_pymupdf(schedule_pdf)[1:]
+
+
+def test_same_result_as_camelot(schedule_pdf):
+    pytest.importorskip("camelot")
+    from app.services.schedule_tables import parse_pdf_tables
+
+    camelot_tables = parse_pdf_tables(schedule_pdf)
+    pymupdf_tables = parse_pdf_tables_pymupdf(schedule_pdf)
+
+    assert pymupdf_tables == camelot_tables
+    assert _summary(parse_all_sailings(pymupdf_tables, BASE_DATE)) == _summary(parse_all_sailings(camelot_tables, BASE_DATE))
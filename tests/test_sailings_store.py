@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from app.services import sailings_store
+from app.services.schedule_parser import Sailing
+
+
+def _sailing(vessel: str, voyage: str, etd: datetime, eta: datetime) -> Sailing:
+    return Sailing(vessel, voyage, etd, eta, f"{etd:%m/%d}", f"{eta:%m/%d}", 0, 0, False)
+
+
+@pytest.fixture(autouse=True)
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(sailings_store, "SAILINGS_DB_BACKEND", "sqlite")
+    monkeypatch.setattr(sailings_store, "SAILINGS_SQLITE_PATH", str(tmp_path / "sailings.sqlite3"))
+    sailings_store.ensure_schema()
+
+
+def test_find_nearest_sailing():
+    sailings_store.upsert_sailings("ONE", "http://example.com/a.pdf", "a" * 64, [
+        ("Tokyo", "Los Angeles", _sailing("ALPHA", "001E", datetime(2025, 4, 3), datetime(2025, 4, 15))),
+        ("Tokyo", "Los Angeles", _sailing("BRAVO", "002E", datetime(2025, 4, 10), datetime(2025, 4, 22))),
+    ])
+
+    found = sailings_store.find_sailing("ONE", "Tokyo", "Los Angeles", etd_date=datetime(2025, 4, 9))
+
+    assert found is not None
+    assert (found["vessel"], found["voy"], found["etd"]) == ("BRAVO", "002E", "04/10")
+
+
+def test_equidistant_sailings_are_not_answered():
+    sailings_store.upsert_sailings("ONE", "http://example.com/a.pdf", "a" * 64, [
+        ("Tokyo", "Los Angeles", _sailing("ALPHA", "001E", datetime(2025, 4, 8), datetime(2025, 4, 20))),
+        ("Tokyo", "Los Angeles", _sailing("BRAVO", "002E", datetime(2025, 4, 12), datetime(2025, 4, 24))),
+    ])
+
+    assert sailings_store.find_sailing("ONE", "Tokyo", "Los Angeles", etd_date=datetime(2025, 4, 10)) is None
+    assert sailings_store.find_sailing("ONE", "Tokyo", "Los Angeles", etd_date=datetime(2025, 4, 11)) is not None
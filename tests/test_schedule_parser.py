@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from app.services.schedule_parser import find_closest_sailing, parse_cell_dates, parse_sailings
+
+BASE_DATE = datetime(2025, 4, 1)
+
+HEADER = ["VESSEL", "VOY", "TOKYO", "LOS ANGELES"]
+ROWS = [
+    ["ALPHA", "001E", "04/03", "04/15"],
+    ["BRAVO", "002E", "04/10", "04/22"],
+]
+
+
+def _summary(sailings):
+    return [(s.vessel, s.voyage, s.etd, s.eta) for s in sailings]
+
+
+def test_header_in_first_row():
+    sailings = parse_sailings([[HEADER] + ROWS], "Tokyo", "Los Angeles", BASE_DATE)
+
+    assert _summary(sailings) == [
+        ("ALPHA", "001E", datetime(2025, 4, 3), datetime(2025, 4, 15)),
+        ("BRAVO", "002E", datetime(2025, 4, 10), datetime(2025, 4, 22)),
+    ]
+    assert [s.row_index for s in sailings] == [1, 2]
+    assert not any(s.guessed_columns for s in sailings)
+
+
+def test_header_after_title_rows():
+    # タイトル・注記の行があってもヘッダー行の位置から列を特定する
+    table = [["EXPORT SCHEDULE", "", "", ""], ["(SUBJECT TO CHANGE)", "", "", ""], HEADER] + ROWS
+
+    sailings = parse_sailings([table], "Tokyo", "Los Angeles", BASE_DATE)
+
+    assert _summary(sailings) == _summary(parse_sailings([[HEADER] + ROWS], "Tokyo", "Los Angeles", BASE_DATE))
+    assert [s.row_index for s in sailings] == [3, 4]
+
+
+def test_vessel_header_on_line_above_ports():
+    # 2段ヘッダー（船名・航海番号の行の下に港名の行）
+    table = [["VESSEL", "VOY", "", ""], ["", "", "TOKYO", "LOS ANGELES"]] + ROWS
+
+    sailings = parse_sailings([table], "Tokyo", "Los Angeles", BASE_DATE)
+
+    assert [(s.vessel, s.voyage) for s in sailings] == [("ALPHA", "001E"), ("BRAVO", "002E")]
+    assert not any(s.guessed_columns for s in sailings)
+
+
+def test_year_rollover_december_to_january():
+    base_date = datetime(2025, 12, 20)
+    table = [HEADER, ["ALPHA", "001E", "12/28", "01/10"]]
+
+    sailings = parse_sailings([table], "Tokyo", "Los Angeles", base_date)
+
+    assert _summary(sailings) == [("ALPHA", "001E", datetime(2025, 12, 28), datetime(2026, 1, 10))]
+    assert parse_cell_dates("05-Jan", base_date) == [datetime(2026, 1, 5)]
+
+
+def test_date_range_uses_departure_and_first_arrival():
+    table = [HEADER, ["ALPHA / BRAVO", "001E", "04/01 - 04/03", "04/15 - 04/16"]]
+
+    [sailing] = parse_sailings([table], "Tokyo", "Los Angeles", BASE_DATE)
+
+    assert sailing.vessel == "ALPHA"
+    assert (sailing.etd, sailing.eta) == (datetime(2025, 4, 3), datetime(2025, 4, 15))
+    assert (sailing.etd_text, sailing.eta_text) == ("04/01 - 04/03", "04/15")
+
+
+def test_same_etd_tie_lowers_confidence():
+    table = [HEADER, ["ALPHA", "001E", "04/10", "04/22"], ["BRAVO", "002E", "04/10", "04/24"]]
+    sailings = parse_sailings([table], "Tokyo", "Los Angeles", BASE_DATE)
+
+    match = find_closest_sailing(sailings, etd_date=datetime(2025, 4, 10))
+
+    assert match is not None
+    assert match.confidence == 0.7
+
+    unique = find_closest_sailing(sailings[:1], etd_date=datetime(2025, 4, 10))
+    assert unique is not None and unique.confidence == 1.0
+
+
+def test_guessed_vessel_column():
+    # 船名の見出しが無い場合は先頭列を船名とみなし、信頼度を下げる
+    table = [["", "TOKYO", "LOS ANGELES"], ["ALPHA 001E", "04/03", "04/15"]]
+    sailings = parse_sailings([table], "Tokyo", "Los Angeles", BASE_DATE)
+
+    assert [(s.vessel, s.voyage, s.guessed_columns) for s in sailings] == [("ALPHA 001E", "", True)]
+
+    match = find_closest_sailing(sailings, etd_date=datetime(2025, 4, 3))
+    assert match is not None
+    assert match.confidence == 0.6
+
+
+def test_far_sailing_lowers_confidence():
+    sailings = parse_sailings([[HEADER] + ROWS], "Tokyo", "Los Angeles", BASE_DATE)
+
+    match = find_closest_sailing(sailings, etd_date=datetime(2025, 5, 30))
+
+    assert match is not None
+    assert match.sailing.vessel == "BRAVO"
+    assert match.confidence == 0.6
@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from app import get_shipmentlink_pdf_links as shipmentlink
+from app.services import http_client
+
+RESULT_PAGE = """
+<a href="javascript:GoWin('/tvs2/download/na.pdf')">North America & Canada</a>
+<a href="/tvs2/download/eu.pdf">Europe</a>
+<a href="/tvs2/jsp/help.jsp">Help</a>
+"""
+
+
+def test_cookies_from_redirect_hops_are_sent(monkeypatch):
+    sent_cookies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "TVS2_ViewSchedule.jsp" in request.url.path:
+            # 初期ページはリダイレクトの途中でセッションCookieを発行する
+            return httpx.Response(302, headers=[
+                ("Location", "https://www.shipmentlink.com/jp/landing.jsp"),
+                ("Set-Cookie", "JSESSIONID=abc; Path=/"),
+                ("Set-Cookie", "lang=en; Path=/"),
+            ])
+        if request.url.path == "/jp/landing.jsp":
+            return httpx.Response(200, headers=[("Set-Cookie", "lang=jp; Path=/")], text="ok")
+        sent_cookies.append(request.headers.get("Cookie"))
+        return httpx.Response(200, text=RESULT_PAGE)
+
+    client = http_client._create_client()
+    client._transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(shipmentlink, "get_http_client", lambda: client)
+
+    links = asyncio.run(shipmentlink.fetch_schedule_pdf_links("JPTYO"))
+
+    assert sent_cookies == ["JSESSIONID=abc; lang=jp"]
+    assert links == [
+        ("North America & Canada", "https://www.shipmentlink.com/tvs2/download/na.pdf"),
+        ("Europe", "https://www.shipmentlink.com/tvs2/download/eu.pdf"),
+    ]
+    assert not client.cookies  # 共有クライアントにはCookieを保存しない